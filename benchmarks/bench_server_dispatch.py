@@ -0,0 +1,97 @@
+"""Micro-benchmark of the StupidArtnetServer receive path.
+
+Feeds prebuilt ArtDmx packets straight into the packet handler, so the
+numbers show parsing and dispatch cost per core without any socket.
+The legacy handler reproduces the old loop (scan every listener, run
+inspect.signature on every packet) for comparison.
+
+Usage:
+python benchmarks/bench_server_dispatch.py --listeners 500 --packets 20000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from stupidArtnet import StupidArtnetServer  # noqa: E402
+
+
+def legacy_handle(server, data):
+    """Receive loop body as it was before listener indexing and caching."""
+    if server.validate_header(data):
+        for listener in server.listeners:
+            if listener['address_mask'] == data[14:16]:
+                new_seq = data[12]
+                old_seq = listener['sequence']
+                if new_seq == 0x00 or new_seq > old_seq or old_seq - new_seq > 0x80:
+                    listener['sequence'] = new_seq
+                    listener['buffer'] = list(data)[18:]
+                    callback = listener['callback']
+                    if callback is not None:
+                        from inspect import signature
+                        params_len = len(signature(callback).parameters)
+                        if params_len == 1:
+                            callback(listener['buffer'])
+                        elif params_len == 2:
+                            addr_mask = listener['address_mask']
+                            addr = int.from_bytes(addr_mask, 'little')
+                            callback(listener['buffer'], addr)
+
+
+def make_packets(universes, count):
+    """Builds ArtDmx packets cycling through universes."""
+    packets = []
+    for i in range(count):
+        universe = i % universes
+        packet = bytearray(b'Art-Net\x00\x00P\x00\x0e')
+        packet.append(0)    # sequence disabled, always accepted
+        packet.append(0)
+        packet.extend(universe.to_bytes(2, 'little'))
+        packet.extend((512).to_bytes(2, 'big'))
+        packet.extend(bytes(512))
+        packets.append(bytes(packet))
+    return packets
+
+
+def run(name, packets, handle):
+    """Times a handler over all packets, prints and returns packets/sec."""
+    start = time.process_time()
+    for packet in packets:
+        handle(packet)
+    elapsed = time.process_time() - start
+    rate = len(packets) / elapsed
+    print(f"{name:<10} {rate:>12.0f} pkt/s per core")
+    return rate
+
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--listeners', type=int, default=500)
+    parser.add_argument('--packets', type=int, default=20000)
+    parser.add_argument('--port', type=int, default=6498)
+    args = parser.parse_args()
+
+    def callback(data, address):
+        pass
+
+    server = StupidArtnetServer(port=args.port)
+    for universe in range(args.listeners):
+        server.register_listener(universe, callback_function=callback)
+
+    packets = make_packets(args.listeners, args.packets)
+    address = ('127.0.0.1', 6454)
+
+    print(f"{args.listeners} listeners, {args.packets} packets")
+    before = run('before', packets, lambda p: legacy_handle(server, p))
+    after = run('after', packets, lambda p: server._handle_packet(p, address))
+    print(f"Speedup: {after / before:.1f}x")
+
+    server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compares per-channel setters with the bulk setters of StupidArtnet.
+
+Fills a full 512 channel universe (170 RGB pixels) over and over, no
+packets are sent.
+
+Usage:
+python benchmarks/bench_setters.py --rounds 2000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from stupidArtnet import StupidArtnet  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def run(name, rounds, fill, baseline=None):
+    """Times a fill function, prints and returns microseconds per fill."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fill()
+    per_fill = (time.perf_counter() - start) / rounds * 1e6
+    speedup = f"{baseline / per_fill:>7.1f}x" if baseline else ''
+    print(f"{name:<32} {per_fill:>10.1f} us/universe {speedup}")
+    return per_fill
+
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    sender = StupidArtnet(packet_size=512)
+    pixels = [(random.randint(0, 255), random.randint(0, 255),
+               random.randint(0, 255)) for _ in range(170)]
+    flat = [v for pixel in pixels for v in pixel]
+    raw = bytes(flat)
+
+    def rgb_loop():
+        for i, (red, green, blue) in enumerate(pixels):
+            sender.set_rgb(1 + i * 3, red, green, blue)
+
+    def single_loop():
+        for i, value in enumerate(flat):
+            sender.set_single_value(1 + i, value)
+
+    base = run('set_rgb x 170', args.rounds, rgb_loop)
+    run('set_single_value x 510', args.rounds, single_loop, base)
+    run('set_fixtures(list of tuples)', args.rounds,
+        lambda: sender.set_fixtures(1, pixels), base)
+    run('set_range(list)', args.rounds,
+        lambda: sender.set_range(1, flat), base)
+    run('set_range(bytes)', args.rounds,
+        lambda: sender.set_range(1, raw), base)
+    run('slice assignment (bytes)', args.rounds,
+        lambda: sender.__setitem__(slice(0, 510), raw), base)
+
+    if np is not None:
+        array = np.array(pixels, dtype=np.float32) * 1.1
+        run('set_fixtures(float array, clip)', args.rounds,
+            lambda: sender.set_fixtures(1, array), base)
+        words = np.arange(256, dtype=np.int32) * 300
+        run('set_16bit_range(array)', args.rounds,
+            lambda: sender.set_16bit_range(1, words), base)
+
+    sender.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Benchmark suite for the sender and receiver hot paths.
+
+Runs over loopback only, nothing leaves the machine. Every benchmark is
+repeated and the best run is kept, results are written as JSON so runs
+of different releases can be compared.
+
+Usage:
+python benchmarks/bench_suite.py --output before.json
+python benchmarks/bench_suite.py --output after.json --compare before.json
+python benchmarks/bench_suite.py --quick
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from stupidArtnet import StupidArtnet, StupidArtnetServer, ArtnetUniverseGroup, \
+    FrameScheduler  # noqa: E402
+from stupidArtnet.ArtnetSocket import HAS_SENDMMSG, HAS_RECVMMSG  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Larger values are better for these units, smaller for the rest
+HIGHER_IS_BETTER = ('pkt/s', 'ops/s')
+
+
+def best_rate(function, count, repeat):
+    """Runs function count times, repeat times, returns best calls/sec."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            function()
+        elapsed = time.perf_counter() - start
+        best = max(best, count / elapsed)
+    return best
+
+
+def make_packet(universe, sequence=0):
+    """Builds a full 512 channel ArtDmx packet."""
+    return (b'Art-Net\x00\x00P\x00\x0e' + bytes((sequence, 0)) +
+            universe.to_bytes(2, 'little') + (512).to_bytes(2, 'big') + bytes(512))
+
+
+def bench_show(results, args):
+    """Packets per second of show() over loopback."""
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(('127.0.0.1', args.port))
+    count = args.packets
+
+    for name, options in (('default', {}), ('zero_copy', {'zero_copy': True}),
+                          ('double_buffer', {'double_buffer': True})):
+        sender = StupidArtnet(packet_size=512, port=args.port, **options)
+        results[f'show.{name}'] = {
+            'value': best_rate(sender.show, count, args.repeat), 'unit': 'pkt/s'}
+        sender.close()
+
+    universes = 64
+    group = ArtnetUniverseGroup(packet_size=512, port=args.port)
+    for universe in range(universes):
+        group.add_universe(universe)
+    rate = best_rate(group.show, max(count // universes, 1), args.repeat) * universes
+    results['show.universe_group_64'] = {'value': rate, 'unit': 'pkt/s'}
+    group.close()
+    sink.close()
+
+
+def bench_setters(results, args):
+    """Setter calls per second, no packets sent."""
+    sender = StupidArtnet(packet_size=512)
+    count = args.operations
+    values = list(range(256)) * 2
+
+    results['setter.set_single_value'] = {
+        'value': best_rate(lambda: sender.set_single_value(100, 127), count, args.repeat),
+        'unit': 'ops/s'}
+    results['setter.set_rgb'] = {
+        'value': best_rate(lambda: sender.set_rgb(100, 10, 20, 30), count, args.repeat),
+        'unit': 'ops/s'}
+    results['setter.set_16bit'] = {
+        'value': best_rate(lambda: sender.set_16bit(100, 40000), count, args.repeat),
+        'unit': 'ops/s'}
+    results['setter.set'] = {
+        'value': best_rate(lambda: sender.set(values), count, args.repeat),
+        'unit': 'ops/s'}
+    results['setter.set_range'] = {
+        'value': best_rate(lambda: sender.set_range(1, values), count, args.repeat),
+        'unit': 'ops/s'}
+    sender.close()
+
+
+def bench_dispatch(results, args):
+    """Receive path packets per second, by listener count and callback."""
+    server = StupidArtnetServer(port=args.port)
+    address = ('127.0.0.1', 6454)
+
+    def no_args(data):
+        pass
+
+    def with_address(data, address):
+        pass
+
+    for listeners in (1, 64, 512):
+        for name, callback in (('none', None), ('data', no_args),
+                               ('data_address', with_address)):
+            server.delete_all_listener()
+            for universe in range(listeners):
+                server.register_listener(universe, callback_function=callback)
+            packets = [make_packet(u % listeners) for u in range(args.packets)]
+            handle = server._handle_packet  # pylint: disable=protected-access
+
+            best = 0.0
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                for packet in packets:
+                    handle(packet, address)
+                best = max(best, len(packets) / (time.perf_counter() - start))
+            results[f'dispatch.listeners_{listeners}.callback_{name}'] = {
+                'value': best, 'unit': 'pkt/s'}
+
+        # what a callback adds to every packet
+        base = results[f'dispatch.listeners_{listeners}.callback_none']['value']
+        for name in ('data', 'data_address'):
+            rate = results[f'dispatch.listeners_{listeners}.callback_{name}']['value']
+            results[f'callback_overhead.listeners_{listeners}.{name}'] = {
+                'value': (1 / rate - 1 / base) * 1e9, 'unit': 'ns/pkt'}
+
+    server.close()
+
+
+def bench_scheduler(results, args):
+    """Frame interval jitter of a FrameScheduler with a cheap callback."""
+    scheduler = FrameScheduler(fps=args.fps)
+    scheduler.add(lambda: None)
+    scheduler.start()
+    time.sleep(args.duration)
+    scheduler.stop()
+
+    stats = scheduler.get_jitter_stats()
+    if not stats.get('count'):
+        return
+    period = stats['period']
+    for key in ('p50', 'p99', 'max'):
+        results[f'scheduler.jitter_{key}'] = {
+            'value': abs(stats[key] - period) * 1e6, 'unit': 'us'}
+    results['scheduler.skipped'] = {'value': stats['skipped'], 'unit': 'frames'}
+
+
+def describe():
+    """Machine and library details stored with the results."""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': revision,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'numpy': np.__version__ if np is not None else None,
+        'sendmmsg': HAS_SENDMMSG,
+        'recvmmsg': HAS_RECVMMSG,
+    }
+
+
+def compare(results, path):
+    """Prints the change of every result against an earlier run."""
+    with open(path, encoding='utf-8') as file:
+        before = json.load(file)['results']
+    print(f"\n{'benchmark':<48} {'before':>14} {'after':>14} {'change':>8}")
+    for name, result in results.items():
+        if name not in before:
+            continue
+        old, new = before[name]['value'], result['value']
+        if old <= 0 or new <= 0:
+            # differences of noisy small values say nothing
+            print(f"{name:<48} {old:>14.1f} {new:>14.1f} {'':>8}")
+            continue
+        change = new / old - 1 if result['unit'] in HIGHER_IS_BETTER else old / new - 1
+        print(f"{name:<48} {old:>14.1f} {new:>14.1f} {change:>+8.1%}")
+
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--packets', type=int, default=20000)
+    parser.add_argument('--operations', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fps', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=3.0,
+                        help='seconds the scheduler runs for')
+    parser.add_argument('--port', type=int, default=6497)
+    parser.add_argument('--quick', action='store_true',
+                        help='small counts, to check the suite runs')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--compare', help='JSON of an earlier run to compare with')
+    args = parser.parse_args()
+    if args.quick:
+        args.packets, args.operations, args.repeat, args.duration = 600, 1000, 1, 0.2
+
+    results = {}
+    for bench in (bench_show, bench_setters, bench_dispatch, bench_scheduler):
+        bench(results, args)
+
+    report = {'meta': describe(), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Compares N StupidArtnet senders against one ArtnetUniverseGroup.
+
+Packets go to a local sink socket that is never read, so the kernel
+simply drops what does not fit. Nothing leaves the machine.
+
+Usage:
+python benchmarks/bench_universe_group.py --universes 200 --frames 200
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from stupidArtnet import StupidArtnet, ArtnetUniverseGroup  # noqa: E402
+
+
+def run(name, frames, universes, show):
+    """Times a callable sending one frame, prints and returns results."""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(frames):
+        show()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    packets = frames * universes
+    result = {
+        'packets_per_sec': packets / wall,
+        'cpu_us_per_frame': cpu / frames * 1e6,
+    }
+    print(f"{name:<28} {result['packets_per_sec']:>12.0f} pkt/s "
+          f"{result['cpu_us_per_frame']:>10.1f} us CPU/frame")
+    return result
+
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--universes', type=int, default=200)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--port', type=int, default=6499)
+    args = parser.parse_args()
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(('127.0.0.1', args.port))
+
+    senders = [StupidArtnet('127.0.0.1', u, 512, port=args.port)
+               for u in range(args.universes)]
+
+    def show_all():
+        for sender in senders:
+            sender.show()
+
+    group = ArtnetUniverseGroup('127.0.0.1', 512, port=args.port)
+    loop_group = ArtnetUniverseGroup('127.0.0.1', 512, port=args.port,
+                                     use_sendmmsg=False)
+    for universe in range(args.universes):
+        group.add_universe(universe)
+        loop_group.add_universe(universe)
+
+    print(f"{args.universes} universes x {args.frames} frames")
+    base = run('StupidArtnet x N', args.frames, args.universes, show_all)
+    loop = run('Group (sendto loop)', args.frames, args.universes,
+               loop_group.show)
+    batch = run(f'Group (sendmmsg={group.batch.use_sendmmsg})',
+                args.frames, args.universes, group.show)
+
+    for name, result in (('sendto loop', loop), ('batched', batch)):
+        print(f"Speedup {name}: "
+              f"{base['cpu_us_per_frame'] / result['cpu_us_per_frame']:.2f}x CPU")
+
+    for sender in senders:
+        sender.close()
+    group.close()
+    loop_group.close()
+    sink.close()
+
+
+if __name__ == '__main__':
+    main()
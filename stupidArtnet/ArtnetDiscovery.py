@@ -0,0 +1,259 @@
+"""Node discovery with ArtPoll, and unicast routing of universes.
+
+NOTES
+- ArtPoll goes out every interval seconds, nodes answer with one
+ArtPollReply per bind index, listing the Port-Addresses they output
+- Nodes not heard from for timeout seconds are dropped
+- The node table is turned into Port-Address -> node IPs routes, and
+routed senders and universe groups are retargeted whenever a route
+changes, so each universe only goes to the nodes that output it
+
+"""
+
+import socket
+import threading
+from time import monotonic
+
+from stupidArtnet.ArtnetUtils import make_address_mask, make_artpoll
+from stupidArtnet.ArtnetPackets import parse_artpollreply
+
+
+class ArtnetDiscovery():
+    """Keeps a table of Art-Net nodes and routes universes to them."""
+
+    def __init__(self, target_ip='255.255.255.255', port=6454, interval=3.0,
+                 timeout=10.0, bind_address=None, fallback=True):
+        """Initializes discovery, call start() to begin polling.
+
+        Args:
+        target_ip - where ArtPoll goes, a broadcast address or a list
+        of node IPs to poll directly
+        port - UDP port nodes listen on (default: 6454)
+        interval - seconds between polls
+        timeout - seconds a node is kept after its last reply
+        bind_address - (ip, port) to receive replies on, by default
+        all interfaces on port. Replies go to the Art-Net port
+        fallback - universes no node outputs keep going to their own
+        target IP, otherwise they are not sent at all
+
+        Returns:
+        None
+
+        """
+        if isinstance(target_ip, str):
+            target_ip = [target_ip]
+        self.poll_addresses = [(ip, port) for ip in target_ip]
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self.fallback = fallback
+        self.poll_packet = make_artpoll()
+
+        # (ip, bind_index) -> node details
+        self.nodes = {}
+        # Port-Address -> IPs of the nodes outputting it
+        self.routes = {}
+        # senders and universe groups kept routed
+        self.routed = []
+        self.lock = threading.Lock()
+
+        # UDP SOCKET
+        self.socket_client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket_client.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket_client.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.socket_client.bind(bind_address or ('', port))
+
+        # Polling thread
+        self.running = False
+        self.thread = None
+
+    def __del__(self):
+        """Graceful shutdown."""
+        self.stop()
+        self.close()
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Discovery\n"
+        state += f"Nodes: {len(self.nodes)} \n"
+        state += f"Routed Port-Addresses: {len(self.routes)} \n"
+        state += "==================================="
+
+        return state
+
+    # NODE TABLE #
+
+    def poll(self):
+        """Sends an ArtPoll now."""
+        for address in self.poll_addresses:
+            try:
+                self.socket_client.sendto(self.poll_packet, address)
+            except socket.error as error:
+                print(f"ERROR: Socket error with exception: {error}")
+
+    def handle_packet(self, data, address=None):
+        """Takes in a datagram, ArtPollReply packets update the table.
+
+        Args:
+        data - received datagram
+        address - (ip, port) it came from
+
+        Returns:
+        boolean - whether it was an ArtPollReply
+
+        """
+        node = parse_artpollreply(data, address)
+        if node is None:
+            return False
+        with self.lock:
+            key = (node['ip'], node['bind_index'])
+            old = self.nodes.get(key)
+            self.nodes[key] = node
+            changed = old is None or old['outputs'] != node['outputs']
+        if changed:
+            self.__update_routes()
+        return True
+
+    def expire(self, now=None):
+        """Drops nodes that did not reply for timeout seconds.
+
+        Args:
+        now - time.monotonic() to compare with, default now
+
+        Returns:
+        int - number of nodes dropped
+
+        """
+        now = monotonic() if now is None else now
+        with self.lock:
+            stale = [key for key, node in self.nodes.items()
+                     if now - node['seen'] > self.timeout]
+            for key in stale:
+                del self.nodes[key]
+        if stale:
+            self.__update_routes()
+        return len(stale)
+
+    def get_nodes(self):
+        """Returns the details of every known node."""
+        with self.lock:
+            return [dict(node) for node in self.nodes.values()]
+
+    def get_targets(self, universe, sub=0, net=0, is_simplified=True):
+        """Returns the IPs of the nodes outputting a universe."""
+        port_address = int.from_bytes(
+            make_address_mask(universe, sub, net, is_simplified), 'little')
+        return list(self.routes.get(port_address, ()))
+
+    # ROUTING #
+
+    def route(self, target):
+        """Keeps a sender or universe group sending only to its nodes.
+
+        Args:
+        target - StupidArtnet or ArtnetUniverseGroup
+
+        Returns:
+        None
+
+        """
+        if target not in self.routed:
+            self.routed.append(target)
+        self.__apply(target, self.routes)
+
+    def unroute(self, target):
+        """Stops routing a target, it goes back to its own target IP."""
+        self.routed = [t for t in self.routed if t is not target]
+        if hasattr(target, 'universes'):
+            target.update_targets(dict.fromkeys(range(len(target.universes))))
+        else:
+            target.set_targets(None)
+
+    def __update_routes(self):
+        """Rebuilds the routes and retargets what changed."""
+        routes = {}
+        with self.lock:
+            for node in self.nodes.values():
+                for port_address in node['outputs']:
+                    ips = routes.setdefault(port_address, [])
+                    if node['ip'] not in ips:
+                        ips.append(node['ip'])
+        routes = {key: tuple(ips) for key, ips in routes.items()}
+        if routes == self.routes:
+            return
+        self.routes = routes
+        for target in self.routed:
+            self.__apply(target, routes)
+
+    def __targets(self, routes, port, universe, sub, net, is_simplified):
+        """Addresses for one universe, None to use its own target."""
+        port_address = int.from_bytes(
+            make_address_mask(universe, sub, net, is_simplified), 'little')
+        ips = routes.get(port_address)
+        if not ips:
+            return None if self.fallback else ()
+        return tuple((ip, port) for ip in ips)
+
+    def __apply(self, target, routes):
+        """Points a sender or every universe of a group at its nodes."""
+        if hasattr(target, 'universes'):
+            changes = {}
+            for index, universe in enumerate(target.universes):
+                addresses = self.__targets(
+                    routes, target.port, universe['universe'], universe['sub'],
+                    universe['net'], universe['simplified'])
+                if addresses != universe['targets']:
+                    changes[index] = addresses
+            # the group lays out its batch once for all changes
+            if changes:
+                target.update_targets(changes)
+        else:
+            addresses = self.__targets(routes, target.port, target.universe,
+                                       target.subnet, target.net, target.is_simplified)
+            if addresses != target.targets:
+                target.set_targets(addresses)
+
+    # THREADING #
+
+    def start(self):
+        """Starts polling and listening for replies on a thread."""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops polling and waits for the thread to exit."""
+        self.running = False
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def __run(self):
+        """Polling thread loop."""
+        sock = self.socket_client
+        next_poll = monotonic()
+        while self.running:
+            now = monotonic()
+            if now >= next_poll:
+                self.expire(now)
+                self.poll()
+                next_poll = now + self.interval
+            # wake up now and then to see if we should still be running
+            sock.settimeout(min(next_poll - now, 0.5))
+            try:
+                data, address = sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.handle_packet(data, address)
+
+    def close(self):
+        """Close UDP socket."""
+        if self.socket_client is not None:
+            self.socket_client.close()
+            self.socket_client = None
@@ -0,0 +1,351 @@
+"""Frame rate fades and crossfades across many universes.
+
+NOTES
+- Start and target of every channel of every sender are kept as one
+(universes, 512) array, each frame of a fade is worked out for all
+universes at once and copied into the sender buffers
+- Runs on the send clock right before the senders, see start()
+- Curves are linear or S-curve, each channel can wait its own delay
+before it starts moving, for wipes and chases
+- Without numpy the same runs channel by channel, much slower
+
+"""
+
+from time import monotonic
+from stupidArtnet.ArtnetScheduler import Scheduled
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Fade curves
+LINEAR = 'linear'
+S_CURVE = 's_curve'     # eases in and out, smoothstep
+CURVES = (LINEAR, S_CURVE)
+
+CHANNELS = 512
+
+
+class ArtnetFader(Scheduled):
+    """Fades the buffers of several senders, computed once per frame."""
+
+    # values must be in the buffers before any sender ticks
+    FRAME_FIRST = True
+
+    def __init__(self, senders=(), fps=44):
+        """Initializes fader.
+
+        Args:
+        senders - StupidArtnet objects whose buffers the fader writes
+        fps - frame rate of the clock started by start()
+
+        Returns:
+        None
+
+        """
+        # senders, current values (float) and output (uint8), swapped
+        # together so the clock never sees a mix of old and new
+        self.frame = ((), self.__zeros(0), self.__zeros(0, True))
+        # running fade, None when holding still
+        self.fade = None
+        self.frames = 0
+
+        # Timer
+        self.fps = fps
+        self.running = False
+        self.scheduler = None
+        self.owns_scheduler = False
+
+        for sender in senders:
+            self.add(sender)
+
+    def __del__(self):
+        """Graceful shutdown."""
+        self.stop()
+
+    def __len__(self):
+        """Number of senders faded."""
+        return len(self.frame[0])
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Fader\n"
+        state += f"Universes: {len(self)} \n"
+        state += f"Fading: {self.is_fading()} \n"
+        state += "==================================="
+
+        return state
+
+    @property
+    def senders(self):
+        """Senders faded, in universe order."""
+        return self.frame[0]
+
+    @staticmethod
+    def __zeros(universes, output=False):
+        """Empty value or output table."""
+        if np is not None:
+            return np.zeros((universes, CHANNELS), np.uint8 if output else np.float32)
+        if output:
+            return [bytearray(CHANNELS) for _ in range(universes)]
+        return [[0.0] * CHANNELS for _ in range(universes)]
+
+    def add(self, sender):
+        """Adds a sender, its buffer is where fades start from.
+
+        Ends a running fade where it is.
+        """
+        senders, values, output = self.frame
+        if sender in senders:
+            return
+        self.fade = None
+        row = bytes(sender.buffer[:CHANNELS])
+        row += bytes(CHANNELS - len(row))
+        if np is not None:
+            values = np.vstack((values, np.frombuffer(row, np.uint8).astype(np.float32)))
+            output = np.vstack((output, np.frombuffer(row, np.uint8)))
+        else:
+            values = values + [[float(v) for v in row]]
+            output = output + [bytearray(row)]
+        self.frame = (senders + (sender,), values, output)
+
+    def remove(self, sender):
+        """Removes a sender, ends a running fade where it is."""
+        senders, values, output = self.frame
+        keep = [i for i, s in enumerate(senders) if s is not sender]
+        if len(keep) == len(senders):
+            return
+        self.fade = None
+        if np is not None:
+            values, output = values[keep], output[keep]
+        else:
+            values, output = [values[i] for i in keep], [output[i] for i in keep]
+        self.frame = (tuple(senders[i] for i in keep), values, output)
+
+    # FADES #
+
+    def fade_to(self, target, duration, curve=LINEAR, delay=0.0):
+        """Fades from the current values to a target.
+
+        Args:
+        target - a value for every channel, a list with one sequence of
+        channel values per sender (None or short sequences leave the
+        other channels where they are), or a (universes, n) array
+        duration - seconds each channel takes to get there
+        curve - LINEAR, S_CURVE or a function mapping a numpy array of
+        progress (0 - 1) to eased progress
+        delay - seconds before channels start moving, a number, or with
+        numpy an array broadcastable to (universes, 512)
+
+        Returns:
+        None
+
+        """
+        _, values, _ = self.frame
+        start = values.copy() if np is not None else [list(row) for row in values]
+        self.__begin(start, target, duration, curve, delay)
+
+    def crossfade(self, start, target, duration, curve=LINEAR, delay=0.0):
+        """Fades from one scene to another, see fade_to.
+
+        Args:
+        start - scene to fade from, same forms as target
+        target - scene to fade to
+
+        Returns:
+        None
+
+        """
+        start = self.__table(start)
+        if start is not None:
+            self.__begin(start, target, duration, curve, delay)
+
+    def blackout(self, duration=0.0, curve=LINEAR):
+        """Fades every channel to 0."""
+        self.fade_to(0, duration, curve)
+
+    def set_values(self, values):
+        """Jumps to values on the next frame, ends a running fade.
+
+        Args:
+        values - same forms as the target of fade_to
+
+        Returns:
+        None
+
+        """
+        self.fade_to(values, 0)
+
+    def stop_fade(self):
+        """Holds all channels where they are."""
+        self.fade = None
+
+    def is_fading(self):
+        """Whether a fade is running."""
+        return self.fade is not None
+
+    def __table(self, scene):
+        """Full (universes, 512) table of a scene, None if it does not fit."""
+        senders, values, _ = self.frame
+        if not hasattr(scene, '__len__'):
+            scene = min(max(float(scene), 0.0), 255.0)
+            if np is not None:
+                return np.full((len(senders), CHANNELS), scene, np.float32)
+            return [[scene] * CHANNELS for _ in senders]
+
+        if len(scene) != len(senders):
+            print("ERROR: Scene does not match number of senders")
+            return None
+        if np is not None:
+            table = values.copy()
+            for index, row in enumerate(scene):
+                if row is None:
+                    continue
+                row = np.asarray(row, np.float32)[:CHANNELS]
+                table[index, :len(row)] = row
+            return np.clip(table, 0, 255, out=table)
+        table = [list(row) for row in values]
+        for index, row in enumerate(scene):
+            if row is None:
+                continue
+            row = [min(max(float(v), 0.0), 255.0) for v in row[:CHANNELS]]
+            table[index][:len(row)] = row
+        return table
+
+    def __begin(self, start, target, duration, curve, delay):
+        """Builds everything a running fade needs and hands it to the clock."""
+        target = self.__table(target)
+        if target is None:
+            return
+        if curve not in CURVES and not (callable(curve) and np is not None):
+            print("ERROR: Unknown fade curve, using linear")
+            curve = LINEAR
+        begin = monotonic()
+        if duration <= 0:
+            # already over, the next frame jumps to the target
+            duration = 1e-6
+            begin -= 2 * duration
+
+        if np is not None:
+            diff = target - start
+            delay = np.broadcast_to(np.asarray(delay, np.float32), diff.shape)
+            longest = float(delay.max()) if delay.size else 0.0
+            # work arrays, a frame allocates nothing
+            progress = np.empty_like(diff)
+            scratch = np.empty_like(diff)
+            fade = (begin, duration + longest, duration, curve,
+                    start, diff, delay, progress, scratch)
+        else:
+            if not isinstance(delay, (int, float)):
+                print("ERROR: Per channel delay needs numpy, using no delay")
+                delay = 0.0
+            diff = [[t - s for s, t in zip(*rows)] for rows in zip(start, target)]
+            fade = (begin, duration + delay, duration, curve,
+                    start, diff, delay, None, None)
+        self.fade = fade
+
+    # CLOCK #
+
+    def tick(self):
+        """Works out the current frame and writes it into the senders."""
+        fade = self.fade
+        if fade is None:
+            return
+        senders, values, output = self.frame
+        if len(fade[4]) != len(senders):
+            # senders changed under a fade
+            return
+        now = monotonic()
+        if np is not None:
+            self.__evaluate_numpy(fade, now, values, output)
+        else:
+            self.__evaluate_lists(fade, now, values, output)
+
+        for sender, row in zip(senders, output):
+            buffer = sender.buffer
+            buffer[:] = memoryview(row)[:len(buffer)]
+            # publishes the frame of double buffered senders
+            sender.commit()
+        self.frames += 1
+
+        if now - fade[0] >= fade[1] and self.fade is fade:
+            self.fade = None
+
+    @staticmethod
+    def __evaluate_numpy(fade, now, values, output):
+        """All channels of all universes in a few array operations."""
+        begin, _, duration, curve, start, diff, delay, progress, scratch = fade
+        np.subtract(now - begin, delay, out=progress)
+        progress /= duration
+        np.clip(progress, 0.0, 1.0, out=progress)
+
+        if curve == LINEAR:
+            eased = progress
+        elif curve == S_CURVE:
+            # 3p^2 - 2p^3
+            eased = scratch
+            np.multiply(progress, -2.0, out=eased)
+            eased += 3.0
+            eased *= progress
+            eased *= progress
+        else:
+            eased = curve(progress)
+
+        np.multiply(diff, eased, out=values)
+        values += start
+        # round to the nearest step, curves may overshoot
+        np.add(values, 0.5, out=progress)
+        np.clip(progress, 0.0, 255.0, out=progress)
+        np.copyto(output, progress, casting='unsafe')
+
+    @staticmethod
+    def __evaluate_lists(fade, now, values, output):
+        """Same as __evaluate_numpy, channel by channel."""
+        begin, _, duration, curve, start, diff, delay, _, _ = fade
+        progress = min(max((now - begin - delay) / duration, 0.0), 1.0)
+        if curve == S_CURVE:
+            progress = progress * progress * (3.0 - 2.0 * progress)
+        for value_row, out_row, start_row, diff_row in zip(values, output, start, diff):
+            for channel in range(CHANNELS):
+                value = start_row[channel] + diff_row[channel] * progress
+                value_row[channel] = value
+                out_row[channel] = int(value + 0.5)
+
+    # THREADING #
+
+    def start(self, scheduler=None):
+        """Runs the fader on a clock, ahead of the senders.
+
+        Senders already started must run on the scheduler given, the
+        fader would otherwise write their buffers off their clock.
+
+        Args:
+        scheduler - FrameScheduler the senders already run on, by
+        default a new one is started at this object's fps and sends
+        all senders of the fader
+
+        Returns:
+        boolean - False if a sender runs on another clock
+
+        """
+        if self.scheduler is not None:
+            return True
+        for sender in self.senders:
+            if sender.scheduler is not None and sender.scheduler is not scheduler:
+                print("ERROR: Sender already runs on another clock, "
+                      "start the fader with its scheduler")
+                return False
+        super().start(scheduler)
+        return True
+
+    def _start_owned(self, scheduler):
+        """Our own clock also sends all senders of the fader."""
+        for sender in self.senders:
+            sender.start(scheduler)
+
+    def _stop_owned(self):
+        """Stops the senders started on our own clock."""
+        for sender in self.senders:
+            sender.stop()
@@ -0,0 +1,282 @@
+"""Counters and timing histograms of the sender and receiver hot paths.
+
+NOTES
+- Pass one ArtnetMetrics as metrics= to senders, servers and frame
+schedulers, they only take timings when one is given
+- Histograms keep counts in fixed buckets, recording a value is a
+bisect and an increment, nothing is allocated
+- Read everything with snapshot(), prometheus() or sinks called by
+publish() (or every interval seconds once started)
+
+"""
+
+import threading
+from bisect import bisect_left
+from time import monotonic
+
+# Bucket upper bounds in seconds, 1us to 10s
+DEFAULT_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6,
+    1e-5, 2.5e-5, 5e-5,
+    1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2,
+    0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0,
+)
+
+
+def label(name, value):
+    """Formats a label once, to be passed along with every count."""
+    return f'{name}="{value}"'
+
+
+class Histogram():
+    """Distribution of a timing, in fixed buckets."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Initializes an empty histogram.
+
+        Args:
+        buckets - sorted bucket upper bounds, a last +Inf bucket is added
+
+        Returns:
+        None
+
+        """
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """Adds one value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding a fraction of the values."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        """Returns count, sum, min, max, mean, p50 and p99 as a dict."""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.percentile(0.50),
+            'p99': self.percentile(0.99),
+        }
+
+
+class ArtnetMetrics():
+    """Collects counters and histograms from the objects it is passed to.
+
+    Names used by the library:
+    Counters - packets_sent, packets_suppressed, packets_received,
+    packets_invalid, packets_other (known opcodes besides ArtDmx),
+    packets_unrouted, packets_stale, packets_duplicate, socket_errors,
+    callback_errors, frames, frames_skipped, sync_frames and
+    listener_packets (labelled by listener)
+    Histograms (seconds) - send_seconds, callback_seconds (labelled by
+    listener), frame_interval_seconds and frame_jitter_seconds
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='stupidartnet'):
+        """Initializes empty metrics.
+
+        Args:
+        buckets - histogram bucket upper bounds in seconds
+        prefix - prepended to names in the prometheus() output
+
+        Returns:
+        None
+
+        """
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        # keyed by (name, label), label is '' or made by label()
+        self.counters = {}
+        self.histograms = {}
+        self.sinks = ()
+        self.start_time = monotonic()
+        self.lock = threading.Lock()
+
+        # Publishing thread
+        self.running = False
+        self.thread = None
+        self.__wake = threading.Event()
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Metrics\n"
+        state += f"Counters: {len(self.counters)} \n"
+        state += f"Histograms: {len(self.histograms)} \n"
+        state += "==================================="
+
+        return state
+
+    def count(self, name, value=1, labels=''):
+        """Adds to a counter.
+
+        Args:
+        name - counter name
+        value - amount to add
+        labels - label string made with label(), '' for none
+
+        Returns:
+        None
+
+        """
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=''):
+        """Records a value, usually seconds, in a histogram.
+
+        Args:
+        name - histogram name
+        value - value to record
+        labels - label string made with label(), '' for none
+
+        Returns:
+        None
+
+        """
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        """Forgets everything counted so far."""
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+            self.start_time = monotonic()
+
+    # OUTPUT #
+
+    @staticmethod
+    def __key(name, labels):
+        """Flat name of a metric, labels in braces."""
+        return f'{name}{{{labels}}}' if labels else name
+
+    def snapshot(self):
+        """Returns the current values.
+
+        Returns:
+        dict - 'uptime' in seconds, 'counters' by name and
+        'histograms' by name as a summary dict, see Histogram.summary.
+        Labelled metrics are named like packets{listener="0"}
+
+        """
+        with self.lock:
+            counters = {self.__key(*key): value for key, value in self.counters.items()}
+            histograms = {self.__key(*key): histogram.summary()
+                          for key, histogram in self.histograms.items()}
+        return {
+            'uptime': monotonic() - self.start_time,
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def prometheus(self):
+        """Returns all metrics in the Prometheus text format."""
+        prefix = f'{self.prefix}_' if self.prefix else ''
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count))
+                                for key, h in self.histograms.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f'{prefix}{name}_total'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{self.__key(metric, labels)} {value}')
+
+        for (name, labels), (counts, total, count) in histograms:
+            metric = f'{prefix}{name}'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} histogram')
+            separator = ',' if labels else ''
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket
+                lines.append(
+                    f'{metric}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.__key(metric + "_sum", labels)} {total}')
+            lines.append(f'{self.__key(metric + "_count", labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def add_sink(self, sink_function):
+        """Adds a function called with snapshot() on every publish()."""
+        # replace rather than mutate, the publish thread may be iterating
+        self.sinks = self.sinks + (sink_function,)
+
+    def remove_sink(self, sink_function):
+        """Removes a function added with add_sink."""
+        self.sinks = tuple(s for s in self.sinks if s != sink_function)
+
+    def publish(self):
+        """Hands a snapshot to every sink."""
+        if not self.sinks:
+            return
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            try:
+                sink(snapshot)
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"ERROR: Metrics sink raised exception: {error}")
+
+    # THREADING #
+
+    def start(self, interval=10.0):
+        """Publishes to the sinks every interval seconds, on a thread."""
+        if self.running:
+            return
+        self.running = True
+        self.__wake = threading.Event()
+        self.thread = threading.Thread(target=self.__run, args=(interval,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the publishing thread and waits for it to exit."""
+        self.running = False
+        self.__wake.set()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def __run(self, interval):
+        """Publishing thread loop."""
+        wake = self.__wake
+        while not wake.wait(interval):
+            self.publish()
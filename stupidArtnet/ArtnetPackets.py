@@ -0,0 +1,182 @@
+"""Decoding of received Art-Net packets, by opcode.
+
+NOTES
+- Every opcode has a precompiled struct and a decoder, looked up in
+a dict by the opcode read from bytes 8 - 9
+- Decoders unpack straight from the datagram, DMX data is handed out
+as a memoryview slice of it, valid only while the datagram is
+- Multi byte fields that Art-Net sends high byte first are split into
+single bytes in the structs and joined here
+
+"""
+
+import socket
+import struct
+from time import monotonic
+
+from stupidArtnet.ArtnetUtils import ARTPOLLREPLY
+
+ARTNET_ID = b'Art-Net\x00'
+
+# Opcodes, sent low byte first
+OP_POLL = 0x2000
+OP_POLL_REPLY = 0x2100
+OP_DMX = 0x5000
+OP_NZS = 0x5100
+OP_SYNC = 0x5200
+OP_TIMECODE = 0x9700
+
+# id, opcode
+HEADER = struct.Struct('<8sH')
+# version hi/lo, sequence, physical or start code, Port-Address,
+# length hi/lo
+ARTDMX = struct.Struct('<10xBBBBHBB')
+# sequence, Port-Address, length hi/lo, all the receive path needs
+ARTDMX_FIELDS = struct.Struct('<12xBxHBB')
+# version hi/lo, aux1, aux2
+ARTSYNC = struct.Struct('<10xBBBB')
+# version hi/lo, flags, diagnostics priority
+ARTPOLL = struct.Struct('<10xBBBB')
+# version hi/lo, filler, stream id, frames, seconds, minutes, hours, type
+ARTTIMECODE = struct.Struct('<10xBBBBBBBBB')
+
+
+def decode_dmx(data):
+    """ArtDmx and ArtNzs, the DMX data as a memoryview."""
+    (version_hi, version_lo, sequence, physical, port_address,
+     length_hi, length_lo) = ARTDMX.unpack_from(data)
+    length = min(length_hi << 8 | length_lo, len(data) - ARTDMX.size, 512)
+    return {
+        'version': version_hi << 8 | version_lo,
+        'sequence': sequence,
+        # physical port for ArtDmx, start code for ArtNzs
+        'physical': physical,
+        'port_address': port_address,
+        'length': length,
+        'data': memoryview(data)[ARTDMX.size:ARTDMX.size + length],
+    }
+
+
+def decode_sync(data):
+    """ArtSync, no fields besides the version."""
+    version_hi, version_lo, _, _ = ARTSYNC.unpack_from(data)
+    return {'version': version_hi << 8 | version_lo}
+
+
+def decode_poll(data):
+    """ArtPoll, what the controller wants to hear about."""
+    version_hi, version_lo, flags, priority = ARTPOLL.unpack_from(data)
+    return {
+        'version': version_hi << 8 | version_lo,
+        'flags': flags,
+        'priority': priority,
+    }
+
+
+def decode_timecode(data):
+    """ArtTimeCode, one timecode frame."""
+    (version_hi, version_lo, _, stream, frames, seconds, minutes, hours,
+     timecode_type) = ARTTIMECODE.unpack_from(data)
+    return {
+        'version': version_hi << 8 | version_lo,
+        'stream': stream,
+        'frames': frames,
+        'seconds': seconds,
+        'minutes': minutes,
+        'hours': hours,
+        # 0 film (24fps), 1 EBU (25fps), 2 DF (29.97fps), 3 SMPTE (30fps)
+        'type': timecode_type,
+    }
+
+
+def parse_artpollreply(data, address=None):
+    """Reads the node details from an ArtPollReply.
+
+    Args:
+    data - received datagram
+    address - (ip, port) it came from, used if the reply has no IP
+
+    Returns:
+    dict - node details, None if data is not an ArtPollReply
+
+    """
+    if len(data) < ARTPOLLREPLY.size:
+        return None
+    (magic, opcode, ip, port, _, _, net, sub, _, _, _, _, _, _, short_name, long_name,
+     _, _, ports, port_types, _, _, sw_in, sw_out, _, _, _, style, mac, _, bind_index,
+     _) = ARTPOLLREPLY.unpack_from(data)
+    if magic != ARTNET_ID or opcode != OP_POLL_REPLY:
+        return None
+
+    ip = socket.inet_ntoa(ip)
+    if ip == '0.0.0.0' and address is not None:
+        ip = address[0]
+    base = (net & 0x7F) << 8 | (sub & 0x0F) << 4
+    ports = min(ports, 4)
+    return {
+        'ip': ip,
+        'port': port,
+        'bind_index': bind_index,
+        'short_name': short_name.split(b'\x00')[0].decode(errors='replace'),
+        'long_name': long_name.split(b'\x00')[0].decode(errors='replace'),
+        'mac': mac,
+        'style': style,
+        # Port-Addresses the node outputs (bit 7) and inputs (bit 6)
+        'outputs': tuple(base | sw_out[i] & 0x0F
+                         for i in range(ports) if port_types[i] & 0x80),
+        'inputs': tuple(base | sw_in[i] & 0x0F
+                        for i in range(ports) if port_types[i] & 0x40),
+        'seen': monotonic(),
+    }
+
+
+def decode_poll_reply(data):
+    """ArtPollReply, see parse_artpollreply."""
+    return parse_artpollreply(data)
+
+
+# opcode -> (name, smallest valid size, decoder)
+PACKET_TYPES = {
+    OP_POLL: ('ArtPoll', ARTPOLL.size, decode_poll),
+    OP_POLL_REPLY: ('ArtPollReply', ARTPOLLREPLY.size, decode_poll_reply),
+    OP_DMX: ('ArtDmx', ARTDMX.size, decode_dmx),
+    OP_NZS: ('ArtNzs', ARTDMX.size, decode_dmx),
+    OP_SYNC: ('ArtSync', ARTSYNC.size, decode_sync),
+    OP_TIMECODE: ('ArtTimeCode', ARTTIMECODE.size, decode_timecode),
+}
+
+
+def read_opcode(data):
+    """Returns the opcode of an Art-Net packet, None if it is not one."""
+    if len(data) < HEADER.size:
+        return None
+    magic, opcode = HEADER.unpack_from(data)
+    if magic != ARTNET_ID:
+        return None
+    return opcode
+
+
+def decode_packet(data):
+    """Decodes any known Art-Net packet.
+
+    Args:
+    data - received datagram
+
+    Returns:
+    dict - 'opcode', 'name' and the fields of that opcode, None if
+    data is not a known Art-Net packet or is too short for its opcode
+
+    """
+    opcode = read_opcode(data)
+    packet_type = PACKET_TYPES.get(opcode)
+    if packet_type is None:
+        return None
+    name, size, decoder = packet_type
+    if len(data) < size:
+        return None
+    packet = decoder(data)
+    if packet is None:
+        return None
+    packet['opcode'] = opcode
+    packet['name'] = name
+    return packet
@@ -0,0 +1,219 @@
+"""Pixel mapping of a 2D LED matrix onto many Art-Net universes.
+
+NOTES
+- The patch (pixel -> sender / DMX address, wiring, colour order) is
+compiled once into a flat index table
+- Each frame is then scattered into every sender buffer with a single
+gather, vectorized with NumPy when available
+- Frames are H x W x 3 RGB, as a NumPy array or raw row major bytes
+
+"""
+
+from operator import itemgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# position of each colour in a pixel of the (extended) frame
+CHANNELS = {'R': 0, 'G': 1, 'B': 2, 'W': 3}
+
+
+class ArtnetPixelMapper():
+    """Maps pixels of a frame onto StupidArtnet senders."""
+
+    def __init__(self, width, height):
+        """Initializes pixel mapper.
+
+        Args:
+        width - frame width in pixels
+        height - frame height in pixels
+
+        Returns:
+        None
+
+        """
+        self.width = width
+        self.height = height
+        self.outputs = []
+        # compiled patch
+        self.table = None
+        self.spans = []
+        self.uses_white = False
+        self.__gather = None
+        self.__out = None
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Pixel Mapper\n"
+        state += f"Frame: {self.width} x {self.height} \n"
+        state += f"Outputs: {len(self.outputs)} \n"
+        state += "==================================="
+
+        return state
+
+    def add_strip(self, sender, pixels, address=1, color_order='RGB'):
+        """Patches a run of pixels to one sender.
+
+        Args:
+        sender - StupidArtnet (or anything with set_range) to write to
+        pixels - (x, y) frame coordinates in wiring order
+        address - DMX address of the first pixel
+        color_order - channel order of a pixel, e.g. 'RGB', 'GRB', 'RGBW'
+
+        Returns:
+        None
+
+        """
+        color_order = color_order.upper()
+        if any(c not in CHANNELS for c in color_order):
+            print("ERROR: Unknown colour in color order")
+            return
+        packet_size = getattr(sender, 'packet_size', 512)
+        if address < 1 or address - 1 + len(pixels) * len(color_order) > packet_size:
+            print("ERROR: Pixels do not fit in the universe")
+            return
+        for x, y in pixels:
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                print("ERROR: Pixel outside of frame")
+                return
+        self.outputs.append({
+            'sender': sender,
+            'pixels': list(pixels),
+            'address': address,
+            'order': color_order,
+        })
+        self.table = None
+
+    def add_matrix(self, senders, x=0, y=0, width=None, height=None,
+                   serpentine=False, color_order='RGB', pixels_per_universe=None):
+        """Patches a rectangle of the frame wired row by row.
+
+        Pixels are taken left to right, top to bottom (every other row
+        reversed when serpentine) and split across the senders in order.
+
+        Args:
+        senders - list of senders, filled one after the other
+        x, y - top left corner of the rectangle
+        width, height - size of the rectangle, defaults to the rest of the frame
+        serpentine - odd rows run right to left
+        color_order - channel order of a pixel, e.g. 'RGB', 'GRB', 'RGBW'
+        pixels_per_universe - pixels per sender, defaults to as many as
+        fit in the packet size of each sender
+
+        Returns:
+        None
+
+        """
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+
+        wiring = []
+        for row in range(height):
+            columns = range(width)
+            if serpentine and row % 2:
+                columns = reversed(columns)
+            wiring.extend((x + column, y + row) for column in columns)
+
+        chunks = []
+        start = 0
+        for sender in senders:
+            if start >= len(wiring):
+                break
+            count = pixels_per_universe
+            if count is None:
+                count = getattr(sender, 'packet_size', 512) // len(color_order)
+            chunks.append(wiring[start:start + count])
+            start += count
+        if start < len(wiring):
+            print("ERROR: Not enough senders for the matrix")
+            return
+        for sender, chunk in zip(senders, chunks):
+            self.add_strip(sender, chunk, 1, color_order)
+
+    def compile(self):
+        """Builds the index table from the patch."""
+        self.uses_white = any('W' in out['order'] for out in self.outputs)
+        depth = 4 if self.uses_white else 3
+
+        table = []
+        self.spans = []
+        for out in self.outputs:
+            start = len(table)
+            for x, y in out['pixels']:
+                base = (y * self.width + x) * depth
+                table.extend(base + CHANNELS[c] for c in out['order'])
+            self.spans.append((out['sender'], out['address'], start, len(table)))
+
+        if np is not None:
+            self.table = np.array(table, dtype=np.intp)
+            self.__out = np.empty(len(table), dtype=np.uint8)
+        else:
+            self.table = table
+            # itemgetter returns a bare value for a single index
+            self.__gather = itemgetter(*table) if len(table) > 1 else \
+                (lambda frame: (frame[table[0]],) if table else ())
+
+    def update(self, frame):
+        """Writes a frame into all patched sender buffers.
+
+        Args:
+        frame - H x W x 3 NumPy array, or H * W * 3 bytes of RGB
+
+        Returns:
+        None
+
+        """
+        if self.table is None:
+            self.compile()
+
+        if np is not None:
+            gathered = self.__gather_numpy(frame)
+        else:
+            gathered = self.__gather_bytes(frame)
+        if gathered is None:
+            return
+
+        data = memoryview(gathered)
+        touched = []
+        for sender, address, start, end in self.spans:
+            sender.set_range(address, data[start:end])
+            if sender not in touched:
+                touched.append(sender)
+        # publishes the frame of double buffered senders
+        for sender in touched:
+            sender.commit()
+
+    def __gather_numpy(self, frame):
+        """Vectorized gather of a frame."""
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            pixels = np.frombuffer(frame, dtype=np.uint8)
+        else:
+            pixels = np.asarray(frame)
+        if pixels.dtype != np.uint8:
+            pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+        if pixels.size != self.width * self.height * 3:
+            print("ERROR: Frame size does not match mapper")
+            return None
+        pixels = pixels.reshape(-1, 3)
+        if self.uses_white:
+            # white channel takes the common part of RGB
+            pixels = np.concatenate(
+                (pixels, pixels.min(axis=1, keepdims=True)), axis=1)
+        return np.take(pixels.reshape(-1), self.table, out=self.__out)
+
+    def __gather_bytes(self, frame):
+        """Gather of a raw RGB frame without NumPy."""
+        frame = bytes(frame)
+        if len(frame) != self.width * self.height * 3:
+            print("ERROR: Frame size does not match mapper")
+            return None
+        if self.uses_white:
+            rgbw = bytearray(len(frame) // 3 * 4)
+            for i in range(len(frame) // 3):
+                red, green, blue = frame[3 * i:3 * i + 3]
+                rgbw[4 * i:4 * i + 4] = bytes((red, green, blue, min(red, green, blue)))
+            frame = rgbw
+        return bytes(self.__gather(frame))
@@ -0,0 +1,398 @@
+"""Recording of Art-Net packets to a file, and replay of recordings.
+
+NOTES
+- File: header | records | index | trailer
+- A record is the time since the recording started, the packet length
+and the raw packet as received
+- The index holds (time, offset) pairs every index_interval seconds, so
+playback can seek without reading the whole file. The interval is kept in
+the header, to rebuild the index the same way if the recorder never closed
+- Recordings are written in large buffered blocks and played back from
+a memory map, they never need to fit in RAM
+
+"""
+
+import os
+import mmap
+import socket
+import struct
+import threading
+from bisect import bisect_right
+from time import monotonic, sleep
+
+from stupidArtnet.StupidArtnet import StupidArtnet
+from stupidArtnet.ArtnetSocket import BatchSender
+
+MAGIC = b'StupidAR'
+VERSION = 1
+# magic, version, index interval
+FILE_HEADER = struct.Struct('<8sH2xf')
+# seconds since start, packet length
+RECORD = struct.Struct('<dH')
+# seconds since start, file offset of the first record at that time
+INDEX_ENTRY = struct.Struct('<dQ')
+# index offset, index entries, record count, time of the last record, magic
+TRAILER = struct.Struct('<QQQd8s')
+INDEX_MAGIC = b'StupidAI'
+# Seconds between seek points, also for files that do not say
+INDEX_INTERVAL = 0.1
+
+# Play back as fast as packets can be sent
+AS_FAST_AS_POSSIBLE = 0
+
+
+class ArtnetRecorder():
+    """Appends Art-Net packets to a recording file."""
+
+    def __init__(self, path, buffer_size=1 << 20, index_interval=INDEX_INTERVAL):
+        """Creates a new recording.
+
+        Args:
+        path - file to write, replaced if it exists
+        buffer_size - bytes collected before they are written to disk
+        index_interval - seconds between seek points in the index
+
+        Returns:
+        None
+
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        header = FILE_HEADER.pack(MAGIC, VERSION, index_interval)
+        # as read back by the player, which may rebuild the index
+        self.index_interval = FILE_HEADER.unpack(header)[2]
+        self.file = open(path, 'wb')  # pylint: disable=consider-using-with
+        self.file.write(header)
+        self.offset = FILE_HEADER.size
+        self.buffer = bytearray()
+        self.index = []
+        self.count = 0
+        self.start_time = None
+        self.last_time = 0.0
+        self.next_index = 0.0
+        self.server = None
+        self.lock = threading.Lock()
+
+    def __del__(self):
+        """Graceful shutdown."""
+        self.close()
+
+    def __enter__(self):
+        """Context manager, closes the recording on exit."""
+        return self
+
+    def __exit__(self, *args):
+        """Context manager, closes the recording on exit."""
+        self.close()
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Recorder\n"
+        state += f"File: {self.path} \n"
+        state += f"Packets: {self.count} \n"
+        state += "==================================="
+
+        return state
+
+    def record(self, server):
+        """Records every ArtDmx packet a StupidArtnetServer receives."""
+        self.server = server
+        server.add_tap(self.write)
+
+    def write(self, packet, unused_address=None, timestamp=None):
+        """Appends one packet.
+
+        Args:
+        packet - raw Art-Net packet
+        unused_address - sender address, so write can be used as a tap
+        timestamp - time.monotonic() of arrival, default now
+
+        Returns:
+        None
+
+        """
+        if timestamp is None:
+            timestamp = monotonic()
+        with self.lock:
+            if self.file is None:
+                return
+            if self.start_time is None:
+                self.start_time = timestamp
+            elapsed = timestamp - self.start_time
+            if elapsed >= self.next_index:
+                self.index.append((elapsed, self.offset + len(self.buffer)))
+                self.next_index = elapsed + self.index_interval
+            self.last_time = elapsed
+            self.buffer += RECORD.pack(elapsed, len(packet))
+            self.buffer += packet
+            self.count += 1
+            if len(self.buffer) >= self.buffer_size:
+                self.__flush()
+
+    def __flush(self):
+        """Writes the buffered records in one go."""
+        self.file.write(self.buffer)
+        self.offset += len(self.buffer)
+        self.buffer = bytearray()
+
+    def close(self):
+        """Stops recording, writes index and closes the file."""
+        if self.server is not None:
+            self.server.remove_tap(self.write)
+            self.server = None
+        with self.lock:
+            if self.file is None:
+                return
+            self.__flush()
+            index_offset = self.offset
+            self.file.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in self.index))
+            self.file.write(TRAILER.pack(index_offset, len(self.index), self.count,
+                                         self.last_time, INDEX_MAGIC))
+            self.file.close()
+            self.file = None
+
+
+class ArtnetPlayer():
+    """Sends the packets of a recording again, with their timing."""
+
+    def __init__(self, path, target_ip='127.0.0.1', port=6454, speed=1.0,
+                 broadcast=False, source_address=None, use_sendmmsg=True, batch_size=512):
+        """Opens a recording for playback.
+
+        Args:
+        path - recording made by ArtnetRecorder
+        target_ip - IP packets are sent to
+        port - UDP port packets are sent to (default: 6454)
+        speed - 1 plays in real time, 2 twice as fast and so on,
+        AS_FAST_AS_POSSIBLE (0) ignores the timing
+        broadcast - whether to broadcast in local sub
+        source_address - (ip, port) to bind the socket to
+        use_sendmmsg - batch packets due together into one system call
+        batch_size - most packets sent with one call
+
+        Returns:
+        None
+
+        """
+        self.path = path
+        self.address = (target_ip, port)
+        self.speed = speed
+        self.batch_size = batch_size
+        self.packets_sent = 0
+        self.position = 0.0
+        self.socket_client = None
+
+        # Playback thread
+        self.running = False
+        self.thread = None
+
+        self.map = None
+        self.view = None
+        self.file = open(path, 'rb')  # pylint: disable=consider-using-with
+        # empty or truncated files cannot be mapped or have no header
+        if os.fstat(self.file.fileno()).st_size < FILE_HEADER.size:
+            self.close()
+            raise ValueError("Not an Art-Net recording")
+        # copy on write, so the batch sender can point at packets in place
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.view = memoryview(self.map)
+        magic, version, index_interval = FILE_HEADER.unpack_from(self.view, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Not an Art-Net recording")
+        self.index_interval = index_interval or INDEX_INTERVAL
+
+        self.end = len(self.map)
+        self.count = None
+        self.duration = 0.0
+        self.index_times = []
+        self.index_offsets = []
+        self.__read_index()
+        self.offset = FILE_HEADER.size
+
+        # UDP SOCKET, set up as for a sender
+        self.socket_client = StupidArtnet._make_socket(broadcast, source_address)
+        self.batch = BatchSender(self.socket_client, use_sendmmsg)
+
+    def __del__(self):
+        """Graceful shutdown."""
+        self.stop()
+        self.close()
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Player\n"
+        state += f"File: {self.path} \n"
+        state += f"Target: {self.address[0]} : {self.address[1]} \n"
+        state += f"Duration: {self.duration:.2f} s \n"
+        state += "==================================="
+
+        return state
+
+    def __read_index(self):
+        """Loads the index, or rebuilds it from an unfinished recording."""
+        if self.end >= FILE_HEADER.size + TRAILER.size:
+            index_offset, entries, count, duration, magic = TRAILER.unpack_from(
+                self.view, self.end - TRAILER.size)
+            if magic == INDEX_MAGIC:
+                for time, offset in INDEX_ENTRY.iter_unpack(
+                        self.view[index_offset:index_offset + entries * INDEX_ENTRY.size]):
+                    self.index_times.append(time)
+                    self.index_offsets.append(offset)
+                self.end = index_offset
+                self.count = count
+                self.duration = duration
+                return
+
+        # no trailer, the recorder did not close: walk the records
+        offset = FILE_HEADER.size
+        count = 0
+        while offset + RECORD.size <= self.end:
+            time, length = RECORD.unpack_from(self.view, offset)
+            if offset + RECORD.size + length > self.end:
+                break
+            if not self.index_times or time >= self.index_times[-1] + self.index_interval:
+                self.index_times.append(time)
+                self.index_offsets.append(offset)
+            offset += RECORD.size + length
+            count += 1
+            self.duration = time
+        self.end = offset
+        self.count = count
+
+    def __records(self):
+        """Yields (time, packet view) from the current offset.
+
+        The offset only moves on once the caller asks for the next record,
+        so playback stopped at a record resumes with it.
+        """
+        view = self.view
+        while self.offset < self.end:
+            time, length = RECORD.unpack_from(view, self.offset)
+            start = self.offset + RECORD.size
+            yield time, view[start:start + length]
+            self.offset = start + length
+
+    def seek(self, position):
+        """Moves playback to a time in the recording.
+
+        Args:
+        position - seconds from the start of the recording
+
+        Returns:
+        None
+
+        """
+        point = bisect_right(self.index_times, position) - 1
+        self.offset = self.index_offsets[point] if point >= 0 else FILE_HEADER.size
+        # walk from the seek point to the first packet at or past position
+        while self.offset < self.end:
+            time, length = RECORD.unpack_from(self.view, self.offset)
+            if time >= position:
+                break
+            self.offset += RECORD.size + length
+        self.position = position
+
+    def play(self, start=None, end=None):
+        """Plays the recording, blocks until done or stop() is called.
+
+        Args:
+        start - seconds to seek to first, None continues from here
+        end - seconds to stop at, None plays to the end
+
+        Returns:
+        int - number of packets sent
+
+        """
+        if start is not None:
+            self.seek(start)
+        self.running = True
+        sent = 0
+        batch = []
+        speed = self.speed
+        begin = None
+        first = 0.0
+
+        for time, packet in self.__records():
+            if not self.running or (end is not None and time > end):
+                packet.release()
+                break
+            if begin is None:
+                begin = monotonic()
+                first = time
+
+            if speed != AS_FAST_AS_POSSIBLE:
+                wait = begin + (time - first) / speed - monotonic()
+                if wait > 0:
+                    # send what is due before waiting for the next packet
+                    sent += self.__send(batch)
+                    batch = []
+                    while wait > 0 and self.running:
+                        sleep(min(wait, 0.1))
+                        wait = begin + (time - first) / speed - monotonic()
+                    if not self.running:
+                        # not sent, play() continues with this packet
+                        packet.release()
+                        break
+
+            batch.append(packet)
+            self.position = time
+            if len(batch) >= self.batch_size:
+                sent += self.__send(batch)
+                batch = []
+
+        sent += self.__send(batch)
+        self.running = False
+        return sent
+
+    def __send(self, batch):
+        """Sends a batch of packets in as few calls as possible."""
+        if not batch:
+            return 0
+        try:
+            sent = self.batch.send_packets(batch, [self.address] * len(batch))
+        except socket.error as error:
+            print(f"ERROR: Socket error with exception: {error}")
+            sent = 0
+        finally:
+            # let go of the views into the file
+            self.batch.prepare([], [])
+            for packet in batch:
+                packet.release()
+        self.packets_sent += sent
+        return sent
+
+    # THREADING #
+
+    def start(self, start=None, end=None):
+        """Plays the recording on a background thread."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.play, args=(start, end), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops playback and waits for the thread to finish."""
+        self.running = False
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def close(self):
+        """Close UDP socket and the recording."""
+        if self.socket_client is not None:
+            self.socket_client.close()
+            self.socket_client = None
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,251 @@
+"""Precompiled cues, recalled into many senders with a few copies.
+
+NOTES
+- A cue is one contiguous block of bytes holding the channels it sets
+in every universe, plus the runs saying where each part goes
+- Partial cues come from channel masks, compiled into runs of
+consecutive channels once, when the cue is stored
+- Recall copies each run into its sender buffer, nothing is converted
+- Cues are kept in least recently used order, the oldest are dropped
+once the store grows past max_bytes or max_cues. A loader can bring
+dropped cues back on demand
+
+"""
+
+import threading
+from collections import OrderedDict
+from stupidArtnet.ArtnetUtils import to_dmx_bytes
+
+# Rough bytes per run and per cue besides the block, for max_bytes
+RUN_OVERHEAD = 72
+CUE_OVERHEAD = 200
+
+
+class ArtnetSceneStore():
+    """Cue snapshots of a group of senders, in a bounded cache."""
+
+    def __init__(self, senders=(), max_bytes=64 << 20, max_cues=None, loader=None):
+        """Initializes scene store.
+
+        Args:
+        senders - StupidArtnet objects cues are stored from and recalled to
+        max_bytes - memory the cues may use before the least recently
+        used are dropped
+        max_cues - most cues kept, None for no limit
+        loader - function taking a cue name and returning (scene, mask)
+        as for store(), or None, called when a recalled cue is not held
+
+        Returns:
+        None
+
+        """
+        self.senders = []
+        self.max_bytes = max_bytes
+        self.max_cues = max_cues
+        self.loader = loader
+        # name -> (block, runs), oldest first
+        self.cues = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        for sender in senders:
+            self.add(sender)
+
+    def __len__(self):
+        """Number of cues held."""
+        return len(self.cues)
+
+    def __contains__(self, name):
+        """Whether a cue is held, without loading it."""
+        return name in self.cues
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Scene Store\n"
+        state += f"Senders: {len(self.senders)} \n"
+        state += f"Cues: {len(self.cues)} \n"
+        state += f"Memory: {self.bytes} / {self.max_bytes} bytes \n"
+        state += "==================================="
+
+        return state
+
+    def add(self, sender):
+        """Adds a sender, cues stored before do not touch it."""
+        if sender not in self.senders:
+            self.senders.append(sender)
+
+    # STORE #
+
+    def store(self, name, scene=None, mask=None):
+        """Stores a cue, replacing any cue of the same name.
+
+        Args:
+        name - any hashable cue name
+        scene - one sequence of channel values per sender (bytes, list
+        or NumPy array, None leaves the sender out), by default what is
+        in the sender buffers now
+        mask - one entry per sender: True for every channel, None to
+        leave the sender out, or the channel addresses (1 - 512) the
+        cue sets. By default every channel of every sender in scene
+
+        Returns:
+        boolean - False if scene or mask do not match the senders
+
+        """
+        cue = self.__compile(scene, mask)
+        if cue is None:
+            return False
+        with self.lock:
+            self.__put(name, cue)
+        return True
+
+    def __compile(self, scene, mask):
+        """Builds the (block, runs) of a cue."""
+        senders = self.senders
+        if scene is None:
+            scene = [sender.buffer for sender in senders]
+        if len(scene) != len(senders):
+            print("ERROR: Scene does not match number of senders")
+            return None
+        if mask is None:
+            mask = [True if row is not None else None for row in scene]
+        if len(mask) != len(senders):
+            print("ERROR: Mask does not match number of senders")
+            return None
+
+        runs = []
+        parts = []
+        offset = 0
+        for index, (row, channels) in enumerate(zip(scene, mask)):
+            if row is None or channels is None:
+                continue
+            row = to_dmx_bytes(row)
+            if channels is True:
+                spans = [(0, len(row))]
+            else:
+                spans = self.__spans(channels, len(row))
+            for start, length in spans:
+                runs.append((index, start, offset, length))
+                parts.append(bytes(row[start:start + length]))
+                offset += length
+        return b''.join(parts), tuple(runs)
+
+    @staticmethod
+    def __spans(channels, size):
+        """(start, length) runs of consecutive channels, 0 based."""
+        spans = []
+        for channel in sorted({c - 1 for c in channels if 0 < c <= size}):
+            if spans and spans[-1][0] + spans[-1][1] == channel:
+                spans[-1][1] += 1
+            else:
+                spans.append([channel, 1])
+        return [tuple(span) for span in spans]
+
+    def __put(self, name, cue):
+        """Adds a compiled cue and drops old ones past the limits."""
+        old = self.cues.pop(name, None)
+        if old is not None:
+            self.bytes -= self.__size(old)
+        self.cues[name] = cue
+        self.bytes += self.__size(cue)
+
+        # the cue just stored is always kept
+        while len(self.cues) > 1 and (
+                self.bytes > self.max_bytes or
+                (self.max_cues is not None and len(self.cues) > self.max_cues)):
+            _, dropped = self.cues.popitem(last=False)
+            self.bytes -= self.__size(dropped)
+            self.evictions += 1
+
+    @staticmethod
+    def __size(cue):
+        """Memory a cue is counted as."""
+        block, runs = cue
+        return CUE_OVERHEAD + len(block) + RUN_OVERHEAD * len(runs)
+
+    # RECALL #
+
+    def recall(self, name, commit=True):
+        """Copies a cue into the sender buffers.
+
+        Args:
+        name - cue to recall
+        commit - commit() the senders touched, so send on change and
+        double buffered senders pick the cue up
+
+        Returns:
+        boolean - False if the cue is not held and could not be loaded
+
+        """
+        with self.lock:
+            cue = self.cues.get(name)
+            if cue is not None:
+                self.cues.move_to_end(name)
+                self.hits += 1
+        if cue is None:
+            self.misses += 1
+            cue = self.__load(name)
+            if cue is None:
+                print("ERROR: Cue not found")
+                return False
+
+        block, runs = cue
+        view = memoryview(block)
+        senders = self.senders
+        touched = []
+        for index, start, offset, length in runs:
+            sender = senders[index]
+            buffer = sender.buffer
+            # never resize a buffer that shrank since the cue was stored
+            length = min(length, len(buffer) - start)
+            if length <= 0:
+                continue
+            buffer[start:start + length] = view[offset:offset + length]
+            if not touched or touched[-1] is not sender:
+                touched.append(sender)
+        view.release()
+
+        if commit:
+            for sender in touched:
+                sender.commit()
+        return True
+
+    def __load(self, name):
+        """Compiles a cue the loader knows, None if it does not."""
+        if self.loader is None:
+            return None
+        loaded = self.loader(name)
+        if loaded is None:
+            return None
+        cue = self.__compile(*loaded)
+        if cue is not None:
+            with self.lock:
+                self.__put(name, cue)
+        return cue
+
+    def delete(self, name):
+        """Drops a cue."""
+        with self.lock:
+            cue = self.cues.pop(name, None)
+            if cue is not None:
+                self.bytes -= self.__size(cue)
+
+    def clear(self):
+        """Drops all cues."""
+        with self.lock:
+            self.cues = OrderedDict()
+            self.bytes = 0
+
+    def get_stats(self):
+        """Returns cues held, memory counted, hits, misses and evictions."""
+        return {
+            'cues': len(self.cues),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
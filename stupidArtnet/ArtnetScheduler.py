@@ -0,0 +1,249 @@
+"""Drift compensated frame clock for Art-Net senders.
+
+NOTES
+- One long lived thread ticks at absolute deadlines (start + n * period)
+on a monotonic clock, time spent sending does not add up as drift
+- Late frames are either caught up or skipped, see policies below
+- Several senders can share the same scheduler
+
+"""
+
+import threading
+from collections import deque
+from time import monotonic
+
+# Run missed frames back to back (up to max_catch_up) to keep the count
+CATCH_UP = 'catch_up'
+# Drop missed frames and realign to the next deadline
+SKIP = 'skip'
+
+
+class FrameScheduler():
+    """Calls registered callbacks once per frame on a single thread."""
+
+    def __init__(self, fps=30, policy=SKIP, max_catch_up=4, history=1000, metrics=None):
+        """Initializes frame scheduler.
+
+        Args:
+        fps - frames per second
+        policy - CATCH_UP or SKIP, what to do with frames we are late for
+        max_catch_up - most frames run back to back before skipping anyway
+        history - number of frame intervals kept for jitter statistics
+        metrics - ArtnetMetrics recording frame intervals and jitter
+
+        Returns:
+        None
+
+        """
+        self.fps = max(fps, 1)
+        self.period = 1.0 / self.fps
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.callbacks = ()
+        self.intervals = deque(maxlen=history)
+        self.frames = 0
+        self.skipped = 0
+        self.metrics = metrics
+        self.running = False
+        self.thread = None
+        self.__wake = threading.Event()
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Frame Scheduler\n"
+        state += f"FPS: {self.fps} \n"
+        state += f"Policy: {self.policy} \n"
+        state += f"Callbacks: {len(self.callbacks)} \n"
+        state += "==================================="
+
+        return state
+
+    def add(self, callback, first=False):
+        """Adds a function to call on every frame.
+
+        Args:
+        callback - function without arguments
+        first - run before the callbacks already added, e.g. to fill
+        buffers before the senders go out
+
+        Returns:
+        None
+
+        """
+        # replace rather than mutate, the clock thread may be iterating
+        if first:
+            self.callbacks = (callback,) + self.callbacks
+        else:
+            self.callbacks = self.callbacks + (callback,)
+
+    def remove(self, callback):
+        """Removes a function added with add()."""
+        self.callbacks = tuple(c for c in self.callbacks if c != callback)
+
+    def start(self):
+        """Starts clock thread."""
+        if self.running:
+            return
+        self.running = True
+        self.__wake = threading.Event()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """Stops clock thread and waits for it to exit.
+
+        Args:
+        timeout - seconds to wait for the thread, None waits until done
+
+        Returns:
+        None
+
+        """
+        self.running = False
+        self.__wake.set()
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def tick(self):
+        """Runs all callbacks once."""
+        for callback in self.callbacks:
+            try:
+                callback()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"ERROR: Frame callback raised exception: {error}")
+                if self.metrics is not None:
+                    self.metrics.count('callback_errors')
+
+    def __run(self):
+        """Clock thread loop."""
+        wake = self.__wake
+        period = self.period
+        deadline = monotonic()
+        last_tick = None
+
+        while self.running:
+            now = monotonic()
+            if now < deadline:
+                wake.wait(deadline - now)
+                continue
+
+            metrics = self.metrics
+            if last_tick is not None:
+                interval = now - last_tick
+                self.intervals.append(interval)
+                if metrics is not None:
+                    metrics.observe('frame_interval_seconds', interval)
+                    metrics.observe('frame_jitter_seconds', abs(interval - period))
+            last_tick = now
+            self.tick()
+            self.frames += 1
+            if metrics is not None:
+                metrics.count('frames')
+
+            deadline += period
+            late = monotonic() - deadline
+            if late >= 0:
+                missed = int(late / period) + 1
+                if self.policy == CATCH_UP:
+                    # run what we can right away, drop the rest
+                    missed = max(missed - self.max_catch_up, 0)
+                deadline += missed * period
+                self.skipped += missed
+                if metrics is not None and missed:
+                    metrics.count('frames_skipped', missed)
+
+    def get_jitter_stats(self):
+        """Returns frame interval statistics in seconds.
+
+        Returns:
+        dict - period, count, mean, min, max, p50 and p99 of the
+        measured frame intervals, plus frames run and skipped
+
+        """
+        intervals = sorted(self.intervals)
+        stats = {
+            'period': self.period,
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'count': len(intervals),
+        }
+        if not intervals:
+            return stats
+
+        def percentile(fraction):
+            index = min(int(fraction * len(intervals)), len(intervals) - 1)
+            return intervals[index]
+
+        stats.update({
+            'mean': sum(intervals) / len(intervals),
+            'min': intervals[0],
+            'max': intervals[-1],
+            'p50': percentile(0.50),
+            'p99': percentile(0.99),
+        })
+        return stats
+
+
+class Scheduled():
+    """Runs one method of an object on a FrameScheduler.
+
+    Shared by everything with start(scheduler) / stop(), so owning and
+    stopping the clock works the same everywhere. Users set fps and the
+    running, scheduler and owns_scheduler attributes in __init__, and
+    name the method called every frame in FRAME_METHOD.
+    """
+
+    FRAME_METHOD = 'tick'
+    # run before callbacks already on the scheduler
+    FRAME_FIRST = False
+    metrics = None
+
+    def start(self, scheduler=None):
+        """Starts thread clock.
+
+        Args:
+        scheduler - FrameScheduler to share with other senders, by
+        default a new one is started at this object's fps
+
+        Returns:
+        None
+
+        """
+        if self.scheduler is not None:
+            return
+        self.owns_scheduler = scheduler is None
+        if scheduler is None:
+            scheduler = FrameScheduler(self.fps, metrics=self.metrics)
+        self.scheduler = scheduler
+        self.running = True
+        scheduler.add(getattr(self, self.FRAME_METHOD), first=self.FRAME_FIRST)
+        if self.owns_scheduler:
+            self._start_owned(scheduler)
+            scheduler.start()
+
+    def stop(self):
+        """Stops and joins the clock thread if we own it."""
+        self.running = False
+        scheduler = self.scheduler
+        if scheduler is None:
+            return
+        self.scheduler = None
+        scheduler.remove(getattr(self, self.FRAME_METHOD))
+        if self.owns_scheduler:
+            self.owns_scheduler = False
+            self._stop_owned()
+            scheduler.stop()
+
+    def _start_owned(self, scheduler):
+        """Called before a clock started by this object begins."""
+
+    def _stop_owned(self):
+        """Called before a clock started by this object stops."""
+
+    def get_jitter_stats(self):
+        """Frame interval statistics of the running clock, see FrameScheduler."""
+        if self.scheduler is None:
+            return {}
+        return self.scheduler.get_jitter_stats()
@@ -0,0 +1,308 @@
+"""Batched socket helpers for sending and receiving many Art-Net packets.
+
+On Linux a whole frame of datagrams is handed to the kernel with a
+single sendmmsg(2) call, and a burst of queued datagrams is drained with
+a single recvmmsg(2) call. Where those are not available (other
+platforms, micropython, no ctypes) plain sendto / recvfrom_into loops
+are used instead.
+
+"""
+
+import os
+import errno
+import select
+import socket
+import struct
+
+try:
+    import ctypes
+
+    class _IoVec(ctypes.Structure):
+        """struct iovec"""
+        _fields_ = [('iov_base', ctypes.c_void_p),
+                    ('iov_len', ctypes.c_size_t)]
+
+    class _MsgHdr(ctypes.Structure):
+        """struct msghdr"""
+        _fields_ = [('msg_name', ctypes.c_void_p),
+                    ('msg_namelen', ctypes.c_uint32),
+                    ('msg_iov', ctypes.POINTER(_IoVec)),
+                    ('msg_iovlen', ctypes.c_size_t),
+                    ('msg_control', ctypes.c_void_p),
+                    ('msg_controllen', ctypes.c_size_t),
+                    ('msg_flags', ctypes.c_int)]
+
+    class _MMsgHdr(ctypes.Structure):
+        """struct mmsghdr"""
+        _fields_ = [('msg_hdr', _MsgHdr),
+                    ('msg_len', ctypes.c_uint)]
+
+    _LIBC = ctypes.CDLL(None, use_errno=True)
+    _SENDMMSG = _LIBC.sendmmsg
+    _SENDMMSG.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                          ctypes.c_uint, ctypes.c_int]
+    _SENDMMSG.restype = ctypes.c_int
+except (ImportError, OSError, AttributeError, TypeError):
+    _SENDMMSG = None
+
+try:
+    _RECVMMSG = _LIBC.recvmmsg
+    _RECVMMSG.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                          ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    _RECVMMSG.restype = ctypes.c_int
+except (NameError, AttributeError):
+    _RECVMMSG = None
+
+HAS_SENDMMSG = _SENDMMSG is not None
+HAS_RECVMMSG = _RECVMMSG is not None
+
+
+def make_sockaddr(address):
+    """Packs an (ip, port) tuple into a struct sockaddr_in.
+
+    Args:
+    address - (ip, port) tuple, ip may be a host name
+
+    Returns:
+    bytes - 16 byte sockaddr_in
+
+    """
+    host, port = address
+    return (struct.pack('=H', socket.AF_INET) + struct.pack('!H', port) +
+            socket.inet_aton(socket.gethostbyname(host)) + bytes(8))
+
+
+class BatchSender():
+    """Sends a list of datagrams with as few system calls as possible."""
+
+    def __init__(self, sock, use_sendmmsg=True):
+        """Initializes batch sender.
+
+        Args:
+        sock - UDP socket to send with
+        use_sendmmsg - use sendmmsg(2) when the platform has it
+
+        Returns:
+        None
+
+        """
+        self.sock = sock
+        self.use_sendmmsg = use_sendmmsg and HAS_SENDMMSG
+        self.packets = []
+        self.addresses = []
+        # ctypes objects must outlive the message vector pointing at them
+        self._keep_alive = []
+        self._msgs = None
+
+    def prepare(self, packets, addresses):
+        """Sets the datagrams sent by every call to send().
+
+        Writable buffers (bytearray, memoryview of a bytearray) are
+        referenced in place, so later changes to them go out on the
+        next send() without preparing again.
+
+        Args:
+        packets - list of buffers, one per datagram
+        addresses - list of (ip, port) tuples, one per datagram
+
+        Returns:
+        None
+
+        """
+        self.packets = list(packets)
+        self.addresses = list(addresses)
+        self._keep_alive = []
+        self._msgs = None
+        if not self.use_sendmmsg or not self.packets:
+            return
+
+        count = len(self.packets)
+        msgs = (_MMsgHdr * count)()
+        iovecs = (_IoVec * count)()
+        names = {}
+        for i, (packet, address) in enumerate(zip(self.packets, self.addresses)):
+            try:
+                data = (ctypes.c_char * len(packet)).from_buffer(packet)
+            except TypeError:
+                # read only buffers are copied once here
+                data = (ctypes.c_char * len(packet)).from_buffer_copy(packet)
+            if address not in names:
+                names[address] = ctypes.create_string_buffer(
+                    make_sockaddr(address), 16)
+            name = names[address]
+            self._keep_alive.append(data)
+
+            iovecs[i].iov_base = ctypes.addressof(data)
+            iovecs[i].iov_len = len(packet)
+            hdr = msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(name)
+            hdr.msg_namelen = 16
+            hdr.msg_iov = ctypes.pointer(iovecs[i])
+            hdr.msg_iovlen = 1
+
+        self._keep_alive.extend(names.values())
+        self._keep_alive.append(iovecs)
+        self._msgs = msgs
+
+    def send(self):
+        """Sends every prepared datagram.
+
+        Returns:
+        int - number of datagrams sent
+
+        Raises:
+        OSError - on socket errors, same as socket.sendto
+
+        """
+        if self._msgs is None:
+            for packet, address in zip(self.packets, self.addresses):
+                self.sock.sendto(packet, address)
+            return len(self.packets)
+
+        count = len(self.packets)
+        size = ctypes.sizeof(_MMsgHdr)
+        fileno = self.sock.fileno()
+        sent = 0
+        while sent < count:
+            result = _SENDMMSG(
+                fileno,
+                ctypes.cast(ctypes.addressof(self._msgs) + sent * size,
+                            ctypes.POINTER(_MMsgHdr)),
+                count - sent, 0)
+            if result < 0:
+                error = ctypes.get_errno()
+                if error == errno.EINTR:
+                    continue
+                raise OSError(error, os.strerror(error))
+            sent += result
+        return sent
+
+    def send_packets(self, packets, addresses):
+        """Prepares and sends a one-off list of datagrams.
+
+        Args:
+        packets - list of buffers, one per datagram
+        addresses - list of (ip, port) tuples, one per datagram
+
+        Returns:
+        int - number of datagrams sent
+
+        """
+        self.prepare(packets, addresses)
+        return self.send()
+
+
+class BatchReceiver():
+    """Drains queued datagrams into a preallocated ring of buffers.
+
+    The socket is switched to non blocking mode. Each receive() waits
+    for the first datagram and then takes everything else already queued
+    in the kernel, up to the ring size, without allocating new buffers.
+    Received data is valid until the next call to receive().
+    """
+
+    def __init__(self, sock, ring_size=64, packet_size=1024, use_recvmmsg=True):
+        """Initializes batch receiver.
+
+        Args:
+        sock - bound UDP socket to receive from
+        ring_size - most datagrams taken per receive()
+        packet_size - size of each buffer, longer datagrams are truncated
+        use_recvmmsg - use recvmmsg(2) when the platform has it
+
+        Returns:
+        None
+
+        """
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.ring_size = max(ring_size, 1)
+        self.buffers = [bytearray(packet_size) for _ in range(self.ring_size)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+        self.sizes = [0] * self.ring_size
+        self.addresses = [None] * self.ring_size
+        self.use_recvmmsg = use_recvmmsg and HAS_RECVMMSG and self.ring_size > 1
+        self._msgs = None
+        self._names = None
+        self._keep_alive = []
+
+        if self.use_recvmmsg:
+            self.__prepare()
+
+    def __prepare(self):
+        """Points a message vector at ring slots 1 and up."""
+        count = self.ring_size - 1
+        msgs = (_MMsgHdr * count)()
+        iovecs = (_IoVec * count)()
+        names = [ctypes.create_string_buffer(16) for _ in range(count)]
+        for i in range(count):
+            buffer = self.buffers[i + 1]
+            data = (ctypes.c_char * len(buffer)).from_buffer(buffer)
+            self._keep_alive.append(data)
+            iovecs[i].iov_base = ctypes.addressof(data)
+            iovecs[i].iov_len = len(buffer)
+            hdr = msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(names[i])
+            hdr.msg_iov = ctypes.pointer(iovecs[i])
+            hdr.msg_iovlen = 1
+        self._keep_alive.append(iovecs)
+        self._names = names
+        self._msgs = msgs
+
+    def receive(self, timeout=None):
+        """Waits for datagrams and takes all that are queued.
+
+        Args:
+        timeout - seconds to wait for the first datagram, None waits forever
+
+        Returns:
+        int - number of datagrams now in the ring, 0 on timeout
+
+        """
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return 0
+        try:
+            self.sizes[0], self.addresses[0] = self.sock.recvfrom_into(
+                self.buffers[0])
+        except BlockingIOError:
+            return 0
+        if self.ring_size == 1:
+            return 1
+        if self._msgs is not None:
+            return 1 + self.__drain_mmsg()
+        return 1 + self.__drain_loop()
+
+    def __drain_loop(self):
+        """Takes queued datagrams one recvfrom_into call at a time."""
+        count = 0
+        for i in range(1, self.ring_size):
+            try:
+                self.sizes[i], self.addresses[i] = self.sock.recvfrom_into(
+                    self.buffers[i])
+            except (BlockingIOError, InterruptedError):
+                break
+            count += 1
+        return count
+
+    def __drain_mmsg(self):
+        """Takes queued datagrams with a single recvmmsg call."""
+        msgs = self._msgs
+        for msg in msgs:
+            msg.msg_hdr.msg_namelen = 16
+        result = _RECVMMSG(self.sock.fileno(), msgs, len(msgs), 0, None)
+        if result < 0:
+            error = ctypes.get_errno()
+            if error in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return 0
+            raise OSError(error, os.strerror(error))
+        for i in range(result):
+            self.sizes[i + 1] = msgs[i].msg_len
+            raw = self._names[i].raw
+            self.addresses[i + 1] = (socket.inet_ntoa(raw[4:8]),
+                                     struct.unpack_from('!H', raw, 2)[0])
+        return result
+
+    def packet(self, index):
+        """Returns a view of a received datagram."""
+        return self.views[index][:self.sizes[index]]
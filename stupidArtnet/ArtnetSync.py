@@ -0,0 +1,121 @@
+"""Frame commits latched with a single ArtSync.
+
+NOTES
+- All ArtDmx packets of a frame go out first, then exactly one ArtSync
+per destination, so receivers output every universe at the same time
+- The ArtSync packet never changes and is built once
+- Works with any StupidArtnet sender, including the asyncio one
+
+"""
+
+import socket
+import weakref
+from stupidArtnet.ArtnetScheduler import Scheduled
+from stupidArtnet.ArtnetUtils import make_artsync_header
+
+
+class ArtnetSyncGroup(Scheduled):
+    """Sends the universes of many senders as one synchronised frame."""
+
+    # run by start(), see Scheduled
+    FRAME_METHOD = 'commit'
+
+    def __init__(self, senders=(), fps=30):
+        """Initializes sync group.
+
+        Args:
+        senders - StupidArtnet objects to commit together
+        fps - transmition rate when started
+
+        Returns:
+        None
+
+        """
+        self.senders = []
+        self.artsync_header = make_artsync_header()
+        # (socket, address) pairs receiving the ArtSync
+        self.destinations = []
+        self.frames = 0
+        # senders only hold a weak reference, they do not keep the group alive
+        self.watcher = weakref.WeakMethod(self.__targets_changed)
+
+        # Timer
+        self.fps = fps
+        self.running = False
+        self.scheduler = None
+        self.owns_scheduler = False
+
+        for sender in senders:
+            self.add(sender)
+
+    def __del__(self):
+        """Graceful shutdown."""
+        self.stop()
+
+    def __len__(self):
+        """Number of senders in the group."""
+        return len(self.senders)
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Sync Group\n"
+        state += f"Senders: {len(self.senders)} \n"
+        state += f"Destinations: {len(self.destinations)} \n"
+        state += "==================================="
+
+        return state
+
+    def add(self, sender):
+        """Adds a sender to the group.
+
+        Re-add a sender whose target IP or port changed, changes made
+        with set_targets are followed on their own.
+        """
+        if sender not in self.senders:
+            self.senders.append(sender)
+            sender.target_watchers = sender.target_watchers + (self.watcher,)
+        self.__update_destinations()
+
+    def remove(self, sender):
+        """Removes a sender from the group."""
+        self.senders = [s for s in self.senders if s is not sender]
+        sender.target_watchers = tuple(
+            w for w in sender.target_watchers if w is not self.watcher)
+        self.__update_destinations()
+
+    def __targets_changed(self, sender):
+        """Called by a sender whose targets were set."""
+        self.__update_destinations()
+
+    def __update_destinations(self):
+        """One ArtSync per distinct target, sent from its first sender."""
+        destinations = {}
+        for sender in self.senders:
+            # routed senders send to their nodes, not target_ip
+            targets = sender.targets
+            if targets is None:
+                targets = ((sender.target_ip, sender.port),)
+            for address in targets:
+                if address not in destinations:
+                    destinations[address] = sender
+        self.destinations = [(sender, address)
+                             for address, sender in destinations.items()]
+
+    def commit(self):
+        """Send every ArtDmx packet, then the ArtSync packets."""
+        for sender in self.senders:
+            # _send_dmx skips the per sender ArtSync
+            sender._send_dmx()  # pylint: disable=protected-access
+        for sender, address in self.destinations:
+            try:
+                sender.socket_client.sendto(self.artsync_header, address)
+            except socket.error as error:
+                print(f"ERROR: Socket error with exception: {error}")
+        self.frames += 1
+
+    def blackout(self):
+        """Sends 0's all across, in a single frame."""
+        for sender in self.senders:
+            sender.clear()
+        self.commit()
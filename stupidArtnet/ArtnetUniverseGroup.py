@@ -0,0 +1,256 @@
+"""Multi universe Art-Net sender.
+
+Python Version: 3.6
+Source: http://artisticlicence.com/WebSiteMaster/User%20Guides/art-net.pdf
+
+NOTES
+- All universes share one socket and one pooled bytearray
+- Every slot in the pool holds a full ArtDmx packet (header + data)
+- A frame is handed to the kernel in one sendmmsg call where available
+
+"""
+
+import socket
+from stupidArtnet.StupidArtnet import StupidArtnet
+from stupidArtnet.ArtnetScheduler import Scheduled
+from stupidArtnet.ArtnetUtils import put_in_range, to_dmx_bytes, make_artdmx_header, \
+    make_artsync_header
+from stupidArtnet.ArtnetSocket import BatchSender
+
+HEADER_SIZE = 18
+
+
+class ArtnetUniverseGroup(Scheduled):
+    """Sends many universes through a single socket."""
+
+    # run by start(), see Scheduled
+    FRAME_METHOD = 'show'
+
+    def __init__(self, target_ip='127.0.0.1', packet_size=512, fps=30,
+                 even_packet_size=True, broadcast=False, source_address=None,
+                 artsync=False, port=6454, use_sendmmsg=True):
+        """Initializes Art-Net universe group.
+
+        Args:
+        target_ip - default IP of receiving device
+        packet_size - amount of channels to transmit per universe
+        fps - transmition rate
+        even_packet_size - Some receivers enforce even packets
+        broadcast - whether to broadcast in local sub
+        source_address - (ip, port) to bind the socket to
+        artsync - send a single ArtSync after every frame
+        port - UDP port used to send Art-Net packets (default: 6454)
+        use_sendmmsg - batch the frame into one system call when possible
+
+        Returns:
+        None
+
+        """
+        self.target_ip = target_ip
+        self.port = port
+        self.sequence = 1
+        self.make_even = even_packet_size
+        self.packet_size = put_in_range(packet_size, 2, 512, even_packet_size)
+        self.slot_size = HEADER_SIZE + self.packet_size
+        self.if_sync = artsync
+        self.artsync_header = make_artsync_header()
+
+        # one entry per universe, in pool order
+        self.universes = []
+        self.pool = bytearray()
+        self.buffers = []
+        self.packets = []
+        # one ArtSync per distinct destination
+        self.sync_addresses = []
+
+        # UDP SOCKET, set up as for a single sender
+        self.socket_client = StupidArtnet._make_socket(broadcast, source_address)
+
+        self.batch = BatchSender(self.socket_client, use_sendmmsg)
+
+        # Timer
+        self.fps = fps
+        self.running = False
+        self.scheduler = None
+        self.owns_scheduler = False
+
+    def __del__(self):
+        """Graceful shutdown."""
+        self.stop()
+        self.close()
+
+    def __len__(self):
+        """Number of universes in the group."""
+        return len(self.universes)
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Universe Group\n"
+        state += f"Target IP: {self.target_ip} : {self.port} \n"
+        state += f"Universes: {len(self.universes)} \n"
+        state += f"Packet Size: {self.packet_size} \n"
+        state += f"Batched: {self.batch.use_sendmmsg} \n"
+        state += "==================================="
+
+        return state
+
+    def add_universe(self, universe, sub=0, net=0, is_simplified=True,
+                     target_ip=None):
+        """Adds a universe to the group.
+
+        Buffers returned by get_buffer before this call are released,
+        fetch them again once all universes have been added.
+
+        Args:
+        universe - Universe to send
+        sub - Subnet to send
+        net - Net to send
+        is_simplified - Whether to use nets and subnet or universe only
+        target_ip - IP for this universe, defaults to the group target
+
+        Returns:
+        index - index of the universe in the group
+
+        """
+        index = len(self.universes)
+        self.universes.append({
+            'universe': universe,
+            'sub': sub,
+            'net': net,
+            'simplified': is_simplified,
+            'address': (target_ip or self.target_ip, self.port),
+            'targets': None,
+        })
+
+        # grow the pool into a fresh bytearray, the old one may be exported
+        pool = bytearray(len(self.universes) * self.slot_size)
+        pool[:len(self.pool)] = self.pool
+        start = index * self.slot_size
+        pool[start:start + HEADER_SIZE] = make_artdmx_header(
+            universe, sub, net, is_simplified, self.packet_size)
+
+        for buffer in self.buffers:
+            buffer.release()
+        self.pool = pool
+        self.__make_views()
+
+        return index
+
+    def __make_views(self):
+        """Slices the pool into data buffers and wire packets."""
+        view = memoryview(self.pool)
+        packets = []
+        self.buffers = []
+        for i in range(len(self.universes)):
+            start = i * self.slot_size
+            packets.append(view[start:start + self.slot_size])
+            self.buffers.append(
+                view[start + HEADER_SIZE:start + self.slot_size])
+        self.__prepare(packets)
+
+    def __prepare(self, packets):
+        """Lays out one datagram per universe and target for the batch."""
+        datagrams = []
+        addresses = []
+        for packet, universe in zip(packets, self.universes):
+            targets = universe['targets']
+            for address in (universe['address'],) if targets is None else targets:
+                datagrams.append(packet)
+                addresses.append(address)
+        # a new sender swapped in whole, the clock thread may be sending
+        batch = BatchSender(self.socket_client, self.batch.use_sendmmsg)
+        batch.prepare(datagrams, addresses)
+        self.packets = packets
+        self.batch = batch
+        self.sync_addresses = list(dict.fromkeys(addresses))
+
+    def set_targets(self, index, addresses):
+        """Sends a universe to several nodes, from the same buffer.
+
+        Args:
+        index - index of the universe in the group
+        addresses - IPs or (ip, port) tuples, an empty list sends
+        nowhere, None goes back to the universe target IP
+
+        Returns:
+        None
+
+        """
+        self.update_targets({index: addresses})
+
+    def update_targets(self, targets):
+        """Changes the targets of many universes at once, see set_targets.
+
+        Args:
+        targets - dict of universe index to addresses
+
+        Returns:
+        None
+
+        """
+        for index, addresses in targets.items():
+            if addresses is not None:
+                addresses = tuple(
+                    address if isinstance(address, tuple) else (address, self.port)
+                    for address in addresses)
+            self.universes[index]['targets'] = addresses
+        self.__prepare(self.packets)
+
+    def show(self):
+        """Send all universes, then a single ArtSync if enabled."""
+        count = len(self.universes)
+        if count == 0:
+            return
+        # patch sequence byte of every slot in one go, 0 is reserved
+        self.pool[12::self.slot_size] = bytes((self.sequence,)) * count
+        try:
+            self.batch.send()
+            if self.if_sync:
+                for address in self.sync_addresses:
+                    self.socket_client.sendto(self.artsync_header, address)
+        except socket.error as error:
+            print(f"ERROR: Socket error with exception: {error}")
+        finally:
+            self.sequence = self.sequence % 255 + 1
+
+    def close(self):
+        """Close UDP socket."""
+        self.socket_client.close()
+
+    # SETTERS - DATA #
+
+    def get_buffer(self, index):
+        """Return the writable DMX buffer of a universe."""
+        return self.buffers[index]
+
+    def clear(self, index=None):
+        """Clear DMX buffer of one universe, or all of them."""
+        if index is None:
+            for buffer in self.buffers:
+                buffer[:] = bytes(self.packet_size)
+        else:
+            self.buffers[index][:] = bytes(self.packet_size)
+
+    def set(self, index, value):
+        """Copy values into the buffer of a universe."""
+        value = to_dmx_bytes(value)
+        if len(value) != self.packet_size:
+            print("ERROR: packet does not match declared packet size")
+            return
+        self.buffers[index][:] = value
+
+    def set_single_value(self, index, address, value):
+        """Set single value in the DMX buffer of a universe."""
+        if address > self.packet_size:
+            print("ERROR: Address given greater than defined packet size")
+            return
+        if address < 1 or address > 512:
+            print("ERROR: Address out of range")
+            return
+        self.buffers[index][address - 1] = put_in_range(value, 0, 255, False)
+
+    def blackout(self):
+        """Sends 0's all across."""
+        self.clear()
+        self.show()
@@ -0,0 +1,293 @@
+"""Shared memory table of received universes.
+
+A receiver (StupidArtnetServer with store=, or the sharded server)
+writes into the store, any number of local processes attach to it by
+name and read universes without sockets of their own.
+
+NOTES
+- A sparse slot table, one slot per (Port-Address, source IP) seen
+- Each slot has a generation counter used as a seqlock: odd while it
+is being written, readers retry when it changed under them
+- Slots are split between writers, so every slot has a single writer
+and no lock is needed
+- Layout: header | generations (u32 per slot) | slot info | slot data
+
+"""
+
+import struct
+from time import monotonic
+from stupidArtnet.ArtnetUtils import make_address_mask
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
+
+MAGIC = b'StupidAN'
+VERSION = 1
+# magic, version, slots, writers
+HEADER = struct.Struct('<8sIII')
+HEADER_SIZE = 64
+# Port-Address, source IP, length, sequence, write time
+SLOT_INFO = struct.Struct('<I4sHBxd4x')
+DATA_SIZE = 512
+# most reads of a slot before giving up on a busy writer
+READ_RETRIES = 8
+
+
+def attach_shared_memory(name):
+    """Opens existing shared memory without tracking it.
+
+    The creator owns the memory, a tracked attach would have it unlinked
+    (or unregistered twice) when this process exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks, keep register from being called
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class ArtnetUniverseStore():
+    """Universe buffers in shared memory, shared between processes."""
+
+    def __init__(self, name=None, slots=1024, writers=1, create=True, readonly=False):
+        """Creates or attaches to a universe store.
+
+        Args:
+        name - shared memory name, None picks a free one when creating
+        slots - number of (universe, source) slots
+        writers - number of writing processes sharing the slots
+        create - create a new store, otherwise attach to name
+        readonly - map the store read only, for consumers
+
+        Returns:
+        None
+
+        """
+        if shared_memory is None:
+            raise RuntimeError("multiprocessing.shared_memory not available")
+
+        if create:
+            writers = max(writers, 1)
+            slots = max(slots, writers)
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=self.size_for(slots))
+            HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, slots, writers)
+        else:
+            self.shm = attach_shared_memory(name)
+            magic, version, slots, writers = HEADER.unpack_from(self.shm.buf, 0)
+            if magic != MAGIC or version != VERSION:
+                self.shm.close()
+                raise ValueError("Shared memory is not a universe store")
+
+        self.name = self.shm.name
+        self.slots = slots
+        self.writers = writers
+        self.owner = create
+        self.readonly = readonly and not create
+        self.torn_reads = 0
+
+        buf = self.shm.buf.toreadonly() if self.readonly else self.shm.buf
+        info_start = HEADER_SIZE + 4 * slots
+        data_start = info_start + SLOT_INFO.size * slots
+        self.generations = buf[HEADER_SIZE:info_start].cast('I')
+        self.info = buf[info_start:data_start]
+        self.data = buf[data_start:data_start + DATA_SIZE * slots]
+
+        # writer side, slots this process may allocate
+        self.slot_index = {}
+        self.first_slot = 0
+        self.next_slot = 0
+        self.end_slot = slots
+
+        # reader side, slots found so far by Port-Address
+        self.index = {}
+        self.scanned = [start for start, _ in self.__writer_ranges()]
+
+    def __enter__(self):
+        """Context manager, closes the store on exit."""
+        return self
+
+    def __exit__(self, *args):
+        """Context manager, closes the store on exit."""
+        self.close()
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Universe Store\n"
+        state += f"Name: {self.name} \n"
+        state += f"Slots: {self.slots} \n"
+        state += f"Writers: {self.writers} \n"
+        state += "==================================="
+
+        return state
+
+    @staticmethod
+    def size_for(slots):
+        """Bytes of shared memory used by a store of this many slots."""
+        return HEADER_SIZE + (4 + SLOT_INFO.size + DATA_SIZE) * slots
+
+    # WRITER #
+
+    def __writer_ranges(self):
+        """(first, end) slot of each writer's share."""
+        share = self.slots // self.writers
+        return [(i * share, self.slots if i == self.writers - 1 else (i + 1) * share)
+                for i in range(self.writers)]
+
+    def set_writer(self, index):
+        """Restricts this process to its share of the slots.
+
+        Args:
+        index - writer index, 0 to writers - 1
+
+        Returns:
+        None
+
+        """
+        self.first_slot, self.end_slot = self.__writer_ranges()[index]
+        self.next_slot = self.first_slot
+        self.slot_index = {}
+
+    def write(self, port_address, source, sequence, data):
+        """Writes the DMX data of one universe from one source.
+
+        Args:
+        port_address - 15 bit Port-Address
+        source - source IP as 4 bytes (socket.inet_aton)
+        sequence - ArtDmx sequence byte
+        data - up to 512 bytes of DMX data
+
+        Returns:
+        boolean - False when the store has no free slot left
+
+        """
+        if self.readonly:
+            print("ERROR: Universe store is read only")
+            return False
+        key = (port_address, source)
+        slot = self.slot_index.get(key)
+        if slot is None:
+            if self.next_slot >= self.end_slot:
+                return False
+            slot = self.next_slot
+            self.next_slot += 1
+            self.slot_index[key] = slot
+
+        length = len(data)
+        generations = self.generations
+        generation = generations[slot]
+        # odd while writing, readers retry
+        generations[slot] = generation + 1
+        SLOT_INFO.pack_into(self.info, slot * SLOT_INFO.size, port_address, source,
+                            length, sequence, monotonic())
+        start = slot * DATA_SIZE
+        self.data[start:start + length] = data
+        # 0 marks a slot never written, skip it on wrap around
+        generations[slot] = (generation + 2) & 0xFFFFFFFF or 2
+        return True
+
+    # READER #
+
+    def read_slot(self, slot, out):
+        """Copies a slot out, retrying reads torn by a writer.
+
+        Args:
+        slot - slot number
+        out - writable buffer of at least 512 bytes for the data
+
+        Returns:
+        tuple - (generation, port_address, source, length, sequence, time),
+        None when the slot is empty or kept changing while read
+
+        """
+        generations = self.generations
+        start = slot * DATA_SIZE
+        for _ in range(READ_RETRIES):
+            generation = generations[slot]
+            if generation == 0:
+                return None
+            if generation & 1:
+                continue
+            port_address, source, length, sequence, stamp = SLOT_INFO.unpack_from(
+                self.info, slot * SLOT_INFO.size)
+            out[:length] = self.data[start:start + length]
+            if generations[slot] == generation:
+                return generation, port_address, source, length, sequence, stamp
+        return None
+
+    def slots_for(self, port_address):
+        """Returns the slots holding a Port-Address, one per source."""
+        # writers fill their share in order and a slot never moves,
+        # so only slots past the last scan can be new
+        generations = self.generations
+        for writer, (_, end) in enumerate(self.__writer_ranges()):
+            slot = self.scanned[writer]
+            # 1 is a first write still in progress
+            while slot < end and generations[slot] > 1:
+                found = SLOT_INFO.unpack_from(self.info, slot * SLOT_INFO.size)[0]
+                self.index.setdefault(found, []).append(slot)
+                slot += 1
+            self.scanned[writer] = slot
+        return self.index.get(port_address, [])
+
+    def read(self, universe, sub=0, net=0, is_simplified=True):
+        """Returns the latest data received for a universe.
+
+        With several sources the one written last wins.
+
+        Args:
+        universe - Universe to read
+        sub - Subnet to read
+        net - Net to read
+        is_simplified - Whether to use nets and subnet or universe only
+
+        Returns:
+        bytes - DMX data, None if never received or the read was torn
+        by a busy writer (counted in torn_reads)
+
+        """
+        port_address = int.from_bytes(
+            make_address_mask(universe, sub, net, is_simplified), 'little')
+        slots = self.slots_for(port_address)
+        if not slots:
+            return None
+        slot = slots[0]
+        if len(slots) > 1:
+            slot = max(slots, key=lambda s: SLOT_INFO.unpack_from(
+                self.info, s * SLOT_INFO.size)[4])
+
+        out = bytearray(DATA_SIZE)
+        slot_state = self.read_slot(slot, out)
+        if slot_state is None:
+            self.torn_reads += 1
+            return None
+        return bytes(out[:slot_state[3]])
+
+    def generation(self, universe, sub=0, net=0, is_simplified=True):
+        """Returns a number that changes whenever a universe is written.
+
+        Cheap to poll, read() only when it changed.
+        """
+        port_address = int.from_bytes(
+            make_address_mask(universe, sub, net, is_simplified), 'little')
+        generations = self.generations
+        return sum(generations[slot] for slot in self.slots_for(port_address))
+
+    def close(self):
+        """Unmaps the store, and frees it if we created it."""
+        if self.shm is None:
+            return
+        for view in (self.generations, self.info, self.data):
+            view.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
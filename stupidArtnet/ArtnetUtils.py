@@ -1,5 +1,12 @@
 """Provides common functions byte objects."""
 
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def shift_this(number, high_first=True):
     """Utility method: extracts MSB and LSB from number.
@@ -102,3 +109,194 @@ def make_address_mask(universe, sub=0, net=0, is_simplified=True):
         address_mask.append(net & 0xFF)
 
     return address_mask
+
+
+def make_artdmx_header(universe, sub=0, net=0, is_simplified=True,
+                       packet_size=512, sequence=0, physical=0):
+    """Returns an ArtDmx packet header.
+
+    Args:
+    universe - Universe to send
+    sub - Subnet to send
+    net - Net to send
+    is_simplified - Whether to use nets and subnet or universe only,
+    see User Guide page 5 (Universe Addressing)
+    packet_size - amount of channels that follow the header
+    sequence - sequence number, 0 disables sequencing
+    physical - physical input port
+
+    Returns:
+    bytearray - 18 byte ArtDmx header
+
+    """
+    # 0 - id (7 x bytes + Null)
+    header = bytearray()
+    header.extend(bytearray('Art-Net', 'utf8'))
+    header.append(0x0)
+    # 8 - opcode (2 x 8 low byte first)
+    header.append(0x00)
+    header.append(0x50)  # ArtDmx data packet
+    # 10 - prototocol version (2 x 8 high byte first)
+    header.append(0x0)
+    header.append(14)
+    # 12 - sequence (int 8), NULL for not implemented
+    header.append(sequence & 0xFF)
+    # 13 - physical port (int 8)
+    header.append(physical & 0xFF)
+    # 14 - universe, (2 x 8 low byte first)
+    # in simplified mode the whole net subnet is simplified
+    # by transforming a single uint16 into its 8 bit parts
+    # you will most likely not see any differences in small networks
+    # 14 - universe, subnet (2 x 4 bits each)
+    # 15 - net (7 bit value)
+    # otherwise as specified in Artnet 4:
+    # Bit 3  - 0 = Universe (1-16)
+    # Bit 7  - 4 = Subnet (1-16)
+    # Bit 14 - 8 = Net (1-128)
+    # Bit 15     = 0
+    # this means 16 * 16 * 128 = 32768 universes per port
+    header.extend(make_address_mask(universe, sub, net, is_simplified))
+    # 16 - packet size (2 x 8 high byte first)
+    msb, lsb = shift_this(packet_size)		# convert to MSB / LSB
+    header.append(msb)
+    header.append(lsb)
+    return header
+
+
+def make_artsync_header():
+    """Returns an ArtSync packet.
+
+    Returns:
+    bytearray - 14 byte ArtSync packet
+
+    """
+    header = bytearray()
+    # ID: Array of 8 characters, the final character is a null termination.
+    header.extend(bytearray('Art-Net', 'utf8'))
+    header.append(0x0)
+    # OpCode: Defines the class of data within this UDP packet. Transmitted low byte first.
+    header.append(0x00)
+    header.append(0x52)
+    # ProtVerHi and ProtVerLo: Art-Net protocol revision number. Current value =14.
+    # Controllers should ignore communication with nodes using a protocol version lower than =14.
+    header.append(0x0)
+    header.append(14)
+    # Aux1 and Aux2: Should be transmitted as zero.
+    header.append(0x0)
+    header.append(0x0)
+    return header
+
+
+def make_artpoll(flags=0x02, priority=0x10):
+    """Returns an ArtPoll packet.
+
+    Args:
+    flags - TalkToMe, bit 1 asks nodes to reply whenever they change
+    priority - lowest diagnostics priority wanted
+
+    Returns:
+    bytearray - 14 byte ArtPoll packet
+
+    """
+    packet = bytearray()
+    packet.extend(bytearray('Art-Net', 'utf8'))
+    packet.append(0x0)
+    # OpCode: OpPoll, transmitted low byte first.
+    packet.append(0x00)
+    packet.append(0x20)
+    # ProtVerHi and ProtVerLo
+    packet.append(0x0)
+    packet.append(14)
+    packet.append(flags & 0xFF)
+    packet.append(priority & 0xFF)
+    return packet
+
+
+# ArtPollReply up to BindIndex and Status2, multi byte numbers are split
+# in bytes where the spec has them high byte first
+ARTPOLLREPLY = struct.Struct('<8sH4sHBBBBBBBBBB18s64s64sBB4s4s4s4s4sBBB3xB6s4sBB')
+ARTPOLLREPLY_SIZE = 239
+
+
+def make_artpollreply(ip, port_addresses=(), short_name='', long_name='',
+                      bind_index=1, mac=bytes(6), port=6454):
+    """Returns an ArtPollReply packet, as a node answers an ArtPoll.
+
+    Args:
+    ip - IP of the node
+    port_addresses - up to 4 output Port-Addresses, all in the same
+    net and subnet
+    short_name - node name, up to 17 characters
+    long_name - node description, up to 63 characters
+    bind_index - 1 for the root device, higher for more ports of it
+    mac - 6 byte MAC address
+    port - UDP port of the node
+
+    Returns:
+    bytearray - 239 byte ArtPollReply packet
+
+    """
+    port_addresses = list(port_addresses)[:4]
+    first = port_addresses[0] if port_addresses else 0
+    port_types = bytes(0x80 if i < len(port_addresses) else 0 for i in range(4))
+    sw_out = bytes(port_addresses[i] & 0x0F if i < len(port_addresses) else 0
+                   for i in range(4))
+    packet = bytearray(ARTPOLLREPLY_SIZE)
+    ARTPOLLREPLY.pack_into(
+        packet, 0, b'Art-Net\x00', 0x2100, bytes(map(int, ip.split('.'))), port,
+        0, 14,                                  # firmware version
+        first >> 8 & 0x7F, first >> 4 & 0x0F,   # NetSwitch, SubSwitch
+        0, 0, 0, 0, 0, 0,                       # OEM, UBEA, Status1, ESTA
+        short_name.encode()[:17], long_name.encode()[:63], b'',
+        0, len(port_addresses),                 # NumPorts
+        port_types, bytes(4), bytes(0x80 if t else 0 for t in port_types),
+        bytes(4), sw_out,
+        0, 0, 0,
+        0,                                      # Style, StNode
+        bytes(mac)[:6], bytes(4), bind_index & 0xFF, 0)
+    return packet
+
+
+def to_dmx_bytes(values):
+    """Utility method: converts many channel values to bytes in one go.
+
+    Args:
+    values - bytes like object, NumPy array or sequence of numbers,
+    numbers are clamped to 0 - 255
+
+    Returns:
+    bytes like object - one byte per value
+
+    """
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        return values
+    if np is not None and isinstance(values, np.ndarray):
+        if values.dtype != np.uint8:
+            values = np.clip(values, 0, 255).astype(np.uint8)
+        return memoryview(np.ascontiguousarray(values).reshape(-1))
+    try:
+        # fast path, every value already an int in range
+        return bytes(values)
+    except (TypeError, ValueError):
+        return bytes(clamp(int(v), 0, 255) for v in values)
+
+
+def to_16bit_bytes(values, high_first=False):
+    """Utility method: converts many 16 bit values to bytes in one go.
+
+    Args:
+    values - NumPy array or sequence of numbers, clamped to 0 - 65535
+    high_first - MSB or LSB first (true / false)
+
+    Returns:
+    bytes like object - two bytes per value
+
+    """
+    if np is not None and isinstance(values, np.ndarray):
+        values = np.clip(values, 0, 65535).astype('>u2' if high_first else '<u2')
+        return memoryview(np.ascontiguousarray(values).reshape(-1).view(np.uint8))
+    fmt = ('>' if high_first else '<') + str(len(values)) + 'H'
+    try:
+        return struct.pack(fmt, *values)
+    except struct.error:
+        return struct.pack(fmt, *(clamp(int(v), 0, 65535) for v in values))
@@ -9,16 +9,27 @@ NOTES
 """
 
 import socket
-import _thread
-from time import sleep
-from stupidArtnet.ArtnetUtils import shift_this, put_in_range
+from collections import deque
+from time import sleep, monotonic, perf_counter
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from stupidArtnet.ArtnetScheduler import Scheduled
+from stupidArtnet.ArtnetUtils import put_in_range, make_artdmx_header, make_artsync_header, \
+    to_dmx_bytes, to_16bit_bytes
 
-class StupidArtnet():
+HEADER_SIZE = 18
+
+
+class StupidArtnet(Scheduled):
     """(Very) simple implementation of Artnet."""
 
     def __init__(self, target_ip='127.0.0.1', universe=0, packet_size=512, fps=30,
-                 even_packet_size=True, broadcast=False, source_address=None, artsync=False, port=6454):
+                 even_packet_size=True, broadcast=False, source_address=None, artsync=False, port=6454,
+                 zero_copy=False, send_on_change=False, keep_alive=4.0, double_buffer=False,
+                 metrics=None):
         """Initializes Art-Net Client.
 
         Args:
@@ -30,6 +41,15 @@ class StupidArtnet():
         broadcast - whether to broadcast in local sub
         artsync - if we want to synchronize buffer
         port - UDP port used to send Art-Net packets (default: 6454)
+        zero_copy - keep header and data in one preallocated packet,
+        buffer is then a memoryview into the packet that goes on the wire
+        send_on_change - clock only sends when data changed, see tick()
+        keep_alive - seconds between resends of unchanged data (spec ~4s)
+        double_buffer - setters write a back buffer that only goes out
+        once published with commit(), see commit(). Committed frames are
+        already preallocated packets, so it takes the place of zero_copy
+        metrics - ArtnetMetrics counting packets and socket errors and
+        timing sends, nothing is measured without one
 
         Returns:
         None
@@ -57,27 +77,53 @@ class StupidArtnet():
         self.is_simplified = True		# simplify use of universe, net and subnet
 
         # UDP SOCKET
-        self.socket_client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-        if broadcast:
-            self.socket_client.setsockopt(
-                socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-
-        # Allow speciying the origin interface
-        if source_address:
-            self.socket_client.setsockopt(
-                socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.socket_client.bind(source_address)
+        self.socket_client = self._make_socket(broadcast, source_address)
+        # unicast fan-out, None sends to target_ip only, see set_targets
+        self.targets = None
+        # weak references to functions called with this sender
+        # when its targets change
+        self.target_watchers = ()
 
         # Timer
         self.fps = fps
-        self.__clock = None
+        self.running = False
+        self.scheduler = None
+        self.owns_scheduler = False
+
+        # Send on change, setters mark the buffer dirty
+        self.send_on_change = send_on_change
+        self.keep_alive = keep_alive
+        self.dirty = True
+        self.last_sent = None
+        self.packets_sent = 0
+        self.packets_suppressed = 0
+
+        # Instrumentation, off unless given
+        self.metrics = metrics
+
+        # Zero copy packet, header and buffer share the same memory
+        self.packet = None
+        self._wire = None
+        if zero_copy and double_buffer:
+            print("ERROR: zero_copy is not used with double_buffer, "
+                  "frames are sent from committed packets")
+        elif zero_copy:
+            self.packet = bytearray(HEADER_SIZE + 512)
+            self._packet_view = memoryview(self.packet)
 
         self.make_artdmx_header()
-        
-        if self.if_sync:
-            self.artsync_header = bytearray()
-            self.make_artsync_header()
+
+        # Double buffer, frames are handed to the clock as whole packets
+        self.double_buffer = double_buffer
+        self._front = None
+        self._ready = None
+        self._free = deque(maxlen=2)
+        if double_buffer:
+            self.commit()
+
+        # ArtSync never changes, build it once
+        self.artsync_header = bytearray()
+        self.make_artsync_header()
 
 
     def __del__(self):
@@ -101,111 +147,205 @@ class StupidArtnet():
         return state
 
 
+    @staticmethod
+    def _make_socket(broadcast, source_address):
+        """Make UDP socket."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        if broadcast:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+        # Allow speciying the origin interface
+        if source_address:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(source_address)
+
+        return sock
+
+
     def make_artdmx_header(self):
         """Make packet header."""
-        # 0 - id (7 x bytes + Null)
-        self.packet_header = bytearray()
-        self.packet_header.extend(bytearray('Art-Net', 'utf8'))
-        self.packet_header.append(0x0)
-        # 8 - opcode (2 x 8 low byte first)
-        self.packet_header.append(0x00)
-        self.packet_header.append(0x50)  # ArtDmx data packet
-        # 10 - prototocol version (2 x 8 high byte first)
-        self.packet_header.append(0x0)
-        self.packet_header.append(14)
-        # 12 - sequence (int 8), NULL for not implemented
-        self.packet_header.append(self.sequence)
-        # 13 - physical port (int 8)
-        self.packet_header.append(0x00)
-        # 14 - universe, (2 x 8 low byte first)
-        if self.is_simplified:
-            # not quite correct but good enough for most cases:
-            # the whole net subnet is simplified
-            # by transforming a single uint16 into its 8 bit parts
-            # you will most likely not see any differences in small networks
-            msb, lsb = shift_this(self.universe)   # convert to MSB / LSB
-            self.packet_header.append(lsb)
-            self.packet_header.append(msb)
-        # 14 - universe, subnet (2 x 4 bits each)
-        # 15 - net (7 bit value)
-        else:
-            # as specified in Artnet 4 (remember to set the value manually after):
-            # Bit 3  - 0 = Universe (1-16)
-            # Bit 7  - 4 = Subnet (1-16)
-            # Bit 14 - 8 = Net (1-128)
-            # Bit 15     = 0
-            # this means 16 * 16 * 128 = 32768 universes per port
-            # a subnet is a group of 16 Universes
-            # 16 subnets will make a net, there are 128 of them
-            self.packet_header.append(self.subnet << 4 | self.universe)
-            self.packet_header.append(self.net & 0xFF)
-        # 16 - packet size (2 x 8 high byte first)
-        msb, lsb = shift_this(self.packet_size)		# convert to MSB / LSB
-        self.packet_header.append(msb)
-        self.packet_header.append(lsb)
+        # see ArtnetUtils.make_artdmx_header for the packet layout
+        self.packet_header = make_artdmx_header(
+            self.universe, self.subnet, self.net, self.is_simplified,
+            self.packet_size, self.sequence, self.physical)
+        self.dirty = True
+        if self.packet is not None:
+            self.__map_packet()
+
+
+    def __map_packet(self):
+        """Copy header into the zero copy packet and map buffer onto it."""
+        self.packet[:HEADER_SIZE] = self.packet_header
+        end = HEADER_SIZE + self.packet_size
+        if not isinstance(self.buffer, memoryview) or len(self.buffer) != self.packet_size:
+            self.buffer = self._packet_view[HEADER_SIZE:end]
+        self._wire = self._packet_view[:end]
 
 
     def make_artsync_header(self):
         """Make ArtSync header"""
-        self.artsync_header = bytearray()  # Initialize as empty bytearray
-        # ID: Array of 8 characters, the final character is a null termination.
-        self.artsync_header.extend(bytearray('Art-Net', 'utf8'))
-        self.artsync_header.append(0x0)
-        # OpCode: Defines the class of data within this UDP packet. Transmitted low byte first.
-        self.artsync_header.append(0x00)
-        self.artsync_header.append(0x52)
-        # ProtVerHi and ProtVerLo: Art-Net protocol revision number. Current value =14.
-        # Controllers should ignore communication with nodes using a protocol version lower than =14.
-        self.artsync_header.append(0x0)
-        self.artsync_header.append(14)
-        # Aux1 and Aux2: Should be transmitted as zero.
-        self.artsync_header.append(0x0)
-        self.artsync_header.append(0x0)
+        self.artsync_header = make_artsync_header()
 
 
     def send_artsync(self):
         """Send Artsync"""
-        self.make_artsync_header()
+        targets = self.targets
+        if targets is None:
+            targets = ((self.target_ip, self.port),)
         try:
-            self.socket_client.sendto(self.artsync_header, (self.target_ip, self.port))
+            for address in targets:
+                self.socket_client.sendto(self.artsync_header, address)
         except socket.error as error:
             print(f"ERROR: Socket error with exception: {error}")
+            if self.metrics is not None:
+                self.metrics.count('socket_errors')
 
 
     def show(self):
-        """Finally send data."""
-        packet = bytearray()
-        packet.extend(self.packet_header)
-        packet.extend(self.buffer)
+        """Finally send data.
+
+        With artsync an ArtSync follows every call, to latch many
+        universes with a single ArtSync use an ArtnetSyncGroup instead.
+        """
+        self._send_dmx()
+        if self.if_sync:  # if we want to send artsync
+            self.send_artsync()
+
+
+    def _send_dmx(self):
+        """Send the ArtDmx packet only."""
+        # clear first, so changes made while sending are not lost
+        self.dirty = False
+        if self.double_buffer:
+            packet = self.__take_frame()
+        elif self.packet is not None:
+            # patch sequence in place, data is already in the packet
+            self.packet[12] = self.sequence
+            packet = self._wire
+        else:
+            packet = bytearray()
+            packet.extend(self.packet_header)
+            packet.extend(self.buffer)
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
         try:
-            self.socket_client.sendto(packet, (self.target_ip, self.port))
-            if self.if_sync:  # if we want to send artsync
-                self.send_artsync()
+            targets = self.targets
+            if targets is None:
+                self.socket_client.sendto(packet, (self.target_ip, self.port))
+            else:
+                # the same packet to every node that wants it
+                for address in targets:
+                    self.socket_client.sendto(packet, address)
+            if metrics is not None:
+                metrics.observe('send_seconds', perf_counter() - start)
+                metrics.count('packets_sent', 1 if targets is None else len(targets))
         except socket.error as error:
             print(f"ERROR: Socket error with exception: {error}")
+            if metrics is not None:
+                metrics.count('socket_errors')
         finally:
             self.sequence = (self.sequence + 1) % 256
+            self.last_sent = monotonic()
+            self.packets_sent += 1
 
 
-    def close(self):
-        """Close UDP socket."""
-        self.socket_client.close()
+    def commit(self):
+        """Publish the back buffer as the next frame to send.
 
-    # THREADING #
-
-    def start(self):
-        """Starts thread clock."""
+        With double_buffer the clock only ever sends whole committed
+        frames, never a buffer that is half way through being written.
+        Costs one copy of the buffer, without double_buffer it only
+        marks the buffer as changed.
+        """
+        self.dirty = True
+        if not self.double_buffer:
+            return
+        size = HEADER_SIZE + len(self.buffer)
+        # reuse a packet the clock is done with
+        try:
+            packet = self._free.pop()
+        except IndexError:
+            packet = None
+        if packet is None or len(packet) != size:
+            packet = bytearray(size)
+        packet[:HEADER_SIZE] = self.packet_header
+        packet[HEADER_SIZE:] = self.buffer
+        # a single reference assignment, atomic for the clock thread
+        self._ready = packet
+
+
+    def __take_frame(self):
+        """Swap the last committed frame in as front packet."""
+        packet = self._ready
+        if packet is not self._front:
+            # committed packets are never written again, the old front
+            # goes back to the producer
+            if self._front is not None:
+                self._free.append(self._front)
+            self._front = packet
+        packet[12] = self.sequence
+        return packet
+
+
+    def tick(self):
+        """Send on clock tick.
+
+        In send on change mode only a dirty buffer is sent, an unchanged
+        one is resent every keep_alive seconds, otherwise always sends.
+        """
+        dirty = self._ready is not self._front if self.double_buffer else self.dirty
+        if self.send_on_change and not dirty and \
+                monotonic() - self.last_sent < self.keep_alive:
+            self.packets_suppressed += 1
+            if self.metrics is not None:
+                self.metrics.count('packets_suppressed')
+            return
         self.show()
-        if not hasattr(self, "running"):
-            self.running = True
-        if self.running:
-            sleep((1000.0 / self.fps) / 1000.0)
-            _thread.start_new_thread(self.start, ())
 
 
-    def stop(self):
-        """Set flag so thread will exit."""
-        self.running = False
+    def set_targets(self, addresses):
+        """Sends every packet to several nodes instead of target_ip.
+
+        Args:
+        addresses - IPs or (ip, port) tuples, an empty list sends
+        nowhere, None goes back to target_ip
+
+        Returns:
+        None
+
+        """
+        if addresses is None:
+            self.targets = None
+        else:
+            # a single swap, the clock thread may be sending
+            self.targets = tuple(
+                address if isinstance(address, tuple) else (address, self.port)
+                for address in addresses)
+        # e.g. sync groups sending ArtSync to the same nodes
+        for watcher in self.target_watchers:
+            callback = watcher()
+            if callback is not None:
+                callback(self)
+
+
+    def mark_dirty(self):
+        """Flag buffer as changed, use after writing to buffer directly."""
+        self.dirty = True
+
+
+    def get_send_stats(self):
+        """Returns packets sent and packets suppressed by send on change."""
+        return {
+            'sent': self.packets_sent,
+            'suppressed': self.packets_suppressed,
+        }
+
+
+    def close(self):
+        """Close UDP socket."""
+        self.socket_client.close()
 
     # SETTERS - HEADER #
 
@@ -246,11 +386,28 @@ class StupidArtnet():
         """Setter for packet size (2 - 512, even only)."""
         self.packet_size = put_in_range(packet_size, 2, 512, self.make_even)
         self.make_artdmx_header()
+        if self.double_buffer:
+            self.__fit_buffer()
 
     # SETTERS - DATA #
 
+    def __fit_buffer(self):
+        """Truncate or zero pad the back buffer to packet size, in place."""
+        buffer = self.buffer
+        if len(buffer) > self.packet_size:
+            del buffer[self.packet_size:]
+        elif len(buffer) < self.packet_size:
+            buffer.extend(bytes(self.packet_size - len(buffer)))
+
+
     def clear(self):
         """Clear DMX buffer."""
+        self.dirty = True
+        if self.double_buffer:
+            self.__fit_buffer()
+        if self.packet is not None or self.double_buffer:
+            self.buffer[:] = bytes(len(self.buffer))
+            return
         self.buffer = bytearray(self.packet_size)
 
 
@@ -259,6 +416,16 @@ class StupidArtnet():
         if len(value) != self.packet_size:
             print("ERROR: packet does not match declared packet size")
             return
+        self.dirty = True
+        if self.packet is not None:
+            # copy into the packet, buffer must stay a view of it
+            self.packet[HEADER_SIZE:HEADER_SIZE + self.packet_size] = value
+            return
+        if self.double_buffer:
+            # copy, the back buffer is never swapped for the caller's list
+            self.buffer[:] = value
+            self.__fit_buffer()
+            return
         self.buffer = value
 
 
@@ -271,6 +438,7 @@ class StupidArtnet():
             print("ERROR: Address out of range")
             return
         value = put_in_range(value, 0, 65535, False)
+        self.dirty = True
 
         # Check for endianess
         if high_first:
@@ -290,6 +458,7 @@ class StupidArtnet():
             print("ERROR: Address out of range")
             return
         self.buffer[address - 1] = put_in_range(value, 0, 255, False)
+        self.dirty = True
 
 
     def set_single_rem(self, address, value):
@@ -316,6 +485,101 @@ class StupidArtnet():
         self.buffer[address - 1] = put_in_range(red, 0, 255, False)
         self.buffer[address] = put_in_range(green, 0, 255, False)
         self.buffer[address + 1] = put_in_range(blue, 0, 255, False)
+        self.dirty = True
+
+    # SETTERS - BULK DATA #
+
+    def __write(self, offset, data):
+        """Copy converted bytes into the buffer at a 0 based offset."""
+        self.buffer[offset:offset + len(data)] = data
+        self.dirty = True
+
+
+    def set_range(self, address, values):
+        """Set consecutive values from start address.
+
+        Args:
+        address - DMX address of the first value (1 - 512)
+        values - sequence, bytes or NumPy array, clamped to 0 - 255
+
+        Returns:
+        None
+
+        """
+        if address < 1 or address > 512:
+            print("ERROR: Address out of range")
+            return
+        # check the converted length, NumPy arrays of any shape are flattened
+        data = to_dmx_bytes(values)
+        if address - 1 + len(data) > self.packet_size:
+            print("ERROR: Values go past defined packet size")
+            return
+        self.__write(address - 1, data)
+
+
+    def set_16bit_range(self, address, values, high_first=False):
+        """Set consecutive 16bit values from start address, see set_16bit.
+
+        Args:
+        address - DMX address of the first value (1 - 511)
+        values - sequence or NumPy array, clamped to 0 - 65535
+        high_first - MSB or LSB first (true / false)
+
+        Returns:
+        None
+
+        """
+        if address < 1 or address > 512 - 1:
+            print("ERROR: Address out of range")
+            return
+        data = to_16bit_bytes(values, high_first)
+        if address - 1 + len(data) > self.packet_size:
+            print("ERROR: Values go past defined packet size")
+            return
+        self.__write(address - 1, data)
+
+
+    def set_fixtures(self, address, fixtures):
+        """Set a row of identical fixtures patched back to back.
+
+        Args:
+        address - DMX address of the first fixture
+        fixtures - one tuple of channel values per fixture, e.g. (r, g, b),
+        or a 2D NumPy array with one row per fixture
+
+        Returns:
+        None
+
+        """
+        if np is not None and isinstance(fixtures, np.ndarray):
+            self.set_range(address, fixtures.reshape(-1))
+            return
+        self.set_range(address, [v for fixture in fixtures for v in fixture])
+
+
+    def __getitem__(self, key):
+        """Read buffer values by 0 based index or slice."""
+        return self.buffer[key]
+
+
+    def __setitem__(self, key, value):
+        """Write buffer values by 0 based index or slice.
+
+        sender[0] = 255 or sender[10:40] = values, values are clamped
+        and a slice must be given exactly as many values as it spans.
+        """
+        if not isinstance(key, slice):
+            self.set_single_value(key + 1, value)
+            return
+        start, stop, step = key.indices(self.packet_size)
+        if step != 1:
+            print("ERROR: Slice step not supported")
+            return
+        data = to_dmx_bytes(value)
+        if len(data) != max(stop - start, 0):
+            print("ERROR: Values do not match slice size")
+            return
+        self.__write(start, data)
 
     # AUX Function #
 
@@ -326,6 +590,7 @@ class StupidArtnet():
         array - integer array to send
         """
         self.set(packet)
+        self.commit()
         self.show()
 
 
@@ -350,18 +615,23 @@ class StupidArtnet():
 
     def see_buffer(self):
         """Show buffer values."""
+        if self.packet is not None:
+            print(bytearray(self.buffer))
+            return
         print(self.buffer)
 
 
     def blackout(self):
         """Sends 0's all across."""
         self.clear()
+        self.commit()
         self.show()
 
 
     def flash_all(self, delay=None):
         """Sends 255's all across."""
         self.set([255] * self.packet_size)
+        self.commit()
         self.show()
         # Blackout after delay
         if delay:
@@ -0,0 +1,224 @@
+"""asyncio Implementation of Artnet.
+
+Python Version: 3.6
+Source: http://artisticlicence.com/WebSiteMaster/User%20Guides/art-net.pdf
+
+NOTES
+- Same interface as StupidArtnet and StupidArtnetServer, driven by an
+event loop instead of threads
+- Many senders can share one transport, so a single loop can drive
+thousands of universes
+- Server callbacks can be coroutines, they are run as tasks
+
+"""
+
+import asyncio
+import functools
+from stupidArtnet.StupidArtnet import StupidArtnet
+from stupidArtnet.StupidArtnetServer import StupidArtnetServer, BUFFER_LIST
+
+
+class ArtnetProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol feeding a server and reporting socket errors."""
+
+    def __init__(self, server=None):
+        """Initializes protocol, server receives incoming datagrams."""
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        """Pass datagram on to the server."""
+        if self.server is not None:
+            self.server._handle_packet(data, addr)
+
+    def error_received(self, exc):
+        """Report socket errors like the threaded classes do."""
+        print(f"ERROR: Socket error with exception: {exc}")
+
+
+async def open_transport(broadcast=False, source_address=None):
+    """Opens a UDP transport that several async senders can share.
+
+    Args:
+    broadcast - whether to broadcast in local sub
+    source_address - (ip, port) to bind to
+
+    Returns:
+    transport - asyncio datagram transport
+
+    """
+    loop = asyncio.get_event_loop()
+    sock = StupidArtnet._make_socket(broadcast, source_address)
+    transport, _ = await loop.create_datagram_endpoint(ArtnetProtocol, sock=sock)
+    return transport
+
+
+class StupidArtnetAsync(StupidArtnet):
+    """asyncio implementation of an Artnet client."""
+
+    def __init__(self, *args, **kwargs):
+        """Initializes Art-Net Client, same arguments as StupidArtnet.
+
+        Nothing can be sent until open() was awaited.
+        """
+        self.transport = None
+        self.owns_transport = False
+        self.task = None
+        self.broadcast = False
+        self.source_address = None
+        super().__init__(*args, **kwargs)
+
+    def _make_socket(self, broadcast, source_address):
+        """Keep socket options, the transport is made by open()."""
+        self.broadcast = broadcast
+        self.source_address = source_address
+
+    async def open(self, transport=None):
+        """Opens UDP transport.
+
+        Args:
+        transport - transport to share with other senders,
+        see open_transport(), by default a new one is opened
+
+        Returns:
+        None
+
+        """
+        if transport is None:
+            transport = await open_transport(self.broadcast, self.source_address)
+            self.owns_transport = True
+        self.transport = transport
+        # transports have the same sendto(data, address) as sockets
+        self.socket_client = transport
+
+    def close(self):
+        """Close UDP transport if it is ours."""
+        if self.owns_transport and self.transport is not None:
+            self.transport.close()
+        self.transport = None
+        self.owns_transport = False
+
+    # THREADING #
+
+    def start(self, scheduler=None):
+        """Starts frame task in the running event loop.
+
+        Returns:
+        task - the frame task
+
+        """
+        if self.task is None:
+            self.running = True
+            self.task = asyncio.ensure_future(self.__run())
+        return self.task
+
+    def stop(self):
+        """Stops frame task."""
+        self.running = False
+        task = self.task
+        self.task = None
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def __run(self):
+        """Frame task, ticks at absolute deadlines on the loop clock."""
+        loop = asyncio.get_event_loop()
+        period = 1.0 / max(self.fps, 1)
+        deadline = loop.time()
+        while self.running:
+            self.tick()
+            deadline += period
+            delay = deadline - loop.time()
+            if delay < 0:
+                # late, skip the frames we missed
+                deadline += (int(-delay / period) + 1) * period
+                delay = deadline - loop.time()
+            await asyncio.sleep(delay)
+
+
+class StupidArtnetServerAsync(StupidArtnetServer):
+    """asyncio implementation of an Artnet Server."""
+
+    def __init__(self, port=6454, socket_buffer_size=None, metrics=None, artsync=False,
+                 frame_callback=None):
+        """Initializes Art-Net server, call start() from the event loop.
+
+        Args:
+        port - UDP port to listen on (default: 6454)
+        socket_buffer_size - SO_RCVBUF in bytes, None keeps the OS default
+        metrics - ArtnetMetrics counting packets, coroutine callbacks
+        are timed up to the point their task is created
+        artsync - hold received data until ArtSync, see StupidArtnetServer
+        frame_callback - function or coroutine function taking
+        {listener id: buffer}, called once per ArtSync
+
+        Returns:
+        None
+
+        """
+        self.transport = None
+        self.tasks = set()
+        self.sync_timer = None
+        super().__init__(port, socket_buffer_size, metrics=metrics, artsync=artsync,
+                         frame_callback=self.__as_task(frame_callback))
+
+    def _start(self):
+        """Nothing to do, listening starts with start()."""
+
+    async def start(self):
+        """Binds the Art-Net port in the running event loop."""
+        loop = asyncio.get_event_loop()
+        self.socket_server = self._make_socket()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: ArtnetProtocol(self), sock=self.socket_server)
+        self.listen = True
+        if self.artsync:
+            self.__check_sync()
+
+    def __check_sync(self):
+        """Applies held data when ArtSync stopped, even with no traffic."""
+        self._expire_sync()
+        self.sync_timer = asyncio.get_event_loop().call_later(0.5, self.__check_sync)
+
+    def close(self):
+        """Close UDP transport."""
+        self.listen = False
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def register_listener(self, universe=0, sub=0, net=0,
+                          is_simplified=True, callback_function=None,
+                          buffer_mode=BUFFER_LIST, merge_mode=None):
+        """Adds a listener to an Art-Net Universe.
+
+        Same as StupidArtnetServer.register_listener, callback_function
+        may also be a coroutine function. It then runs as a task, so
+        'memoryview' and 'numpy' buffers may have moved on by the time
+        it looks at them.
+        """
+        return super().register_listener(
+            universe, sub, net, is_simplified,
+            self.__as_task(callback_function), buffer_mode, merge_mode)
+
+    def set_callback(self, listener_id, callback_function):
+        """Add / change callback to a given listener, may be a coroutine."""
+        super().set_callback(listener_id, self.__as_task(callback_function))
+
+    def __as_task(self, callback):
+        """Wraps coroutine functions into a call that starts a task."""
+        if callback is None or not asyncio.iscoroutinefunction(callback):
+            return callback
+        tasks = self.tasks
+
+        # wraps() keeps the signature, so arity is still worked out right
+        @functools.wraps(callback)
+        def run_as_task(*args):
+            task = asyncio.ensure_future(callback(*args))
+            # hold a reference until the task is done
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        return run_as_task
@@ -11,7 +11,117 @@ NOTES
 
 import socket
 import _thread
+from collections import deque
+from time import monotonic, perf_counter
+from stupidArtnet.ArtnetMetrics import label
 from stupidArtnet.ArtnetUtils import make_address_mask
+from stupidArtnet.ArtnetPackets import ARTDMX_FIELDS, OP_DMX, OP_SYNC, PACKET_TYPES, \
+    read_opcode, decode_packet
+from stupidArtnet.ArtnetSocket import BatchReceiver
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# How a listener keeps received DMX data, see register_listener
+BUFFER_LIST = 'list'
+BUFFER_BYTES = 'bytes'
+BUFFER_MEMORYVIEW = 'memoryview'
+BUFFER_NUMPY = 'numpy'
+BUFFER_MODES = (BUFFER_LIST, BUFFER_BYTES, BUFFER_MEMORYVIEW, BUFFER_NUMPY)
+
+# How data from several sources of one universe is merged
+MERGE_HTP = 'htp'   # highest value of each channel
+MERGE_LTP = 'ltp'   # data of the latest packet
+MERGE_MODES = (MERGE_HTP, MERGE_LTP)
+
+# Seconds of silence before a source is dropped from a merge
+SOURCE_TIMEOUT = 10.0
+
+# Seconds of silence before the statistics of a source are dropped
+SOURCE_EXPIRY = 300.0
+# Most sources with statistics kept, the longest silent are dropped first
+MAX_SOURCES = 4096
+
+# Seconds without ArtSync before received data is applied immediately again
+SYNC_TIMEOUT = 4.0
+
+# Counters reported by get_stats
+STATS_KEYS = ('received', 'stale', 'duplicates', 'gaps')
+
+# Arrival times kept per source, jitter is worked out from these
+JITTER_HISTORY = 64
+
+# Metrics counter of each dropped sequence check result
+DROP_COUNTERS = {'stale': 'packets_stale', 'duplicates': 'packets_duplicate'}
+
+
+def new_sequence_state():
+    """Returns the sequence and statistics fields of a listener or source."""
+    return {
+        'sequence': 0,
+        'received': 0,      # packets accepted
+        'stale': 0,         # dropped as out of order
+        'duplicates': 0,    # dropped as a repeat of the last sequence
+        'gaps': 0,          # packets missing from the sequence
+    }
+
+
+def new_source_state(now):
+    """Returns the sequence state of a source, with its arrival times."""
+    state = new_sequence_state()
+    state['arrival'] = now
+    state['arrivals'] = deque(maxlen=JITTER_HISTORY)
+    return state
+
+
+def arrival_jitter(arrivals):
+    """Inter-arrival jitter of recent arrival times, smoothed as in RFC 3550.
+
+    Args:
+    arrivals - time.monotonic of consecutive packets, oldest first
+
+    Returns:
+    float - jitter in seconds
+
+    """
+    jitter = 0.0
+    last_interval = None
+    for earlier, later in zip(arrivals, list(arrivals)[1:]):
+        interval = later - earlier
+        if last_interval is not None:
+            jitter += (abs(interval - last_interval) - jitter) / 16
+        last_interval = interval
+    return jitter
+
+
+def count_sequence(state, new_seq):
+    """Runs the sequence check of one packet and updates its counters.
+
+    Only plain increments happen here, jitter is worked out from the
+    arrival times of sources when statistics are read.
+
+    Args:
+    state - dict made by new_sequence_state, updated in place
+    new_seq - sequence byte of the packet, 0 when sequencing is off
+
+    Returns:
+    str - counter bumped, 'received' when the packet is accepted
+
+    """
+    old_seq = state['sequence']
+    # if there's a >50% packet loss it's not our problem
+    if not (new_seq == 0x00 or new_seq > old_seq or old_seq - new_seq > 0x80):
+        result = 'duplicates' if new_seq == old_seq else 'stale'
+        state[result] += 1
+        return result
+    if new_seq and old_seq:
+        # sequence runs 1 - 255 and wraps around to 1
+        state['gaps'] += (new_seq - old_seq - 1) % 255
+    state['sequence'] = new_seq
+    state['received'] += 1
+    return 'received'
 
 
 class StupidArtnetServer():
@@ -19,72 +129,309 @@ class StupidArtnetServer():
 
     socket_server = None
     ARTDMX_HEADER = b'Art-Net\x00\x00P\x00\x0e'
-    listeners = []
 
-    def __init__(self, port=6454):
-        """Initializes Art-Net server."""
+    def __init__(self, port=6454, socket_buffer_size=None, ring_size=64, store=None,
+                 metrics=None, artsync=False, frame_callback=None):
+        """Initializes Art-Net server.
+
+        Args:
+        port - UDP port to listen on (default: 6454)
+        socket_buffer_size - SO_RCVBUF in bytes, None keeps the OS default
+        ring_size - most datagrams drained from the socket in one go
+        store - ArtnetUniverseStore to publish every received universe
+        to, other processes can then read them without a socket
+        metrics - ArtnetMetrics counting packets and timing callbacks,
+        nothing is measured without one
+        artsync - once an ArtSync arrives, hold received data until the
+        next one and apply all universes together. Without ArtSync for
+        4 seconds data is applied as it arrives again
+        frame_callback - function taking {listener id: buffer}, called
+        once per ArtSync with the listeners it updated
+
+        Returns:
+        None
+
+        """
         self.port = port  # Use provided port or default
         # By default, the server uses port 6454, no need to specify it.
         # If you need to change the Art-Net port, ensure the port is within the valid range for UDP ports (1024-65535).
         # Be sure that no other application is using the selected port on your network.
         
+        # registered listeners, and the same listeners by Port-Address
+        self.listeners = []
+        self.listener_index = {}
+
+        # receive buffers
+        self.socket_buffer_size = socket_buffer_size
+        self.ring_size = ring_size
+        self.receiver = None
+
+        # merging listeners forget sources silent for this long
+        self.source_timeout = SOURCE_TIMEOUT
+        # sequence state of each (source IP, Port-Address)
+        self.sources = {}
+        self.source_expiry = SOURCE_EXPIRY
+        self.max_sources = MAX_SOURCES
+        self.sources_swept = monotonic()
+
+        # functions seeing every ArtDmx packet, see add_tap
+        self.taps = ()
+        # opcode -> functions taking decoded packets, see register_handler
+        self.handlers = {}
+        self.dmx_handlers = ()
+
+        # shared memory copy of all universes, written by this server
+        self.store = store
+        self.store_writes = store is not None
+
+        # Instrumentation, off unless given
+        self.metrics = metrics
+
+        # ArtSync latching, listeners holding pending data until the next sync
+        self.artsync = artsync
+        self.frame_callback = frame_callback
+        self.sync_timeout = SYNC_TIMEOUT
+        self.sync_arrival = None
+        self.latched = []
+        if artsync:
+            self.register_handler(OP_SYNC, self.__handle_sync)
+
         # server active flag
         self.listen = True
 
+        self.server_thread = None
+        self._start()
+
+    def _start(self):
+        """Starts server thread."""
         self.server_thread = _thread.start_new_thread(self.__init_socket, ())
 
+    def _make_socket(self):
+        """Make UDP socket bound to the Art-Net port."""
+        # Bind to UDP on the correct PORT
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.socket_buffer_size:
+            sock.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, self.socket_buffer_size)
+        sock.bind(('', self.port))  # Listen on any valid IP
+        return sock
+
     def __init_socket(self):
         """Initializes server socket."""
-        # Bind to UDP on the correct PORT
-        self.socket_server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket_server.setsockopt(
-            socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket_server.bind(('', self.port))  # Listen on any valid IP
+        self.socket_server = self._make_socket()
+
+        # a burst of datagrams is drained into preallocated buffers at once
+        self.receiver = BatchReceiver(self.socket_server, self.ring_size)
+        receiver = self.receiver
 
         while self.listen:
 
-            data, unused_address = self.socket_server.recvfrom(1024)
-
-            # only dealing with Art-Net DMX
-            if self.validate_header(data):
-
-                # check if this address is in any registered listener
-                for listener in self.listeners:
-
-                    # is it the address we are listening to
-                    if listener['address_mask'] == data[14:16]:
-
-                        # check if the packet we've received is old
-                        new_seq = data[12]
-                        old_seq = listener['sequence']
-                        # if there's a >50% packet loss it's not our problem
-                        if new_seq == 0x00 or new_seq > old_seq or old_seq - new_seq > 0x80:
-                            listener['sequence'] = new_seq
-
-                            listener['buffer'] = list(data)[18:]
-
-                            # check for registered callbacks
-                            callback = listener['callback']
-                            if callback is not None:
-                                # choose the correct callback call based
-                                # on the number of the function's parameters
-                                try:
-                                    from inspect import signature
-                                    params = signature(callback).parameters
-                                    params_len = len(params)
-                                except ImportError:
-                                    params_len = 2
-                                
-                                if params_len == 1:
-                                    callback(listener['buffer'])
-                                elif params_len == 2:
-                                    addr_mask = listener['address_mask']
-                                    addr = int.from_bytes(addr_mask, 'little')
-                                    callback(listener['buffer'], addr)
+            # wake up now and then to see if we should still be listening
+            count = receiver.receive(0.5)
+            for i in range(count):
+                self._handle_packet(receiver.packet(i), receiver.addresses[i])
+            # held data must not wait for traffic that may never come
+            self._expire_sync()
+
+        self.socket_server.close()
+
+    def _handle_packet(self, data, address):
+        """Dispatches one received datagram to its listeners."""
+        metrics = self.metrics
+        # ArtDmx stays on this path, other opcodes go by the table
+        if len(data) < 18 or not self.validate_header(data):
+            self.__handle_other(data, address)
+            return
+        if metrics is not None:
+            metrics.count('packets_received')
+
+        for tap in self.taps:
+            tap(data, address)
+        if self.dmx_handlers:
+            packet = decode_packet(data)
+            for handler in self.dmx_handlers:
+                handler(packet, address)
+
+        new_seq, port_address, length_hi, length_lo = ARTDMX_FIELDS.unpack_from(data)
+        # Length is never more than we received
+        length = min(length_hi << 8 | length_lo, len(data) - 18, 512)
+        # look up listeners for this Port-Address
+        listeners = self.listener_index.get(port_address)
+        if not listeners and not self.store_writes:
+            if metrics is not None:
+                metrics.count('packets_unrouted')
+            return
+
+        # network loss shows up per source, whatever listeners make of it
+        now = monotonic()
+        source_key = (address[0] if address else None, port_address)
+        source = self.sources.get(source_key)
+        if source is None:
+            if len(self.sources) >= self.max_sources or \
+                    now - self.sources_swept > self.source_timeout:
+                self.__expire_sources(now)
+            source = self.sources[source_key] = new_source_state(now)
+        elif now - source['arrival'] > self.source_timeout:
+            # a source back from silence may have restarted its sequence
+            source['sequence'] = 0
+        source['arrival'] = now
+        source['arrivals'].append(now)
+        source_result = count_sequence(source, new_seq)
+        if metrics is not None and source_result != 'received':
+            metrics.count(DROP_COUNTERS[source_result])
+
+        if self.store_writes and source_result == 'received':
+            self.store.write(port_address, socket.inet_aton(source_key[0] or '0.0.0.0'),
+                             new_seq, data[18:18 + length])
+        # a universe only published to the store
+        if not listeners:
+            return
+
+        # while ArtSync keeps coming, data waits in the pending buffers
+        latched = False
+        if self.artsync:
+            sync_arrival = self.sync_arrival
+            latched = sync_arrival is not None and now - sync_arrival <= self.sync_timeout
+            if not latched and self.latched:
+                # syncs stopped, what was held is the latest data there is
+                self.__commit_latched()
+
+        for listener in listeners:
+
+            target = listener['pending'] if latched else listener
+            merge = listener['merge']
+            if merge is not None:
+                # sequence is tracked per source
+                listener[source_result] += 1
+                if source_result != 'received':
+                    continue
+                merge(data, length, source_key[0], now, target)
+            else:
+                # check if the packet we've received is old
+                if count_sequence(listener, new_seq) != 'received':
+                    continue
+
+                listener['store'](data, length, target)
+
+            if metrics is not None:
+                metrics.count('listener_packets', 1, listener['label'])
+            if latched:
+                # the callback runs once the ArtSync applies the data
+                if not target['dirty']:
+                    target['dirty'] = True
+                    self.latched.append(listener)
+                continue
+
+            # callback call prepared at registration
+            dispatch = listener['dispatch']
+            if dispatch is None:
+                continue
+            if metrics is not None:
+                start = perf_counter()
+                dispatch(listener['buffer'])
+                metrics.observe('callback_seconds', perf_counter() - start,
+                                listener['label'])
+            else:
+                dispatch(listener['buffer'])
+
+    def __expire_sources(self, now):
+        """Drops the statistics of sources silent for source_expiry."""
+        self.sources_swept = now
+        sources = self.sources
+        expiry = self.source_expiry
+        for key in [k for k, v in sources.items() if now - v['arrival'] > expiry]:
+            del sources[key]
+        if len(sources) >= self.max_sources:
+            # still full, e.g. many short lived senders, keep the latest 3/4
+            by_arrival = sorted(sources, key=lambda k: sources[k]['arrival'])
+            for key in by_arrival[:len(sources) - self.max_sources * 3 // 4]:
+                del sources[key]
+
+    def __handle_other(self, data, address):
+        """Decodes packets other than ArtDmx and calls their handlers."""
+        metrics = self.metrics
+        opcode = read_opcode(data)
+        packet_type = PACKET_TYPES.get(opcode)
+        if packet_type is None or len(data) < packet_type[1]:
+            if metrics is not None:
+                metrics.count('packets_invalid')
+            return
+        if metrics is not None:
+            metrics.count('packets_other')
+
+        handlers = self.handlers.get(opcode)
+        if not handlers:
+            return
+        packet = decode_packet(data)
+        if packet is None:
+            return
+        for handler in handlers:
+            handler(packet, address)
+
+    def __handle_sync(self, packet, address):
+        """ArtSync handler, applies the data held since the last one."""
+        self.sync_arrival = monotonic()
+        self.__commit_latched()
+
+    def _expire_sync(self):
+        """Applies held data once no ArtSync came for sync_timeout."""
+        if not self.latched:
+            return
+        sync_arrival = self.sync_arrival
+        if sync_arrival is None or monotonic() - sync_arrival > self.sync_timeout:
+            self.__commit_latched()
+
+    def __commit_latched(self):
+        """Applies pending buffers and calls the callbacks of one frame."""
+        latched, self.latched = self.latched, []
+        metrics = self.metrics
+        committed = []
+        frame = {}
+        for listener in latched:
+            pending = listener['pending']
+            # cleared or already applied
+            if not pending['dirty']:
+                continue
+            pending['dirty'] = False
+            backing = listener['backing']
+            if backing is None:
+                # lists and bytes are new objects per packet, hand it over
+                listener['buffer'] = pending['buffer']
+            else:
+                # memoryview and numpy buffers are updated in place
+                data = pending['buffer']
+                buffer = listener['buffer']
+                if len(buffer) != len(data):
+                    buffer = backing[:len(data)]
+                    listener['buffer'] = buffer
+                buffer[:] = data
+            committed.append(listener)
+            frame[listener['id']] = listener['buffer']
+        if not committed:
+            return
+        if metrics is not None:
+            metrics.count('sync_frames')
+
+        for listener in committed:
+            dispatch = listener['dispatch']
+            if dispatch is None:
+                continue
+            if metrics is not None:
+                start = perf_counter()
+                dispatch(listener['buffer'])
+                metrics.observe('callback_seconds', perf_counter() - start,
+                                listener['label'])
+            else:
+                dispatch(listener['buffer'])
+
+        frame_callback = self.frame_callback
+        if frame_callback is not None:
+            frame_callback(frame)
 
     def __del__(self):
         """Graceful shutdown."""
-        self.listeners.clear()
+        self.delete_all_listener()
         self.close()
 
     def __str__(self):
@@ -94,7 +441,8 @@ class StupidArtnetServer():
         return state
 
     def register_listener(self, universe=0, sub=0, net=0,
-                          is_simplified=True, callback_function=None):
+                          is_simplified=True, callback_function=None,
+                          buffer_mode=BUFFER_LIST, merge_mode=None):
         """Adds a listener to an Art-Net Universe.
 
         Args:
@@ -104,21 +452,52 @@ class StupidArtnetServer():
         is_simplified - Whether to use nets and subnet or universe only,
         see User Guide page 5 (Universe Addressing)
         callback_function - Function to call when new packet is received
+        buffer_mode - How received data is kept:
+            'list' - a new list of ints per packet
+            'bytes' - a new bytes object per packet
+            'memoryview' - a view of a preallocated buffer, updated in place
+            'numpy' - a view of a preallocated uint8 array, updated in place
+        merge_mode - How packets from several sources are combined:
+            None - every packet overwrites the buffer
+            'htp' - highest value of each channel across sources
+            'ltp' - data of the latest packet from any source
 
         Returns:
         id - id of listener, used to delete listener if required
         """
+        if buffer_mode == BUFFER_NUMPY and np is None:
+            print("ERROR: numpy not available, using list buffer")
+            buffer_mode = BUFFER_LIST
+        if buffer_mode not in BUFFER_MODES:
+            print("ERROR: Unknown buffer mode, using list buffer")
+            buffer_mode = BUFFER_LIST
+        if merge_mode is not None and merge_mode not in MERGE_MODES:
+            print("ERROR: Unknown merge mode, not merging")
+            merge_mode = None
+
         listener_id = len(self.listeners)
         new_listener = {
             'id': listener_id,
+            'label': label('listener', listener_id),
             'simplified': is_simplified,
             'address_mask': make_address_mask(universe, sub, net, is_simplified),
             'callback': callback_function,
+            'dispatch': None,
+            'buffer_mode': buffer_mode,
+            'backing': None,
+            'store': None,
             'buffer': [],
-            'sequence': 0
+            'merge_mode': merge_mode,
+            'merge': None,
+            'sources': {}
         }
+        new_listener.update(new_sequence_state())
 
+        self.__make_store(new_listener)
+        self.__make_merge(new_listener)
+        self.__make_dispatch(new_listener)
         self.listeners.append(new_listener)
+        self.__update_index()
 
         return listener_id
 
@@ -133,6 +512,7 @@ class StupidArtnetServer():
         """
         self.listeners = [
             i for i in self.listeners if not i['id'] == listener_id]
+        self.__update_index()
 
     def delete_all_listener(self):
         """Deletes all registered listeners.
@@ -141,6 +521,7 @@ class StupidArtnetServer():
         None
         """
         self.listeners = []
+        self.__update_index()
 
     def see_buffer(self, listener_id):
         """Show buffer values."""
@@ -162,13 +543,120 @@ class StupidArtnetServer():
         """Clear buffer in listener."""
         for listener in self.listeners:
             if listener.get('id') == listener_id:
-                listener['buffer'] = []
+                self.__clear_buffer(listener)
+                listener['sources'].clear()
+
+    def add_tap(self, tap_function):
+        """Adds a function called with every ArtDmx packet received.
+
+        Taps see the raw datagram and sender address, before sequence
+        checks and listeners, e.g. to record a show with ArtnetRecorder.
+        The datagram is only valid during the call.
+
+        Args:
+        tap_function - function taking (data, address)
+
+        Returns:
+        None
+        """
+        # replace rather than mutate, the server thread may be iterating
+        self.taps = self.taps + (tap_function,)
+
+    def remove_tap(self, tap_function):
+        """Removes a function added with add_tap."""
+        self.taps = tuple(t for t in self.taps if t != tap_function)
+
+    def register_handler(self, opcode, handler_function):
+        """Adds a function called with every packet of an opcode.
+
+        Handlers get the packet decoded as a dict, see ArtnetPackets,
+        and the sender address. ArtDmx handlers run before sequence
+        checks and listeners, the data memoryview is only valid during
+        the call.
+
+        Args:
+        opcode - one of the OP_ constants in ArtnetPackets, e.g. OP_SYNC
+        handler_function - function taking (packet, address)
+
+        Returns:
+        boolean - False if the opcode is not one that can be decoded
+        """
+        if opcode not in PACKET_TYPES:
+            print("ERROR: Unknown opcode, handler not registered")
+            return False
+        # replace rather than mutate, the server thread may be reading
+        handlers = dict(self.handlers)
+        handlers[opcode] = handlers.get(opcode, ()) + (handler_function,)
+        self.handlers = handlers
+        self.dmx_handlers = handlers.get(OP_DMX, ())
+        return True
+
+    def remove_handler(self, opcode, handler_function):
+        """Removes a function added with register_handler."""
+        handlers = dict(self.handlers)
+        remaining = tuple(h for h in handlers.get(opcode, ()) if h != handler_function)
+        if remaining:
+            handlers[opcode] = remaining
+        else:
+            handlers.pop(opcode, None)
+        self.handlers = handlers
+        self.dmx_handlers = handlers.get(OP_DMX, ())
+
+    def get_stats(self, listener_id):
+        """Return receive statistics of a listener.
+
+        Args:
+        listener_id - Id of listener
+
+        Returns:
+        dict - received, stale, duplicates, gaps and jitter (seconds) of
+        the listener, and the same per source IP under 'sources'.
+        Sources are counted apart from listeners, so gaps there point
+        at packets lost on the network rather than dropped here. Jitter
+        is that of the last JITTER_HISTORY packets, a listener reports
+        its most uneven source.
+        """
+        for listener in self.listeners:
+            if listener.get('id') == listener_id:
+                break
+        else:
+            print("Listener not found")
+            return {}
+
+        port_address = int.from_bytes(listener['address_mask'], 'little')
+        sources = {}
+        for key, state in list(self.sources.items()):
+            if key[1] == port_address:
+                source = sources[key[0]] = {k: state[k] for k in STATS_KEYS}
+                # copied first, the server thread may be appending
+                source['jitter'] = arrival_jitter(tuple(state['arrivals']))
+        stats = {k: listener[k] for k in STATS_KEYS}
+        stats['jitter'] = max((s['jitter'] for s in sources.values()), default=0.0)
+        if listener['merge'] is not None and sources:
+            # merged sources each keep their own sequence
+            stats['gaps'] = sum(s['gaps'] for s in sources.values())
+        stats['sources'] = sources
+        return stats
+
+    def get_sources(self, listener_id):
+        """Return the source IPs currently merged into a listener."""
+        for listener in self.listeners:
+            if listener.get('id') == listener_id:
+                return list(listener['sources'])
+        return []
+
+    def is_synced(self):
+        """Whether received data is held until the next ArtSync."""
+        sync_arrival = self.sync_arrival
+        return (self.artsync and sync_arrival is not None and
+                monotonic() - sync_arrival <= self.sync_timeout)
 
     def set_callback(self, listener_id, callback_function):
         """Add / change callback to a given listener."""
         for listener in self.listeners:
             if listener.get('id') == listener_id:
                 listener['callback'] = callback_function
+                self.__make_dispatch(listener)
 
     def set_address_filter(self, listener_id, universe, sub=0, net=0,
                            is_simplified=True):
@@ -182,11 +670,179 @@ class StupidArtnetServer():
             if listener.get('id') == listener_id:
                 listener['simplified'] = is_simplified
                 listener['address_mask'] = address_mask
-                listener['buffer'] = []
+                self.__clear_buffer(listener)
+                listener['sources'].clear()
+                self.__make_dispatch(listener)
+        self.__update_index()
+
+    @staticmethod
+    def __clear_buffer(listener):
+        """Empties the listener and pending buffers, keeping their type."""
+        mode = listener['buffer_mode']
+        for target in (listener, listener['pending']):
+            if mode == BUFFER_BYTES:
+                target['buffer'] = b''
+            elif mode in (BUFFER_MEMORYVIEW, BUFFER_NUMPY):
+                target['buffer'] = target['backing'][:0]
+            else:
+                target['buffer'] = []
+        listener['pending']['dirty'] = False
+
+    @staticmethod
+    def __make_store(listener):
+        """Binds how received DMX data is kept in the listener buffer.
+
+        The store call takes the datagram, the DMX data length and
+        where to keep it: the listener, or its pending buffers while
+        waiting for an ArtSync. Both have a 'buffer' and a 'backing'.
+        """
+        mode = listener['buffer_mode']
+        pending = {'buffer': None, 'backing': None, 'dirty': False}
+        listener['pending'] = pending
+
+        if mode == BUFFER_BYTES:
+            def store(data, length, target=listener):
+                target['buffer'] = bytes(data[18:18 + length])
+
+        elif mode == BUFFER_MEMORYVIEW:
+            listener['backing'] = memoryview(bytearray(512))
+            pending['backing'] = memoryview(bytearray(512))
+
+            def store(data, length, target=listener):
+                buffer = target['buffer']
+                if len(buffer) != length:
+                    buffer = target['backing'][:length]
+                    target['buffer'] = buffer
+                buffer[:] = memoryview(data)[18:18 + length]
+
+        elif mode == BUFFER_NUMPY:
+            listener['backing'] = np.zeros(512, dtype=np.uint8)
+            pending['backing'] = np.zeros(512, dtype=np.uint8)
+
+            def store(data, length, target=listener):
+                buffer = target['buffer']
+                if len(buffer) != length:
+                    buffer = target['backing'][:length]
+                    target['buffer'] = buffer
+                buffer[:] = np.frombuffer(data, np.uint8, length, 18)
+
+        else:
+            def store(data, length, target=listener):
+                target['buffer'] = list(data[18:18 + length])
+
+        listener['store'] = store
+        StupidArtnetServer.__clear_buffer(listener)
+
+    def __make_merge(self, listener):
+        """Binds the merge of several sources into the listener buffer.
+
+        Each source IP keeps its own 512 channel buffer, sequence is
+        checked per source before the merge is called. The merge call
+        takes the datagram, the DMX data length, the source IP, the
+        arrival time and where to store the merged result, as store.
+        """
+        mode = listener['merge_mode']
+        if mode is None:
+            listener['merge'] = None
+            return
+
+        sources = listener['sources']
+        store = listener['store']
+        # merged result laid out as a datagram, so it can go through store
+        merged = bytearray(18 + 512)
+        numpy = np
+        if numpy is not None:
+            merged_data = numpy.frombuffer(merged, numpy.uint8, 512, 18)
+        else:
+            merged_data = memoryview(merged)[18:]
+
+        def merge(data, length, source_ip, now, target=listener):
+            source = sources.get(source_ip)
+            if source is None:
+                source = {
+                    'data': numpy.zeros(512, numpy.uint8) if numpy is not None else bytearray(512),
+                    'length': 0,
+                }
+                sources[source_ip] = source
+            source['seen'] = now
+
+            # channels past a shorter packet count as 0
+            buffer = source['data']
+            if numpy is not None:
+                buffer[length:source['length']] = 0
+                buffer[:length] = numpy.frombuffer(data, numpy.uint8, length, 18)
+            else:
+                buffer[length:source['length']] = bytes(max(source['length'] - length, 0))
+                buffer[:length] = memoryview(data)[18:18 + length]
+            source['length'] = length
+
+            # forget sources that went quiet
+            timeout = self.source_timeout
+            for key in [k for k, v in sources.items() if now - v['seen'] > timeout]:
+                del sources[key]
+
+            if mode == MERGE_LTP or len(sources) == 1:
+                merged_data[:length] = buffer[:length]
+                store(merged, length, target)
+                return
+
+            # HTP, all channels in one vectorized pass
+            merged_length = max(v['length'] for v in sources.values())
+            buffers = [v['data'] for v in sources.values()]
+            if numpy is not None:
+                numpy.maximum(buffers[0], buffers[1], out=merged_data)
+                for other in buffers[2:]:
+                    numpy.maximum(merged_data, other, out=merged_data)
+            else:
+                merged_data[:] = bytes(map(max, *buffers))
+            store(merged, merged_length, target)
+
+        listener['merge'] = merge
+
+    @staticmethod
+    def __make_dispatch(listener):
+        """Binds the listener callback to a one argument call.
+
+        The callback signature is inspected once here rather than on
+        every packet, callbacks take (buffer) or (buffer, address).
+        """
+        callback = listener['callback']
+        dispatch = None
+        if callback is not None:
+            # choose the correct callback call based
+            # on the number of the function's parameters
+            try:
+                from inspect import signature
+                params_len = len(signature(callback).parameters)
+            except ImportError:
+                params_len = 2
+            except (TypeError, ValueError):
+                # no signature available, e.g. some builtins
+                params_len = 1
+
+            if params_len == 1:
+                dispatch = callback
+            elif params_len == 2:
+                port_address = int.from_bytes(listener['address_mask'], 'little')
+
+                def with_address(buffer):
+                    callback(buffer, port_address)
+                dispatch = with_address
+        listener['dispatch'] = dispatch
+
+    def __update_index(self):
+        """Rebuilds the Port-Address to listeners lookup."""
+        index = {}
+        for listener in self.listeners:
+            port_address = int.from_bytes(listener['address_mask'], 'little')
+            index.setdefault(port_address, []).append(listener)
+        # swap in one go, the server thread may be reading the old one
+        self.listener_index = index
 
     def close(self):
         """Close UDP socket."""
         self.listen = False         # Set flag, so thread will exit
+        # the server thread closes the socket on its way out
 
     @staticmethod
     def validate_header(header):
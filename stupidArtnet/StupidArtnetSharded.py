@@ -0,0 +1,230 @@
+"""Multi-core Art-Net server, receiving in several worker processes.
+
+NOTES
+- Every worker binds its own socket to the Art-Net port with
+SO_REUSEPORT, the kernel spreads senders across them
+- Workers parse packets and publish the DMX data to a shared memory
+ArtnetUniverseStore, the parent polls it and dispatches to listeners
+- Listeners, callbacks and buffers work as in StupidArtnetServer. The
+parent only sees the latest frame of each universe, frames replaced
+between two polls are skipped and show up as gaps in get_stats
+
+"""
+
+import os
+import socket
+import _thread
+import threading
+import multiprocessing
+from time import sleep, monotonic
+
+from stupidArtnet.StupidArtnetServer import StupidArtnetServer, new_sequence_state, \
+    count_sequence
+from stupidArtnet.ArtnetUniverseStore import ArtnetUniverseStore
+from stupidArtnet.ArtnetSocket import BatchReceiver
+
+HAS_REUSEPORT = hasattr(socket, 'SO_REUSEPORT')
+
+
+def run_worker(port, store_name, index, socket_buffer_size, ring_size, ready, stop):
+    """Receive loop of one worker process.
+
+    Args:
+    port - UDP port to listen on
+    store_name - shared memory name of the ArtnetUniverseStore
+    index - writer index of this worker in the store
+    socket_buffer_size - SO_RCVBUF in bytes, None keeps the OS default
+    ring_size - most datagrams drained from the socket in one go
+    ready - multiprocessing.Event set once the socket is bound
+    stop - multiprocessing.Event that ends the loop
+
+    Returns:
+    None
+
+    """
+    store = ArtnetUniverseStore(store_name, create=False)
+    store.set_writer(index)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if HAS_REUSEPORT:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    if socket_buffer_size:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, socket_buffer_size)
+    sock.bind(('', port))
+    receiver = BatchReceiver(sock, ring_size)
+    ready.set()
+
+    header = StupidArtnetServer.ARTDMX_HEADER
+    # sequence of each (Port-Address, source), stale packets never reach the store
+    sources = {}
+    full = False
+    while not stop.is_set():
+        count = receiver.receive(0.5)
+        for i in range(count):
+            data = receiver.packet(i)
+            if len(data) < 18 or data[:12] != header:
+                continue
+            port_address = data[14] | data[15] << 8
+            length = min(data[16] << 8 | data[17], len(data) - 18, 512)
+            key = (port_address, socket.inet_aton(receiver.addresses[i][0]))
+
+            state = sources.get(key)
+            if state is None:
+                state = sources[key] = new_sequence_state()
+            if count_sequence(state, data[12]) != 'received':
+                continue
+
+            if not store.write(port_address, key[1], data[12], data[18:18 + length]) \
+                    and not full:
+                full = True
+                print("ERROR: Universe store full, raise slots")
+
+    sock.close()
+    store.close()
+
+
+class StupidArtnetServerSharded(StupidArtnetServer):
+    """Art-Net server receiving in several processes."""
+
+    def __init__(self, port=6454, workers=None, socket_buffer_size=None, ring_size=64,
+                 slots=1024, poll_interval=0.001, store=None, metrics=None):
+        """Initializes sharded Art-Net server.
+
+        Args:
+        port - UDP port to listen on (default: 6454)
+        workers - number of receiving processes, default one per CPU
+        socket_buffer_size - SO_RCVBUF in bytes for each worker socket
+        ring_size - most datagrams drained from a socket in one go
+        slots - most (universe, source) pairs kept in the shared store
+        poll_interval - seconds between looks at the store when idle
+        store - ArtnetUniverseStore made with writers=workers for the
+        workers to publish to, by default one is created. Other
+        processes can read universes from it either way
+        metrics - ArtnetMetrics counting packets dispatched by the parent,
+        packets replaced in the store between two polls are not seen
+
+        Returns:
+        None
+
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and not HAS_REUSEPORT:
+            print("ERROR: SO_REUSEPORT not available, using a single worker")
+            workers = 1
+        self.workers = workers
+        self.slots = slots
+        self.poll_interval = poll_interval
+        self.user_store = store
+        self.processes = []
+        self.ready = []
+        self.stop_event = None
+        self.poll_thread = None
+        self.polling = threading.Event()
+        self.shutdown_lock = threading.Lock()
+        # the parent only reads the store, workers write it
+        super().__init__(port, socket_buffer_size, ring_size, metrics=metrics)
+
+    def __str__(self):
+        """Printable object state."""
+        state = "===================================\n"
+        state += "Stupid Artnet Listening\n"
+        state += f"Workers: {self.workers} \n"
+        return state
+
+    def _start(self):
+        """Starts worker processes and the dispatch thread."""
+        # spawn, forking a process with running threads is not safe
+        context = multiprocessing.get_context('spawn')
+        if self.user_store is not None and self.user_store.writers != self.workers:
+            print("ERROR: Universe store writers do not match workers, using a new store")
+            self.user_store = None
+        self.store = self.user_store
+        if self.store is None:
+            self.store = ArtnetUniverseStore(slots=self.slots, writers=self.workers)
+        self.stop_event = context.Event()
+        for index in range(self.workers):
+            ready = context.Event()
+            process = context.Process(
+                target=run_worker, daemon=True,
+                args=(self.port, self.store.name, index, self.socket_buffer_size,
+                      self.ring_size, ready, self.stop_event))
+            process.start()
+            self.ready.append(ready)
+            self.processes.append(process)
+        self.polling.set()
+        self.server_thread = _thread.start_new_thread(self.__poll, ())
+
+    def wait_ready(self, timeout=None):
+        """Waits until every worker is listening.
+
+        Args:
+        timeout - seconds to wait for each worker, None waits until ready
+
+        Returns:
+        boolean - True when all workers are ready
+        """
+        return all(ready.wait(timeout) for ready in self.ready)
+
+    def __poll(self):
+        """Dispatches universes the workers published to the store."""
+        self.poll_thread = _thread.get_ident()
+        store = self.store
+        packet = bytearray(18 + 512)
+        packet[:12] = self.ARTDMX_HEADER
+        view = memoryview(packet)
+        data = view[18:]
+        seen = bytes(len(store.generations) * 4)
+        last = [0] * store.slots
+
+        while self.listen:
+            snapshot = store.generations.tobytes()
+            if snapshot == seen:
+                sleep(self.poll_interval)
+                continue
+            seen = snapshot
+
+            for slot, generation in enumerate(store.generations.tolist()):
+                if generation == last[slot]:
+                    continue
+                slot_state = store.read_slot(slot, data)
+                if slot_state is None:
+                    # torn, try again on the next poll
+                    seen = b''
+                    continue
+                last[slot] = slot_state[0]
+                _, port_address, source, length, sequence, _ = slot_state
+                packet[12] = sequence
+                packet[14] = port_address & 0xFF
+                packet[15] = port_address >> 8
+                packet[16] = length >> 8
+                packet[17] = length & 0xFF
+                self._handle_packet(view[:18 + length], (socket.inet_ntoa(source), self.port))
+
+        data.release()
+        view.release()
+        self.polling.clear()
+        self.__shutdown()
+
+    def __shutdown(self):
+        """Stops workers and frees the shared store, once."""
+        with self.shutdown_lock:
+            if self.stop_event.is_set():
+                return
+            self.stop_event.set()
+            for process in self.processes:
+                process.join(2)
+            if self.user_store is None:
+                self.store.close()
+
+    def close(self):
+        """Stops workers and frees the shared store."""
+        self.listen = False         # Set flag, so thread will exit
+        if self.poll_thread == _thread.get_ident():
+            # called from a callback, the dispatch thread cleans up on its way out
+            return
+        # the store must outlive the dispatch thread
+        deadline = monotonic() + 1
+        while self.polling.is_set() and monotonic() < deadline:
+            sleep(self.poll_interval)
+        self.__shutdown()
@@ -1,4 +1,16 @@
 """Facilitates library imports."""
 from stupidArtnet.StupidArtnetServer import StupidArtnetServer
 from stupidArtnet.ArtnetUtils import shift_this, put_in_range, make_address_mask
+from stupidArtnet.ArtnetScheduler import FrameScheduler
+from stupidArtnet.ArtnetMetrics import ArtnetMetrics
+from stupidArtnet.ArtnetUniverseGroup import ArtnetUniverseGroup
+from stupidArtnet.ArtnetSync import ArtnetSyncGroup
+from stupidArtnet.ArtnetPixelMapper import ArtnetPixelMapper
+from stupidArtnet.ArtnetFader import ArtnetFader
+from stupidArtnet.ArtnetSceneStore import ArtnetSceneStore
+from stupidArtnet.ArtnetDiscovery import ArtnetDiscovery
+from stupidArtnet.ArtnetUniverseStore import ArtnetUniverseStore
+from stupidArtnet.ArtnetRecorder import ArtnetRecorder, ArtnetPlayer
 from .StupidArtnet import StupidArtnet
+from stupidArtnet.StupidArtnetAsync import StupidArtnetAsync, StupidArtnetServerAsync
+from stupidArtnet.StupidArtnetSharded import StupidArtnetServerSharded
@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+
+from stupidArtnet import StupidArtnetAsync, StupidArtnetServerAsync
+from stupidArtnet.StupidArtnetAsync import open_transport
+
+
+class Test(unittest.TestCase):
+    """Test class for asyncio Artnet client and server."""
+
+    port = 6468
+
+    def test_roundtrip(self):
+        """Async senders on a shared transport reach an async server."""
+        async def main():
+            received = {}
+
+            async def callback(data, address):
+                await asyncio.sleep(0)
+                received.setdefault(address, []).append(bytes(data))
+
+            server = StupidArtnetServerAsync(port=self.port)
+            await server.start()
+            server.register_listener(1, callback_function=callback)
+            plain = server.register_listener(2, buffer_mode='bytes')
+
+            transport = await open_transport()
+            senders = [StupidArtnetAsync(universe=u, packet_size=4,
+                                         fps=50, port=self.port)
+                       for u in (1, 2)]
+            for sender in senders:
+                await sender.open(transport)
+                sender.set_single_value(1, 10 + sender.universe)
+                sender.start()
+
+            await asyncio.sleep(0.3)
+            for sender in senders:
+                sender.stop()
+                sender.close()
+            transport.close()
+            await asyncio.sleep(0.05)
+            server.close()
+            return received, server.get_buffer(plain)
+
+        received, buffer = asyncio.run(main())
+        self.assertEqual(list(received), [1])
+        self.assertAlmostEqual(len(received[1]), 15, delta=5)
+        self.assertEqual(received[1][0], b'\x0b\x00\x00\x00')
+        self.assertEqual(buffer, b'\x0c\x00\x00\x00')
+
+    def test_own_transport(self):
+        """A sender opens and closes its own transport."""
+        async def main():
+            sender = StupidArtnetAsync(packet_size=4, port=self.port)
+            await sender.open()
+            transport = sender.transport
+            sender.show()
+            sender.close()
+            return transport
+
+        transport = asyncio.run(main())
+        self.assertTrue(transport.is_closing())
+
+    def test_sync_timeout(self):
+        """Held data is applied on the loop once ArtSync stops."""
+        async def main():
+            frames = []
+            server = StupidArtnetServerAsync(port=self.port, artsync=True,
+                                             frame_callback=frames.append)
+            await server.start()
+            listener = server.register_listener(1, buffer_mode='bytes')
+            server.sync_timeout = 0.2
+            server._handle_packet(b'Art-Net\x00\x00\x52\x00\x0e\x00\x00', None)
+            server._handle_packet(b'Art-Net\x00\x00P\x00\x0e\x00\x00\x01\x00\x00\x01\x07',
+                                  ('10.0.0.1', 6454))
+            held = server.get_buffer(listener)
+            await asyncio.sleep(0.8)
+            server.close()
+            return held, server.get_buffer(listener), frames, server.sync_timer
+
+        held, buffer, frames, timer = asyncio.run(main())
+        self.assertEqual((held, buffer), (b'', b'\x07'))
+        self.assertEqual(len(frames), 1)
+        self.assertIsNone(timer)
+
+
+if __name__ == '__main__':
+    unittest.main()
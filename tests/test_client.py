@@ -1,8 +1,14 @@
+import time
 import socket
 import unittest
 
 from stupidArtnet import StupidArtnet
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class Test(unittest.TestCase):
     """Test class for Artnet client."""
@@ -56,5 +62,284 @@ class Test(unittest.TestCase):
         self.assertEqual(self.received[self.header_size] + 24, 24)
 
 
+class TestZeroCopy(unittest.TestCase):
+    """Test class for Artnet client with a zero copy packet."""
+
+    header_size = 18
+    port = 6462
+
+    def setUp(self):
+        """Creates UDP Server and zero copy Art-Net Client."""
+        self.sock = socket.socket(
+            family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.sock.bind(('localhost', self.port))
+        self.sock.settimeout(2)
+
+        self.stupid = StupidArtnet(
+            universe=3, packet_size=24, port=self.port, zero_copy=True)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.sock.close()
+        del self.stupid
+
+    def test_shared_memory(self):
+        """Setters write straight into the wire packet."""
+        self.stupid.set_single_value(1, 10)
+        self.stupid.set_rgb(2, 20, 30, 40)
+        self.stupid.set_16bit(5, 0x1234)
+        self.assertEqual(self.stupid.packet[self.header_size:self.header_size + 6],
+                         bytearray([10, 20, 30, 40, 0x34, 0x12]))
+        self.assertEqual(self.stupid.packet[14], 3)
+
+    def test_send(self):
+        """Sent packets carry buffer and sequence."""
+        self.stupid.set(list(range(24)))
+        self.stupid.show()
+        self.stupid.set_single_value(24, 255)
+        self.stupid.show()
+
+        first = self.sock.recv(1024)
+        second = self.sock.recv(1024)
+        self.assertEqual(len(first), self.header_size + 24)
+        self.assertEqual(first[self.header_size:], bytes(range(24)))
+        self.assertEqual(second[-1], 255)
+        self.assertEqual(second[12], first[12] + 1)
+
+    def test_packet_size(self):
+        """Changing packet size remaps the buffer."""
+        self.stupid.set_packet_size(8)
+        self.assertEqual(len(self.stupid.buffer), 8)
+        self.stupid.clear()
+        self.stupid.show()
+        received = self.sock.recv(1024)
+        self.assertEqual(received[16:18], b'\x00\x08')
+        self.assertEqual(received[self.header_size:], bytes(8))
+
+
+class TestSendOnChange(unittest.TestCase):
+    """Test class for Artnet client sending on change only."""
+
+    def setUp(self):
+        """Creates UDP Server and Art-Net Client."""
+        self.sock = socket.socket(
+            family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.sock.bind(('localhost', 6463))
+        self.sock.settimeout(0.2)
+
+        self.stupid = StupidArtnet(
+            packet_size=8, port=6463, send_on_change=True, keep_alive=0.3)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.sock.close()
+        del self.stupid
+
+    def test_suppressed(self):
+        """Unchanged buffer is only sent once until keep alive."""
+        for _ in range(5):
+            self.stupid.tick()
+        self.assertEqual(self.stupid.get_send_stats(),
+                         {'sent': 1, 'suppressed': 4})
+
+        self.stupid.set_single_value(1, 100)
+        self.stupid.tick()
+        self.stupid.tick()
+        self.assertEqual(self.stupid.get_send_stats(),
+                         {'sent': 2, 'suppressed': 5})
+        self.sock.recv(1024)
+        self.assertEqual(self.sock.recv(1024)[18], 100)
+
+    def test_keep_alive(self):
+        """Unchanged buffer is resent after keep alive."""
+        self.stupid.tick()
+        time.sleep(0.35)
+        self.stupid.tick()
+        self.assertEqual(self.stupid.packets_sent, 2)
+
+    def test_direct_write(self):
+        """Direct buffer writes need mark_dirty."""
+        self.stupid.tick()
+        self.stupid.buffer[0] = 1
+        self.stupid.tick()
+        self.stupid.mark_dirty()
+        self.stupid.tick()
+        self.assertEqual(self.stupid.get_send_stats(),
+                         {'sent': 2, 'suppressed': 1})
+
+
+class TestBulk(unittest.TestCase):
+    """Test class for bulk setters, default and zero copy buffers."""
+
+    def run_both(self, check):
+        """Runs a check against a default and a zero copy client."""
+        for zero_copy in (False, True):
+            stupid = StupidArtnet(packet_size=16, zero_copy=zero_copy)
+            check(stupid)
+            del stupid
+
+    def test_set_range(self):
+        """Values are clamped and placed from the start address."""
+        def check(stupid):
+            stupid.set_range(3, [1, 300, -5, 2.7])
+            self.assertEqual(bytes(stupid.buffer[:7]), b'\x00\x00\x01\xff\x00\x02\x00')
+            stupid.set_range(15, b'\x09\x09')
+            self.assertEqual(stupid[14:16], b'\x09\x09')
+            # past the packet size nothing changes
+            stupid.set_range(16, [1, 2])
+            self.assertEqual(stupid[15], 9)
+        self.run_both(check)
+
+    def test_slices(self):
+        """Slice and index assignment."""
+        def check(stupid):
+            stupid[0] = 500
+            stupid[1:4] = [7, 8, 9]
+            stupid[4:6] = [1]
+            self.assertEqual(bytes(stupid.buffer[:6]), b'\xff\x07\x08\x09\x00\x00')
+            self.assertEqual(len(stupid.buffer), 16)
+        self.run_both(check)
+
+    def test_16bit_range(self):
+        """16 bit values in both byte orders, same as set_16bit."""
+        def check(stupid):
+            stupid.set_16bit_range(1, [0x1234, 70000])
+            self.assertEqual(bytes(stupid.buffer[:4]), b'\x34\x12\xff\xff')
+            stupid.set_16bit_range(5, [0x1234], high_first=True)
+            stupid.set_16bit(7, 0x1234, high_first=True)
+            self.assertEqual(stupid[4:6], stupid[6:8])
+        self.run_both(check)
+
+    def test_fixtures(self):
+        """Fixture rows are flattened in place."""
+        def check(stupid):
+            stupid.set_fixtures(2, [(1, 2, 3), (4, 5, 6)])
+            self.assertEqual(bytes(stupid.buffer[:8]), b'\x00\x01\x02\x03\x04\x05\x06\x00')
+        self.run_both(check)
+
+    @unittest.skipIf(np is None, 'numpy not installed')
+    def test_numpy(self):
+        """NumPy arrays are clipped in one go."""
+        def check(stupid):
+            stupid.set_range(1, np.array([-1.0, 128.4, 999]))
+            stupid[3:5] = np.array([4, 5], dtype=np.uint8)
+            stupid.set_fixtures(6, np.array([[1, 2], [3, 4]]))
+            stupid.set_16bit_range(10, np.array([0x0102, 0x0304]), high_first=True)
+            self.assertEqual(bytes(stupid.buffer[:13]),
+                             b'\x00\x80\xff\x04\x05\x01\x02\x03\x04\x01\x02\x03\x04')
+        self.run_both(check)
+
+    @unittest.skipIf(np is None, 'numpy not installed')
+    def test_numpy_2d(self):
+        """2D arrays are checked by their flattened size."""
+        def check(stupid):
+            before = bytes(stupid.buffer)
+            # 6 rows of 3 is 18 values, more than the 16 channels
+            stupid.set_range(1, np.ones((6, 3)))
+            stupid[0:6] = np.ones((6, 3))
+            stupid.set_16bit_range(1, np.ones((3, 3)))
+            self.assertEqual(bytes(stupid.buffer), before)
+            stupid.set_range(1, np.full((5, 3), 7))
+            stupid[15:16] = np.ones((1, 1))
+            self.assertEqual(bytes(stupid.buffer), b'\x07' * 15 + b'\x01')
+        self.run_both(check)
+
+
+class TestDoubleBuffer(unittest.TestCase):
+    """Test class for Artnet client with a double buffered frame handoff."""
+
+    header_size = 18
+    port = 6470
+
+    def setUp(self):
+        """Creates UDP Server and double buffered Art-Net Client."""
+        self.sock = socket.socket(
+            family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.sock.bind(('localhost', self.port))
+        self.sock.settimeout(0.5)
+
+        self.stupid = StupidArtnet(
+            packet_size=16, port=self.port, double_buffer=True)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.sock.close()
+        del self.stupid
+
+    def test_commit(self):
+        """Only committed frames go out."""
+        self.stupid.set_single_value(1, 10)
+        self.stupid.show()
+        self.stupid.commit()
+        self.stupid.set_single_value(1, 20)
+        self.stupid.show()
+        self.assertEqual(self.sock.recv(1024)[self.header_size], 0)
+        self.assertEqual(self.sock.recv(1024)[self.header_size], 10)
+
+    def test_set_copies(self):
+        """set() copies into the back buffer."""
+        values = [1] * 16
+        back = self.stupid.buffer
+        self.stupid.set(values)
+        values[0] = 99
+        self.assertIs(self.stupid.buffer, back)
+        self.assertEqual(self.stupid[0], 1)
+
+    def test_packet_size(self):
+        """The back buffer follows packet size, packets stay well formed."""
+        self.stupid.set_single_value(1, 7)
+        self.stupid.set_packet_size(20)
+        self.assertEqual(len(self.stupid.buffer), 20)
+        self.stupid.clear()
+        self.stupid.commit()
+        self.stupid.show()
+        data = self.sock.recv(1024)
+        self.assertEqual(len(data), self.header_size + 20)
+        self.assertEqual(data[16] << 8 | data[17], 20)
+
+        self.stupid.set_packet_size(4)
+        self.stupid.commit()
+        self.stupid.show()
+        self.assertEqual(len(self.sock.recv(1024)), self.header_size + 4)
+
+    def test_not_zero_copy(self):
+        """zero_copy is not used when double buffered."""
+        stupid = StupidArtnet(packet_size=16, zero_copy=True, double_buffer=True)
+        self.assertIsNone(stupid.packet)
+        self.assertIsInstance(stupid.buffer, bytearray)
+        stupid.close()
+
+    def test_recycled(self):
+        """Packets are reused once the clock is done with them."""
+        packets = set()
+        for i in range(10):
+            self.stupid.set_single_value(1, i)
+            self.stupid.commit()
+            self.stupid.show()
+            packets.add(id(self.stupid._front))
+        self.assertLessEqual(len(packets), 3)
+        received = [self.sock.recv(1024) for _ in range(10)]
+        self.assertEqual([p[self.header_size] for p in received], list(range(10)))
+
+    def test_no_torn_frames(self):
+        """Frames written while the clock runs are sent whole."""
+        self.stupid.fps = 200
+        self.stupid.start()
+        for i in range(2000):
+            self.stupid.set([i % 256] * 16)
+            self.stupid.commit()
+        self.stupid.stop()
+
+        count = 0
+        try:
+            while True:
+                data = self.sock.recv(1024)[self.header_size:]
+                self.assertEqual(len(set(data)), 1)
+                count += 1
+        except socket.timeout:
+            pass
+        self.assertGreater(count, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
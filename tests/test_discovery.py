@@ -0,0 +1,140 @@
+import time
+import socket
+import threading
+import unittest
+
+from stupidArtnet import StupidArtnet, ArtnetUniverseGroup, ArtnetDiscovery
+from stupidArtnet.ArtnetDiscovery import parse_artpollreply
+from stupidArtnet.ArtnetUtils import make_artpollreply
+
+
+class StandInNode():
+    """Answers ArtPoll and records ArtDmx universes, on a loopback IP."""
+
+    def __init__(self, ip, port, port_addresses):
+        self.ip = ip
+        self.reply = make_artpollreply(ip, port_addresses, short_name=f'node {ip}')
+        self.silent = False
+        self.received = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((ip, port))
+        self.sock.settimeout(0.05)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            if data[8:10] == b'\x00\x20' and not self.silent:
+                self.sock.sendto(self.reply, address)
+            elif data[8:10] == b'\x00\x50':
+                self.received.append(data[14] | data[15] << 8)
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+class Test(unittest.TestCase):
+    """Test class for ArtPoll discovery and routing."""
+
+    port = 6479
+
+    def setUp(self):
+        """Two stand-in nodes, universe 2 is output by both."""
+        self.nodes = [StandInNode('127.0.0.2', self.port, [1, 2]),
+                      StandInNode('127.0.0.3', self.port, [2])]
+        self.discovery = ArtnetDiscovery(
+            ['127.0.0.2', '127.0.0.3'], port=self.port,
+            bind_address=('127.0.0.1', self.port), interval=0.05, timeout=0.3)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.discovery.stop()
+        self.discovery.close()
+        for node in self.nodes:
+            node.close()
+
+    def wait_for(self, condition, timeout=2.0):
+        """Waits until condition() is true."""
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_parse(self):
+        """A reply reads back as sent, nets and subnets included."""
+        node = parse_artpollreply(make_artpollreply(
+            '10.0.0.5', [0x1234, 0x1235], short_name='dimmer', bind_index=2))
+        self.assertEqual(node['ip'], '10.0.0.5')
+        self.assertEqual(node['short_name'], 'dimmer')
+        self.assertEqual(node['bind_index'], 2)
+        self.assertEqual(node['outputs'], (0x1234, 0x1235))
+        self.assertIsNone(parse_artpollreply(b'Art-Net\x00\x00\x50' + bytes(300)))
+
+    def test_discovery(self):
+        """Nodes are found, routed and dropped once silent."""
+        self.discovery.start()
+        self.assertTrue(self.wait_for(lambda: len(self.discovery.get_nodes()) == 2))
+        self.assertEqual(sorted(self.discovery.get_targets(2)), ['127.0.0.2', '127.0.0.3'])
+        self.assertEqual(self.discovery.get_targets(1), ['127.0.0.2'])
+
+        # one buffer, sent to both nodes outputting universe 2
+        sender = StupidArtnet('127.0.0.1', 2, 8, port=self.port)
+        self.discovery.route(sender)
+        sender.show()
+        self.assertTrue(self.wait_for(lambda: all(n.received for n in self.nodes)))
+        self.assertEqual(self.nodes[0].received, [2])
+        self.assertEqual(self.nodes[1].received, [2])
+
+        # the table expires nodes that stopped answering
+        self.nodes[1].silent = True
+        self.assertTrue(self.wait_for(lambda: len(self.discovery.get_nodes()) == 1))
+        self.assertEqual(sender.targets, (('127.0.0.2', self.port),))
+
+        self.discovery.unroute(sender)
+        self.assertIsNone(sender.targets)
+        sender.close()
+
+    def test_group(self):
+        """Group universes fan out by route, others keep their target."""
+        self.discovery.start()
+        self.assertTrue(self.wait_for(lambda: len(self.discovery.get_nodes()) == 2))
+
+        group = ArtnetUniverseGroup('127.0.0.1', packet_size=8, port=self.port,
+                                    use_sendmmsg=True)
+        for universe in (1, 2, 3):
+            group.add_universe(universe)
+        self.discovery.route(group)
+        self.assertEqual(len(group.batch.packets), 4)
+        # universe 3 has no node, it keeps the group target
+        self.assertEqual(group.universes[2]['targets'], None)
+
+        group.show()
+        self.assertTrue(self.wait_for(
+            lambda: len(self.nodes[0].received) == 2 and self.nodes[1].received))
+        self.assertEqual(sorted(self.nodes[0].received), [1, 2])
+        self.assertEqual(self.nodes[1].received, [2])
+        group.close()
+
+    def test_no_fallback(self):
+        """Without fallback, universes no node outputs are not sent."""
+        self.discovery.fallback = False
+        self.discovery.handle_packet(make_artpollreply('127.0.0.2', [1]))
+        sender = StupidArtnet('127.0.0.1', 5, 8, port=self.port)
+        self.discovery.route(sender)
+        self.assertEqual(sender.targets, ())
+
+        # expiry by the clock given
+        self.assertEqual(self.discovery.expire(time.monotonic() + 1), 1)
+        self.assertEqual(self.discovery.routes, {})
+        sender.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
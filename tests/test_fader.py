@@ -0,0 +1,164 @@
+import sys
+import unittest
+from unittest import mock
+
+from stupidArtnet import StupidArtnet, ArtnetFader, FrameScheduler
+from stupidArtnet.ArtnetFader import S_CURVE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Test(unittest.TestCase):
+    """Test class for the fade engine."""
+
+    def setUp(self):
+        """Creates three senders, one double buffered."""
+        self.senders = [StupidArtnet(universe=0, packet_size=8),
+                        StupidArtnet(universe=1, packet_size=8, zero_copy=True),
+                        StupidArtnet(universe=2, packet_size=8, double_buffer=True)]
+        self.fader = ArtnetFader(self.senders)
+        self.clock = mock.patch('stupidArtnet.ArtnetFader.monotonic', return_value=100.0)
+        self.time = self.clock.start()
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.clock.stop()
+        self.fader.stop()
+        for sender in self.senders:
+            sender.close()
+
+    def at(self, seconds):
+        """Runs a frame at seconds after the fade began."""
+        self.time.return_value = 100.0 + seconds
+        self.fader.tick()
+
+    def buffer(self, index):
+        """Returns the buffer of a sender as a list."""
+        return list(self.senders[index].buffer)
+
+    def test_linear(self):
+        """Every universe moves along the same line."""
+        self.fader.fade_to(200, 2.0)
+        self.at(0.5)
+        for index in range(3):
+            self.assertEqual(self.buffer(index), [50] * 8)
+        self.at(1.0)
+        self.assertEqual(self.buffer(0), [100] * 8)
+        self.assertTrue(self.fader.is_fading())
+        self.at(2.0)
+        self.assertEqual(self.buffer(2), [200] * 8)
+        self.assertFalse(self.fader.is_fading())
+
+    def test_double_buffer(self):
+        """Frames of double buffered senders are committed."""
+        sender = self.senders[2]
+        self.fader.fade_to(100, 1.0)
+        self.at(1.0)
+        # the committed packet carries the new data
+        self.assertEqual(list(sender._ready[18:]), [100] * 8)
+
+    def test_partial_target(self):
+        """Short rows and None leave the other channels alone."""
+        self.fader.set_values([[10, 20], None, [30]])
+        self.at(0.0)
+        self.assertEqual(self.buffer(0), [10, 20] + [0] * 6)
+        self.assertEqual(self.buffer(1), [0] * 8)
+        self.assertEqual(self.buffer(2), [30] + [0] * 7)
+
+        with mock.patch('builtins.print') as printed:
+            self.fader.fade_to([[1]], 1.0)
+        printed.assert_called_once()
+        self.assertFalse(self.fader.is_fading())
+
+    def test_interrupt(self):
+        """A new fade starts from where the last one got to."""
+        self.fader.fade_to(200, 2.0)
+        self.at(1.0)
+        # starts at 100, one second after the first fade began
+        self.fader.fade_to(0, 1.0)
+        self.at(1.5)
+        self.assertEqual(self.buffer(0), [50] * 8)
+
+    def test_crossfade(self):
+        """Crossfade from a given scene."""
+        self.fader.crossfade(100, [[200] * 8] * 3, 1.0)
+        self.at(0.5)
+        self.assertEqual(self.buffer(1), [150] * 8)
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_s_curve(self):
+        """S-curve eases in, is half way at half time."""
+        self.fader.fade_to(200, 1.0, curve=S_CURVE)
+        self.at(0.25)
+        # 3 * 0.25^2 - 2 * 0.25^3 = 0.15625
+        self.assertEqual(self.buffer(0)[0], 31)
+        self.at(0.5)
+        self.assertEqual(self.buffer(0)[0], 100)
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_delay(self):
+        """Channels wait their own delay, a wipe across the universe."""
+        delay = np.arange(512, dtype=np.float32) * 0.5
+        self.fader.fade_to(100, 1.0, delay=delay)
+        self.at(1.0)
+        self.assertEqual(self.buffer(0)[:4], [100, 50, 0, 0])
+        self.at(2.5)
+        self.assertEqual(self.buffer(2)[:6], [100, 100, 100, 100, 50, 0])
+        self.assertTrue(self.fader.is_fading())
+
+    def test_lists(self):
+        """Without numpy the same fade runs channel by channel."""
+        module = sys.modules['stupidArtnet.ArtnetFader']
+        numpy = module.np
+        module.np = None
+        try:
+            fader = ArtnetFader(self.senders)
+            fader.fade_to(200, 2.0, curve=S_CURVE)
+            self.time.return_value = 101.0
+            fader.tick()
+            self.assertEqual(self.buffer(0), [100] * 8)
+            self.time.return_value = 102.0
+            fader.tick()
+            self.assertEqual(self.buffer(2), [200] * 8)
+            self.assertFalse(fader.is_fading())
+        finally:
+            module.np = numpy
+
+    def test_scheduler_order(self):
+        """The fader runs before senders already on the clock."""
+        scheduler = FrameScheduler(fps=44)
+        self.senders[0].start(scheduler)
+        self.fader.start(scheduler)
+        self.assertEqual(scheduler.callbacks[0], self.fader.tick)
+        self.fader.stop()
+        self.senders[0].stop()
+        self.assertEqual(scheduler.callbacks, ())
+
+    def test_other_clock(self):
+        """The fader does not start on a clock its senders do not run on."""
+        scheduler = FrameScheduler(fps=44)
+        self.senders[1].start(scheduler)
+        with mock.patch('builtins.print') as printed:
+            self.assertFalse(self.fader.start())
+        printed.assert_called_once()
+        self.assertIsNone(self.fader.scheduler)
+        self.assertTrue(self.fader.start(scheduler))
+        self.assertEqual(scheduler.callbacks[0], self.fader.tick)
+        self.fader.stop()
+        self.senders[1].stop()
+
+    def test_own_clock(self):
+        """A clock started by the fader sends its senders, and stops them."""
+        self.assertTrue(self.fader.start())
+        scheduler = self.fader.scheduler
+        self.assertEqual(len(scheduler.callbacks), 4)
+        self.fader.stop()
+        self.assertEqual(scheduler.callbacks, ())
+        self.assertIsNone(self.senders[0].scheduler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import time
+import socket
+import unittest
+
+from stupidArtnet import StupidArtnet, StupidArtnetServer, ArtnetMetrics, FrameScheduler
+from stupidArtnet.ArtnetMetrics import Histogram, label
+
+
+class Test(unittest.TestCase):
+    """Test class for the metrics collector."""
+
+    def test_histogram(self):
+        """Values land in buckets, summary reads them back."""
+        histogram = Histogram((0.001, 0.01, 0.1))
+        for value in (0.0005, 0.005, 0.005, 0.05, 1.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 5)
+        self.assertEqual(summary['min'], 0.0005)
+        self.assertEqual(summary['max'], 1.0)
+        self.assertEqual(summary['p50'], 0.01)
+        self.assertEqual(summary['p99'], 1.0)
+
+    def test_snapshot(self):
+        """Counters and histograms show up by name, labels in braces."""
+        metrics = ArtnetMetrics()
+        metrics.count('packets_sent')
+        metrics.count('packets_sent', 2)
+        metrics.count('listener_packets', 1, label('listener', 0))
+        metrics.observe('send_seconds', 0.002)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['packets_sent'], 3)
+        self.assertEqual(snapshot['counters']['listener_packets{listener="0"}'], 1)
+        self.assertEqual(snapshot['histograms']['send_seconds']['count'], 1)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()['counters'], {})
+
+    def test_prometheus(self):
+        """Text dump follows the Prometheus exposition format."""
+        metrics = ArtnetMetrics(buckets=(0.001, 0.01))
+        metrics.count('socket_errors')
+        metrics.observe('callback_seconds', 0.005, label('listener', 3))
+        text = metrics.prometheus()
+
+        self.assertIn('# TYPE stupidartnet_socket_errors_total counter\n', text)
+        self.assertIn('stupidartnet_socket_errors_total 1\n', text)
+        self.assertIn('# TYPE stupidartnet_callback_seconds histogram\n', text)
+        self.assertIn(
+            'stupidartnet_callback_seconds_bucket{listener="3",le="0.001"} 0\n', text)
+        self.assertIn(
+            'stupidartnet_callback_seconds_bucket{listener="3",le="+Inf"} 1\n', text)
+        self.assertIn('stupidartnet_callback_seconds_count{listener="3"} 1\n', text)
+
+    def test_sinks(self):
+        """Sinks get snapshots on publish, also from the thread."""
+        metrics = ArtnetMetrics()
+        snapshots = []
+        metrics.add_sink(snapshots.append)
+        metrics.count('frames')
+        metrics.publish()
+        self.assertEqual(snapshots[0]['counters']['frames'], 1)
+
+        metrics.start(interval=0.02)
+        time.sleep(0.1)
+        metrics.stop()
+        self.assertGreater(len(snapshots), 2)
+
+        metrics.remove_sink(snapshots.append)
+        metrics.publish()
+        count = len(snapshots)
+        metrics.publish()
+        self.assertEqual(len(snapshots), count)
+
+    def test_sender(self):
+        """Sends are counted and timed, socket errors counted."""
+        metrics = ArtnetMetrics()
+        sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sink.bind(('127.0.0.1', 6477))
+        sender = StupidArtnet(port=6477, metrics=metrics)
+        for _ in range(5):
+            sender.show()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['packets_sent'], 5)
+        self.assertEqual(snapshot['histograms']['send_seconds']['count'], 5)
+
+        sender.socket_client.close()
+        sender.show()
+        self.assertEqual(metrics.snapshot()['counters']['socket_errors'], 1)
+        sink.close()
+
+    def test_scheduler(self):
+        """Frames and frame intervals are recorded."""
+        metrics = ArtnetMetrics()
+        scheduler = FrameScheduler(fps=100, metrics=metrics)
+        scheduler.add(lambda: None)
+        scheduler.start()
+        time.sleep(0.2)
+        scheduler.stop()
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['frames'], scheduler.frames)
+        intervals = snapshot['histograms']['frame_interval_seconds']
+        self.assertEqual(intervals['count'], scheduler.frames - 1)
+        self.assertIn('frame_jitter_seconds', snapshot['histograms'])
+
+    def test_server(self):
+        """Received, dropped and dispatched packets are counted."""
+        metrics = ArtnetMetrics()
+        server = StupidArtnetServer(port=6478, metrics=metrics)
+        listener = server.register_listener(1, callback_function=lambda data: None)
+
+        def packet(universe, sequence):
+            return (b'Art-Net\x00\x00P\x00\x0e' + bytes((sequence, 0, universe, 0, 0, 2)) +
+                    bytes(2))
+
+        address = ('10.0.0.1', 6454)
+        server._handle_packet(packet(1, 1), address)
+        server._handle_packet(packet(1, 2), address)
+        server._handle_packet(packet(1, 2), address)
+        server._handle_packet(packet(1, 1), address)
+        server._handle_packet(packet(2, 1), address)
+        server._handle_packet(b'Art-Net\x00\x00\x20', address)
+
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['packets_received'], 5)
+        self.assertEqual(counters['packets_duplicate'], 1)
+        self.assertEqual(counters['packets_stale'], 1)
+        self.assertEqual(counters['packets_unrouted'], 1)
+        self.assertEqual(counters['packets_invalid'], 1)
+        name = f'listener_packets{{{label("listener", listener)}}}'
+        self.assertEqual(counters[name], 2)
+        histograms = metrics.snapshot()['histograms']
+        self.assertEqual(histograms[f'callback_seconds{{listener="{listener}"}}']['count'], 2)
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
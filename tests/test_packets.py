@@ -0,0 +1,101 @@
+import unittest
+
+from stupidArtnet import StupidArtnetServer, ArtnetMetrics
+from stupidArtnet.ArtnetPackets import OP_DMX, OP_NZS, OP_SYNC, OP_TIMECODE, \
+    decode_packet, read_opcode
+from stupidArtnet.ArtnetUtils import make_artdmx_header, make_artsync_header, make_artpoll
+
+
+class Test(unittest.TestCase):
+    """Test class for opcode decoding and dispatch."""
+
+    port = 6480
+
+    def setUp(self):
+        """Creates server, packets are handed in directly."""
+        self.metrics = ArtnetMetrics()
+        self.stupid = StupidArtnetServer(port=self.port, metrics=self.metrics)
+        self.address = ('10.0.0.1', 6454)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        del self.stupid
+
+    def test_decode_dmx(self):
+        """ArtDmx fields read back as built, data is a view."""
+        packet = make_artdmx_header(3, 2, 1, False, packet_size=4, sequence=7) + \
+            bytes((1, 2, 3, 4))
+        decoded = decode_packet(packet)
+        self.assertEqual(decoded['name'], 'ArtDmx')
+        self.assertEqual(decoded['opcode'], OP_DMX)
+        self.assertEqual(decoded['version'], 14)
+        self.assertEqual(decoded['sequence'], 7)
+        self.assertEqual(decoded['port_address'], 1 << 8 | 2 << 4 | 3)
+        self.assertEqual(decoded['length'], 4)
+        self.assertIsInstance(decoded['data'], memoryview)
+        self.assertEqual(bytes(decoded['data']), bytes((1, 2, 3, 4)))
+
+        # Length is never more than what was received
+        self.assertEqual(decode_packet(packet[:20])['length'], 2)
+
+    def test_decode_other(self):
+        """Every opcode in the table decodes, junk does not."""
+        self.assertEqual(decode_packet(make_artsync_header())['opcode'], OP_SYNC)
+        poll = decode_packet(make_artpoll(flags=0x06, priority=0x40))
+        self.assertEqual((poll['flags'], poll['priority']), (0x06, 0x40))
+
+        timecode = decode_packet(b'Art-Net\x00\x00\x97\x00\x0e\x00\x00' +
+                                 bytes((24, 59, 30, 10, 1)))
+        self.assertEqual(timecode['opcode'], OP_TIMECODE)
+        self.assertEqual((timecode['hours'], timecode['minutes'], timecode['seconds'],
+                          timecode['frames'], timecode['type']), (10, 30, 59, 24, 1))
+
+        self.assertIsNone(read_opcode(b'Art-Net'))
+        self.assertIsNone(read_opcode(b'Not-Net\x00\x00\x50'))
+        self.assertIsNone(decode_packet(b'Art-Net\x00\x00\x52'))
+        self.assertIsNone(decode_packet(b'Art-Net\x00\x00\x99' + bytes(20)))
+
+    def test_handlers(self):
+        """Handlers get their opcode only, ArtDmx still reaches listeners."""
+        seen = []
+        listener = self.stupid.register_listener(3)
+        self.assertTrue(self.stupid.register_handler(
+            OP_SYNC, lambda packet, address: seen.append((packet['name'], address))))
+        self.assertTrue(self.stupid.register_handler(
+            OP_DMX, lambda packet, address: seen.append(bytes(packet['data']))))
+        self.assertFalse(self.stupid.register_handler(0x1234, print))
+
+        self.stupid._handle_packet(make_artsync_header(), self.address)
+        self.stupid._handle_packet(make_artpoll(), self.address)
+        self.stupid._handle_packet(make_artdmx_header(3, packet_size=2) + b'\x05\x06',
+                                   self.address)
+        self.assertEqual(seen, [('ArtSync', self.address), b'\x05\x06'])
+        self.assertEqual(self.stupid.get_buffer(listener), [5, 6])
+
+        counters = self.metrics.snapshot()['counters']
+        self.assertEqual(counters['packets_other'], 2)
+        self.assertEqual(counters['packets_received'], 1)
+
+    def test_remove_handler(self):
+        """Removed handlers are no longer called, short packets are invalid."""
+        seen = []
+
+        def handler(packet, address):
+            seen.append(packet['physical'])
+
+        self.stupid.register_handler(OP_NZS, handler)
+        nzs = bytearray(make_artdmx_header(0, packet_size=2) + bytes(2))
+        nzs[9] = 0x51
+        nzs[13] = 0xCC
+        self.stupid._handle_packet(bytes(nzs), self.address)
+        self.stupid.remove_handler(OP_NZS, handler)
+        self.stupid._handle_packet(bytes(nzs), self.address)
+        self.assertEqual(seen, [0xCC])
+        self.assertEqual(self.stupid.handlers, {})
+
+        self.stupid._handle_packet(b'Art-Net\x00\x00\x97\x00\x0e', self.address)
+        self.assertEqual(self.metrics.snapshot()['counters']['packets_invalid'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
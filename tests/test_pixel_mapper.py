@@ -0,0 +1,115 @@
+import sys
+import unittest
+
+from stupidArtnet import StupidArtnet, ArtnetPixelMapper
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Test(unittest.TestCase):
+    """Test class for the pixel mapper."""
+
+    width = 4
+    height = 2
+
+    def setUp(self):
+        """Creates two senders and a 4 x 2 frame."""
+        self.senders = [StupidArtnet(universe=u, packet_size=16) for u in range(2)]
+        # pixel (x, y) has colour (10 * x + y, 100 + x, 200 + y)
+        self.frame = bytes(v for y in range(self.height) for x in range(self.width)
+                           for v in (10 * x + y, 100 + x, 200 + y))
+
+    def tearDown(self):
+        """Destroy Objects."""
+        for sender in self.senders:
+            del sender
+
+    def buffer(self, index, size):
+        """Returns the start of a sender buffer as bytes."""
+        return bytes(self.senders[index].buffer[:size])
+
+    def test_serpentine(self):
+        """Serpentine matrix split across universes."""
+        mapper = ArtnetPixelMapper(self.width, self.height)
+        mapper.add_matrix(self.senders, serpentine=True, pixels_per_universe=4)
+        mapper.update(self.frame)
+        self.assertEqual(self.buffer(0, 12), bytes(
+            (0, 100, 200, 10, 101, 200, 20, 102, 200, 30, 103, 200)))
+        # second row runs right to left
+        self.assertEqual(self.buffer(1, 6), bytes((31, 103, 201, 21, 102, 201)))
+
+    def test_color_order(self):
+        """GRB strip at an offset address."""
+        mapper = ArtnetPixelMapper(self.width, self.height)
+        mapper.add_strip(self.senders[0], [(1, 1), (0, 0)], address=3,
+                         color_order='GRB')
+        mapper.update(self.frame)
+        self.assertEqual(self.buffer(0, 8), bytes((0, 0, 101, 11, 201, 100, 0, 200)))
+
+    def test_rgbw(self):
+        """White channel is the minimum of RGB."""
+        mapper = ArtnetPixelMapper(self.width, self.height)
+        mapper.add_strip(self.senders[0], [(3, 1)], color_order='RGBW')
+        mapper.add_strip(self.senders[1], [(3, 1)], color_order='BGR')
+        mapper.update(self.frame)
+        self.assertEqual(self.buffer(0, 4), bytes((31, 103, 201, 31)))
+        self.assertEqual(self.buffer(1, 3), bytes((201, 103, 31)))
+
+    def test_double_buffer(self):
+        """Frames written to double buffered senders are committed."""
+        sender = StupidArtnet(universe=2, packet_size=16, double_buffer=True)
+        mapper = ArtnetPixelMapper(self.width, self.height)
+        mapper.add_strip(sender, [(1, 0), (2, 1)])
+        mapper.update(self.frame)
+        self.assertEqual(bytes(sender._ready[18:24]), bytes((10, 101, 200, 21, 102, 201)))
+        sender.close()
+
+    def test_bad_patch(self):
+        """Patches that do not fit are refused."""
+        mapper = ArtnetPixelMapper(self.width, self.height)
+        mapper.add_strip(self.senders[0], [(4, 0)])
+        mapper.add_strip(self.senders[0], [(0, 0)] * 171)
+        mapper.add_matrix(self.senders, pixels_per_universe=2)
+        # 6 RGB pixels need 18 channels, the senders have 16
+        mapper.add_strip(self.senders[0], [(0, 0)] * 6)
+        self.assertEqual(mapper.outputs, [])
+
+    def test_packet_size(self):
+        """By default a matrix fills each sender up to its packet size."""
+        mapper = ArtnetPixelMapper(self.width, self.height)
+        mapper.add_matrix(self.senders)
+        self.assertEqual([len(out['pixels']) for out in mapper.outputs], [5, 3])
+        mapper.update(self.frame)
+        self.assertEqual(self.buffer(1, 3), bytes((11, 101, 201)))
+
+    @unittest.skipIf(np is None, 'numpy not installed')
+    def test_numpy_frame(self):
+        """H x W x 3 arrays are gathered in one go."""
+        mapper = ArtnetPixelMapper(self.width, self.height)
+        mapper.add_matrix(self.senders, pixels_per_universe=4)
+        frame = np.frombuffer(self.frame, dtype=np.uint8).reshape(
+            self.height, self.width, 3).astype(np.float32)
+        mapper.update(frame)
+        self.assertEqual(self.buffer(1, 3), bytes((1, 100, 201)))
+        self.assertIsInstance(mapper.table, np.ndarray)
+
+    def test_bytes_fallback(self):
+        """Raw frames are gathered without NumPy too."""
+        mapper_module = sys.modules['stupidArtnet.ArtnetPixelMapper']
+        numpy = mapper_module.np
+        mapper_module.np = None
+        try:
+            mapper = ArtnetPixelMapper(self.width, self.height)
+            mapper.add_matrix(self.senders, serpentine=True,
+                              pixels_per_universe=4, color_order='RGBW')
+            mapper.update(self.frame)
+        finally:
+            mapper_module.np = numpy
+        self.assertEqual(self.buffer(1, 4), bytes((31, 103, 201, 31)))
+
+
+if __name__ == '__main__':
+    unittest.main()
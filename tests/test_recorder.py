@@ -0,0 +1,143 @@
+import os
+import time
+import socket
+import tempfile
+import unittest
+
+from stupidArtnet import StupidArtnetServer, ArtnetRecorder, ArtnetPlayer
+from stupidArtnet.ArtnetRecorder import AS_FAST_AS_POSSIBLE
+
+
+class Test(unittest.TestCase):
+    """Test class for recording and playback."""
+
+    port = 6475
+
+    def setUp(self):
+        """Creates UDP Server and a recording path."""
+        self.sock = socket.socket(
+            family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.sock.bind(('localhost', self.port))
+        self.sock.settimeout(1)
+        handle, self.path = tempfile.mkstemp(suffix='.rec')
+        os.close(handle)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.sock.close()
+        os.remove(self.path)
+
+    @staticmethod
+    def packet(universe, value):
+        """Builds an ArtDmx packet of two channels."""
+        return (b'Art-Net\x00\x00P\x00\x0e\x00\x00' + bytes((universe, 0, 0, 2)) +
+                bytes((value, value)))
+
+    def record(self, frames=20, universes=3, period=0.01, close=True):
+        """Writes a recording with made up timestamps."""
+        recorder = ArtnetRecorder(self.path, buffer_size=256, index_interval=0.05)
+        for frame in range(frames):
+            for universe in range(universes):
+                recorder.write(self.packet(universe, frame), timestamp=100 + frame * period)
+        if close:
+            recorder.close()
+        else:
+            recorder.file.write(recorder.buffer)
+            recorder.file.close()
+            recorder.file = None
+        return recorder
+
+    def receive(self, count):
+        """Receives a number of packets."""
+        return [self.sock.recv(1024) for _ in range(count)]
+
+    def test_replay(self):
+        """All packets come back in order."""
+        self.record()
+        player = ArtnetPlayer(self.path, port=self.port, speed=AS_FAST_AS_POSSIBLE)
+        self.assertEqual(player.count, 60)
+        self.assertAlmostEqual(player.duration, 0.19)
+        self.assertEqual(player.play(), 60)
+        received = self.receive(60)
+        self.assertEqual(received[0], self.packet(0, 0))
+        self.assertEqual(received[-1], self.packet(2, 19))
+        player.close()
+
+    def test_timing(self):
+        """Real time playback takes as long as the recording."""
+        self.record(frames=11, period=0.02)
+        player = ArtnetPlayer(self.path, port=self.port, speed=2)
+        begin = time.monotonic()
+        player.play()
+        self.assertAlmostEqual(time.monotonic() - begin, 0.1, delta=0.05)
+        player.close()
+
+    def test_seek(self):
+        """Playback starts from the first packet at the seek time."""
+        self.record()
+        player = ArtnetPlayer(self.path, port=self.port, speed=AS_FAST_AS_POSSIBLE)
+        self.assertEqual(player.play(start=0.125, end=0.145), 6)
+        self.assertEqual(self.receive(1)[0], self.packet(0, 13))
+        player.close()
+
+    def test_resume(self):
+        """Playback stopped at a packet carries on with that packet."""
+        self.record()
+        player = ArtnetPlayer(self.path, port=self.port, speed=AS_FAST_AS_POSSIBLE)
+        self.assertEqual(player.play(end=0.045), 15)
+        self.assertEqual(player.play(), 45)
+        received = self.receive(60)
+        self.assertEqual(received[15], self.packet(0, 5))
+
+        # stopped while waiting for a packet
+        self.record(frames=2, period=5)
+        player.close()
+        player = ArtnetPlayer(self.path, port=self.port)
+        player.start()
+        self.assertEqual(self.receive(3)[2], self.packet(2, 0))
+        player.stop()
+        player.speed = AS_FAST_AS_POSSIBLE
+        self.assertEqual(player.play(), 3)
+        self.assertEqual(self.receive(1)[0], self.packet(0, 1))
+        player.close()
+
+    def test_unfinished(self):
+        """A recording that was never closed still plays."""
+        recorder = self.record(close=False)
+        player = ArtnetPlayer(self.path, port=self.port, speed=AS_FAST_AS_POSSIBLE)
+        self.assertEqual(player.count, 60)
+        # the index is rebuilt with the interval of the recorder
+        self.assertEqual(list(zip(player.index_times, player.index_offsets)),
+                         recorder.index)
+        player.seek(0.095)
+        self.assertEqual(player.play(), 30)
+        player.close()
+
+    def test_not_a_recording(self):
+        """Empty and foreign files are rejected with a clear error."""
+        with self.assertRaises(ValueError):
+            ArtnetPlayer(self.path, port=self.port)
+        with open(self.path, 'wb') as file:
+            file.write(b'not a recording at all')
+        with self.assertRaises(ValueError):
+            ArtnetPlayer(self.path, port=self.port)
+
+    def test_server_tap(self):
+        """A recorder taps every packet a server receives."""
+        server = StupidArtnetServer(port=6476)
+        recorder = ArtnetRecorder(self.path)
+        recorder.record(server)
+        server._handle_packet(self.packet(4, 9), ('127.0.0.1', 6454))
+        recorder.close()
+        server._handle_packet(self.packet(4, 10), ('127.0.0.1', 6454))
+        self.assertEqual(server.taps, ())
+
+        player = ArtnetPlayer(self.path, port=self.port)
+        self.assertEqual(player.play(), 1)
+        self.assertEqual(self.receive(1)[0], self.packet(4, 9))
+        player.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
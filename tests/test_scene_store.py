@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+
+from stupidArtnet import StupidArtnet, ArtnetSceneStore
+
+
+class Test(unittest.TestCase):
+    """Test class for the scene store."""
+
+    def setUp(self):
+        """Creates three senders, one double buffered."""
+        self.senders = [StupidArtnet(universe=0, packet_size=8),
+                        StupidArtnet(universe=1, packet_size=8, zero_copy=True),
+                        StupidArtnet(universe=2, packet_size=8, double_buffer=True)]
+        self.store = ArtnetSceneStore(self.senders)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        for sender in self.senders:
+            sender.close()
+
+    def buffer(self, index):
+        """Returns the buffer of a sender as a list."""
+        return list(self.senders[index].buffer)
+
+    def test_snapshot(self):
+        """A cue taken from the buffers comes back after a clear."""
+        for index, sender in enumerate(self.senders):
+            sender.set([index * 10 + c for c in range(8)])
+        self.store.store('look')
+        for sender in self.senders:
+            sender.clear()
+
+        self.assertTrue(self.store.recall('look'))
+        for index in range(3):
+            self.assertEqual(self.buffer(index), [index * 10 + c for c in range(8)])
+        # the double buffered sender got a committed frame
+        self.assertEqual(list(self.senders[2]._ready[18:]), [20 + c for c in range(8)])
+
+    def test_mask(self):
+        """Masked cues only touch their channels, in runs."""
+        scene = [[255] * 8, [128] * 8, None]
+        self.store.store('partial', scene, mask=[[1, 2, 3, 7], True, None])
+        block, runs = self.store.cues['partial']
+        self.assertEqual(len(block), 4 + 8)
+        self.assertEqual([(i, s, n) for i, s, _, n in runs], [(0, 0, 3), (0, 6, 1), (1, 0, 8)])
+
+        self.senders[0].set([1] * 8)
+        self.senders[2].set([2] * 8)
+        self.store.recall('partial')
+        self.assertEqual(self.buffer(0), [255, 255, 255, 1, 1, 1, 255, 1])
+        self.assertEqual(self.buffer(1), [128] * 8)
+        self.assertEqual(self.buffer(2), [2] * 8)
+
+    def test_mismatch(self):
+        """Scenes must have one row per sender."""
+        with mock.patch('builtins.print') as printed:
+            self.assertFalse(self.store.store('bad', [[1, 2]]))
+            self.assertFalse(self.store.recall('missing'))
+        self.assertEqual(printed.call_count, 2)
+
+    def test_lru(self):
+        """Least recently used cues go first once over the limit."""
+        store = ArtnetSceneStore(self.senders, max_cues=2)
+        store.store('a')
+        store.store('b')
+        store.recall('a')
+        store.store('c')
+        self.assertIn('a', store)
+        self.assertNotIn('b', store)
+        self.assertEqual(store.get_stats()['evictions'], 1)
+
+        size = store.bytes // 2
+        capped = ArtnetSceneStore(self.senders, max_bytes=size * 3)
+        for name in range(10):
+            capped.store(name)
+        self.assertEqual(len(capped), 3)
+        self.assertLessEqual(capped.bytes, size * 3)
+
+    def test_loader(self):
+        """Dropped cues are loaded again on recall."""
+        loads = []
+
+        def loader(name):
+            loads.append(name)
+            return [[name] * 8, None, None], None
+
+        store = ArtnetSceneStore(self.senders, max_cues=1, loader=loader)
+        self.assertTrue(store.recall(50))
+        self.assertEqual(self.buffer(0), [50] * 8)
+        store.recall(50)
+        store.recall(60)
+        store.recall(50)
+        self.assertEqual(loads, [50, 60, 50])
+        self.assertEqual(store.get_stats()['hits'], 1)
+        self.assertEqual(self.buffer(0), [50] * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
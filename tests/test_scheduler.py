@@ -0,0 +1,111 @@
+import time
+import socket
+import unittest
+
+from stupidArtnet import StupidArtnet, ArtnetUniverseGroup, ArtnetSyncGroup
+from stupidArtnet.ArtnetScheduler import FrameScheduler, CATCH_UP, SKIP
+
+
+class Test(unittest.TestCase):
+    """Test class for the frame scheduler."""
+
+    def test_rate(self):
+        """Ticks at the requested rate and joins on stop."""
+        ticks = []
+        scheduler = FrameScheduler(fps=100)
+        scheduler.add(lambda: ticks.append(time.monotonic()))
+        scheduler.start()
+        time.sleep(0.5)
+        scheduler.stop()
+
+        self.assertFalse(scheduler.thread.is_alive())
+        # deadlines are absolute, so the count should not drift
+        self.assertAlmostEqual(len(ticks), 50, delta=8)
+        count = len(ticks)
+        time.sleep(0.05)
+        self.assertEqual(len(ticks), count)
+
+        stats = scheduler.get_jitter_stats()
+        self.assertEqual(stats['count'], count - 1)
+        self.assertAlmostEqual(stats['p50'], 0.01, delta=0.005)
+        self.assertLessEqual(stats['p50'], stats['p99'])
+
+    def test_skip(self):
+        """Late frames are dropped with the skip policy."""
+        scheduler = FrameScheduler(fps=100, policy=SKIP)
+        scheduler.add(lambda: time.sleep(0.025))
+        scheduler.start()
+        time.sleep(0.3)
+        scheduler.stop()
+        self.assertGreater(scheduler.skipped, 0)
+        self.assertLess(scheduler.frames, 15)
+
+    def test_catch_up(self):
+        """Late frames are run back to back with the catch up policy."""
+        state = {'slow': True}
+
+        def callback():
+            if state['slow']:
+                state['slow'] = False
+                time.sleep(0.05)
+
+        scheduler = FrameScheduler(fps=100, policy=CATCH_UP, max_catch_up=10)
+        scheduler.add(callback)
+        scheduler.start()
+        time.sleep(0.3)
+        scheduler.stop()
+        self.assertEqual(scheduler.skipped, 0)
+        self.assertAlmostEqual(scheduler.frames, 30, delta=5)
+
+    def test_sender(self):
+        """StupidArtnet sends from a shared scheduler."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('localhost', 6461))
+        sock.settimeout(2)
+
+        scheduler = FrameScheduler(fps=50)
+        senders = [StupidArtnet(universe=u, packet_size=8, port=6461)
+                   for u in range(2)]
+        for sender in senders:
+            sender.start(scheduler)
+        scheduler.start()
+        received = [sock.recv(1024) for _ in range(4)]
+        for sender in senders:
+            sender.stop()
+        scheduler.stop()
+        sock.close()
+
+        universes = {packet[14] for packet in received}
+        self.assertEqual(universes, {0, 1})
+        self.assertEqual(scheduler.callbacks, ())
+
+    def test_sender_own_clock(self):
+        """StupidArtnet starts and joins its own scheduler."""
+        sender = StupidArtnet(packet_size=8, port=6461)
+        sender.start()
+        scheduler = sender.scheduler
+        self.assertTrue(scheduler.thread.is_alive())
+        sender.stop()
+        self.assertFalse(scheduler.thread.is_alive())
+        self.assertEqual(sender.get_jitter_stats(), {})
+        del sender
+
+    def test_ownership(self):
+        """Only the object that started a clock stops it."""
+        group = ArtnetUniverseGroup(packet_size=8, port=6461)
+        group.add_universe(0)
+        sync = ArtnetSyncGroup(fps=50)
+        group.start()
+        scheduler = group.scheduler
+        sync.start(scheduler)
+        self.assertEqual(scheduler.callbacks, (group.show, sync.commit))
+        sync.stop()
+        self.assertTrue(scheduler.thread.is_alive())
+        group.stop()
+        self.assertFalse(scheduler.thread.is_alive())
+        self.assertEqual(scheduler.callbacks, ())
+        group.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,16 @@
+import sys
 import time
 import socket
 import unittest
+from unittest import mock
 
 from stupidArtnet import StupidArtnetServer
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class Test(unittest.TestCase):
     """Test class for Artnet server."""
@@ -67,5 +74,320 @@ class Test(unittest.TestCase):
         self.assertFalse(StupidArtnetServer.validate_header(typo))
 
 
+class TestDispatch(unittest.TestCase):
+    """Test class for Port-Address indexed listener dispatch."""
+
+    port = 6464
+
+    def setUp(self):
+        """Creates UDP Client and server with a few listeners."""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.stupid = StupidArtnetServer(port=self.port)
+        self.received = []
+        self.u0 = self.stupid.register_listener(0)
+        self.u5 = self.stupid.register_listener(5)
+        self.u5_too = self.stupid.register_listener(
+            5, callback_function=lambda data, addr: self.received.append(addr))
+        self.u7 = self.stupid.register_listener(1, 0, 1, False)
+        time.sleep(0.5)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.sock.close()
+        del self.stupid
+
+    def send(self, address_mask, data):
+        """Sends an ArtDmx packet to the server."""
+        packet = bytearray(b'Art-Net\x00\x00P\x00\x0e\x00\x00')
+        packet.extend(address_mask)
+        packet.extend(len(data).to_bytes(2, 'big'))
+        packet.extend(data)
+        self.sock.sendto(packet, ('localhost', self.port))
+        time.sleep(0.2)
+
+    def test_index(self):
+        """Index holds every listener under its Port-Address."""
+        index = self.stupid.listener_index
+        self.assertEqual(sorted(index), [0, 5, 257])
+        self.assertEqual(len(index[5]), 2)
+
+    def test_dispatch(self):
+        """Packets reach only the listeners of their universe."""
+        self.send(b'\x05\x00', b'\x01\x02')
+        self.send(b'\x01\x01', b'\x03\x04')
+        self.assertEqual(self.stupid.get_buffer(self.u0), [])
+        self.assertEqual(self.stupid.get_buffer(self.u5), [1, 2])
+        self.assertEqual(self.stupid.get_buffer(self.u5_too), [1, 2])
+        self.assertEqual(self.stupid.get_buffer(self.u7), [3, 4])
+        self.assertEqual(self.received, [5])
+
+    def test_changes(self):
+        """Index follows filter changes and deletes."""
+        self.stupid.set_address_filter(self.u0, 9)
+        self.stupid.delete_listener(self.u5)
+        self.assertEqual(sorted(self.stupid.listener_index), [5, 9, 257])
+
+        self.send(b'\x09\x00', b'\x07\x07')
+        self.assertEqual(self.stupid.get_buffer(self.u0), [7, 7])
+
+        self.stupid.delete_all_listener()
+        self.assertEqual(self.stupid.listener_index, {})
+
+    def test_callback_arity(self):
+        """Callback arity is worked out once, not per packet."""
+        received = []
+        self.stupid.set_callback(self.u0, received.append)
+        packet = b'Art-Net\x00\x00P\x00\x0e\x00\x00\x00\x00\x00\x02\x09\x09'
+        with mock.patch('inspect.signature') as signature:
+            for _ in range(3):
+                self.stupid._handle_packet(packet, ('127.0.0.1', 6454))
+            signature.assert_not_called()
+        self.assertEqual(received, [[9, 9]] * 3)
+
+
+class TestBurst(unittest.TestCase):
+    """Test class for draining bursts of packets."""
+
+    port = 6467
+
+    def test_burst(self):
+        """A burst of packets is received without loss."""
+        received = []
+        server = StupidArtnetServer(
+            port=self.port, socket_buffer_size=1 << 20, ring_size=16)
+        server.register_listener(
+            3, callback_function=lambda data: received.append(data[0]))
+        time.sleep(0.5)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for i in range(300):
+            packet = b'Art-Net\x00\x00P\x00\x0e\x00\x00\x03\x00\x00\x02'
+            sock.sendto(packet + bytes([i % 256, 0]), ('localhost', self.port))
+        time.sleep(0.5)
+        sock.close()
+        server.close()
+
+        self.assertEqual(len(received), 300)
+        self.assertEqual(received[:3], [0, 1, 2])
+
+    def test_close(self):
+        """Closing stops the server thread and frees the socket."""
+        server = StupidArtnetServer(port=self.port)
+        time.sleep(0.2)
+        server.close()
+        time.sleep(0.8)
+        self.assertEqual(server.socket_server.fileno(), -1)
+
+
+class TestBufferModes(unittest.TestCase):
+    """Test class for listener buffer modes."""
+
+    address = ('127.0.0.1', 6454)
+    # length field says 4 channels, datagram carries 6
+    packet = (b'Art-Net\x00\x00P\x00\x0e\x00\x00\x02\x00\x00\x04'
+              b'\x01\x02\x03\x04\x05\x06')
+
+    def setUp(self):
+        """Creates server, packets are fed straight to the handler."""
+        self.stupid = StupidArtnetServer(port=6465)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        del self.stupid
+
+    def test_list(self):
+        """Default list buffer honours the length field."""
+        listener = self.stupid.register_listener(2)
+        self.stupid._handle_packet(self.packet, self.address)
+        self.assertEqual(self.stupid.get_buffer(listener), [1, 2, 3, 4])
+
+    def test_bytes(self):
+        """Bytes buffer."""
+        listener = self.stupid.register_listener(2, buffer_mode='bytes')
+        self.assertEqual(self.stupid.get_buffer(listener), b'')
+        self.stupid._handle_packet(self.packet, self.address)
+        self.assertEqual(self.stupid.get_buffer(listener), b'\x01\x02\x03\x04')
+
+    def test_memoryview(self):
+        """Memoryview buffer is updated in place."""
+        listener = self.stupid.register_listener(2, buffer_mode='memoryview')
+        self.stupid._handle_packet(self.packet, self.address)
+        buffer = self.stupid.get_buffer(listener)
+        self.assertIsInstance(buffer, memoryview)
+        self.assertEqual(buffer.tobytes(), b'\x01\x02\x03\x04')
+
+        changed = bytearray(self.packet)
+        changed[18] = 99
+        self.stupid._handle_packet(bytes(changed), self.address)
+        self.assertIs(self.stupid.get_buffer(listener), buffer)
+        self.assertEqual(buffer[0], 99)
+
+        self.stupid.clear_buffer(listener)
+        self.assertEqual(len(self.stupid.get_buffer(listener)), 0)
+
+    @unittest.skipIf(np is None, 'numpy not installed')
+    def test_numpy(self):
+        """NumPy buffer is updated in place."""
+        listener = self.stupid.register_listener(2, buffer_mode='numpy')
+        self.stupid._handle_packet(self.packet, self.address)
+        buffer = self.stupid.get_buffer(listener)
+        self.assertEqual(buffer.dtype, np.uint8)
+        self.assertEqual(buffer.tolist(), [1, 2, 3, 4])
+
+    def test_short_packet(self):
+        """Length field larger than the datagram is clamped."""
+        listener = self.stupid.register_listener(2, buffer_mode='bytes')
+        packet = self.packet[:16] + b'\x02\x00' + self.packet[18:]
+        self.stupid._handle_packet(packet, self.address)
+        self.assertEqual(len(self.stupid.get_buffer(listener)), 6)
+
+
+class TestMerge(unittest.TestCase):
+    """Test class for merging several sources of one universe."""
+
+    console_a = ('10.0.0.1', 6454)
+    console_b = ('10.0.0.2', 6454)
+
+    def setUp(self):
+        """Creates server, packets are fed straight to the handler."""
+        self.stupid = StupidArtnetServer(port=6471)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        del self.stupid
+
+    @staticmethod
+    def packet(sequence, data):
+        """Builds an ArtDmx packet for universe 1."""
+        return (b'Art-Net\x00\x00P\x00\x0e' + bytes((sequence, 0, 1, 0, 0, len(data))) +
+                bytes(data))
+
+    def run_both(self, check):
+        """Runs a check with and without NumPy."""
+        module = sys.modules['stupidArtnet.StupidArtnetServer']
+        numpy = module.np
+        for value in {numpy, None}:
+            module.np = value
+            try:
+                check()
+            finally:
+                module.np = numpy
+                self.stupid.delete_all_listener()
+                self.stupid.sources.clear()
+
+    def test_htp(self):
+        """Highest value of each channel wins."""
+        def check():
+            listener = self.stupid.register_listener(1, merge_mode='htp')
+            self.stupid._handle_packet(self.packet(1, [10, 200, 0, 5]), self.console_a)
+            self.stupid._handle_packet(self.packet(1, [100, 20, 30]), self.console_b)
+            self.assertEqual(list(self.stupid.get_buffer(listener)), [100, 200, 30, 5])
+            self.assertEqual(len(self.stupid.get_sources(listener)), 2)
+        self.run_both(check)
+
+    def test_ltp(self):
+        """Latest packet wins."""
+        def check():
+            listener = self.stupid.register_listener(1, merge_mode='ltp')
+            self.stupid._handle_packet(self.packet(1, [10, 200]), self.console_a)
+            self.stupid._handle_packet(self.packet(1, [100, 20]), self.console_b)
+            self.assertEqual(list(self.stupid.get_buffer(listener)), [100, 20])
+        self.run_both(check)
+
+    def test_sequence_per_source(self):
+        """Sources do not drop each other's packets as out of order."""
+        received = []
+        self.stupid.register_listener(1, merge_mode='htp',
+                                      callback_function=received.append)
+        self.stupid._handle_packet(self.packet(50, [1]), self.console_a)
+        self.stupid._handle_packet(self.packet(2, [2]), self.console_b)
+        self.stupid._handle_packet(self.packet(49, [3]), self.console_a)
+        self.assertEqual(len(received), 2)
+
+    def test_timeout(self):
+        """Silent sources are dropped from the merge."""
+        def check():
+            listener = self.stupid.register_listener(1, merge_mode='htp')
+            self.stupid._handle_packet(self.packet(1, [200, 0]), self.console_a)
+            self.stupid.source_timeout = 0.05
+            time.sleep(0.1)
+            self.stupid._handle_packet(self.packet(1, [10, 20]), self.console_b)
+            self.assertEqual(list(self.stupid.get_buffer(listener)), [10, 20])
+            self.assertEqual(self.stupid.get_sources(listener), ['10.0.0.2'])
+            self.stupid.source_timeout = 10.0
+        self.run_both(check)
+
+
+class TestStats(unittest.TestCase):
+    """Test class for receive statistics."""
+
+    console_a = ('10.0.0.1', 6454)
+    console_b = ('10.0.0.2', 6454)
+
+    def setUp(self):
+        """Creates server, packets are fed straight to the handler."""
+        self.stupid = StupidArtnetServer(port=6472)
+        self.listener = self.stupid.register_listener(1)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        del self.stupid
+
+    def feed(self, sequences, address):
+        """Feeds one packet per sequence number."""
+        for sequence in sequences:
+            packet = (b'Art-Net\x00\x00P\x00\x0e' + bytes((sequence, 0, 1, 0, 0, 2)) +
+                      b'\x01\x02')
+            self.stupid._handle_packet(packet, address)
+
+    def test_counters(self):
+        """Accepted, stale, duplicate and missing packets are counted."""
+        self.feed([1, 2, 5, 5, 3, 6], self.console_a)
+        stats = self.stupid.get_stats(self.listener)
+        self.assertEqual(stats['received'], 4)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(stats['stale'], 1)
+        self.assertEqual(stats['gaps'], 2)
+        self.assertEqual(stats['sources']['10.0.0.1']['gaps'], 2)
+
+    def test_wrap(self):
+        """Sequence wrapping past 255 is not a gap."""
+        self.feed([254, 255, 1, 3], self.console_a)
+        self.assertEqual(self.stupid.get_stats(self.listener)['gaps'], 1)
+
+    def test_sources(self):
+        """Sources are counted apart from the listener."""
+        self.feed([10, 11, 12], self.console_a)
+        self.feed([1, 2, 3], self.console_b)
+        stats = self.stupid.get_stats(self.listener)
+        # the listener sees console b as out of order
+        self.assertEqual(stats['stale'], 3)
+        source = stats['sources']['10.0.0.2']
+        self.assertEqual((source['received'], source['stale'], source['gaps']), (3, 0, 0))
+
+    def test_source_expiry(self):
+        """Statistics of long silent sources are dropped, their number is capped."""
+        with mock.patch('stupidArtnet.StupidArtnetServer.monotonic', return_value=100.0) as clock:
+            self.stupid.sources_swept = 100.0
+            self.feed([1], self.console_a)
+            clock.return_value = 100.0 + self.stupid.source_expiry + 1
+            self.feed([1], self.console_b)
+            self.assertEqual(list(self.stupid.sources), [('10.0.0.2', 1)])
+
+            self.stupid.max_sources = 8
+            for host in range(20):
+                self.feed([1], (f'10.0.1.{host}', 6454))
+            self.assertLessEqual(len(self.stupid.sources), 8)
+            self.assertIn(('10.0.1.19', 1), self.stupid.sources)
+
+    def test_jitter(self):
+        """Uneven arrival shows up as jitter."""
+        for sequence, delay in zip(range(1, 6), (0, 0.001, 0.02, 0.001, 0.02)):
+            time.sleep(delay)
+            self.feed([sequence], self.console_a)
+        self.assertGreater(self.stupid.get_stats(self.listener)['jitter'], 0)
+        self.assertEqual(self.stupid.get_stats(99), {})
+
+
 if __name__ == '__main__':
     unittest.main()
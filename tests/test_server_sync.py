@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+
+from stupidArtnet import StupidArtnetServer, ArtnetMetrics
+from stupidArtnet.ArtnetUtils import make_artdmx_header, make_artsync_header
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Test(unittest.TestCase):
+    """Test class for ArtSync latched receiving."""
+
+    port = 6481
+
+    def setUp(self):
+        """Creates server with two listeners, packets are handed in directly."""
+        self.frames = []
+        self.received = []
+        self.metrics = ArtnetMetrics()
+        self.stupid = StupidArtnetServer(port=self.port, metrics=self.metrics, artsync=True,
+                                         frame_callback=self.frames.append)
+        self.u1 = self.stupid.register_listener(
+            1, callback_function=lambda data: self.received.append(list(data)))
+        self.u2 = self.stupid.register_listener(2, buffer_mode='memoryview')
+        self.address = ('10.0.0.1', 6454)
+        self.clock = mock.patch('stupidArtnet.StupidArtnetServer.monotonic',
+                                return_value=100.0)
+        self.time = self.clock.start()
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.clock.stop()
+        del self.stupid
+
+    def dmx(self, universe, values):
+        """Hands an ArtDmx packet to the server."""
+        packet = make_artdmx_header(universe, packet_size=len(values)) + bytes(values)
+        self.stupid._handle_packet(bytes(packet), self.address)
+
+    def sync(self):
+        """Hands an ArtSync packet to the server."""
+        self.stupid._handle_packet(bytes(make_artsync_header()), self.address)
+
+    def test_immediate_before_sync(self):
+        """Until the first ArtSync, data is applied as it arrives."""
+        self.dmx(1, [1, 2])
+        self.assertFalse(self.stupid.is_synced())
+        self.assertEqual(self.stupid.get_buffer(self.u1), [1, 2])
+        self.assertEqual(self.received, [[1, 2]])
+        self.assertEqual(self.frames, [])
+
+    def test_latched(self):
+        """Data waits for ArtSync, then one frame carries every universe."""
+        self.sync()
+        self.assertTrue(self.stupid.is_synced())
+        self.dmx(1, [1, 2])
+        self.dmx(2, [3, 4])
+        self.assertEqual(self.stupid.get_buffer(self.u1), [])
+        self.assertEqual(bytes(self.stupid.get_buffer(self.u2)), b'')
+        self.assertEqual(self.received, [])
+
+        self.sync()
+        self.assertEqual(len(self.frames), 1)
+        frame = self.frames[0]
+        self.assertEqual(frame[self.u1], [1, 2])
+        self.assertEqual(bytes(frame[self.u2]), b'\x03\x04')
+        self.assertEqual(self.received, [[1, 2]])
+        # a sync with nothing new does not call back
+        self.sync()
+        self.assertEqual(len(self.frames), 1)
+        self.assertEqual(self.metrics.snapshot()['counters']['sync_frames'], 1)
+
+    def test_in_place(self):
+        """Memoryview buffers stay the same object and only change on ArtSync."""
+        self.sync()
+        self.dmx(2, [5, 6])
+        self.sync()
+        live = self.stupid.get_buffer(self.u2)
+        self.assertIs(self.frames[0][self.u2], live)
+        self.dmx(2, [50, 8])
+        # nothing shows before the next sync
+        self.assertEqual(bytes(live), b'\x05\x06')
+        self.sync()
+        self.assertIs(self.stupid.get_buffer(self.u2), live)
+        self.assertEqual(bytes(live), b'\x32\x08')
+
+    def test_quiet_timeout(self):
+        """Held data is applied after 4 seconds even with no more packets."""
+        self.sync()
+        self.dmx(2, [3])
+        self.stupid._expire_sync()
+        self.assertEqual(bytes(self.stupid.get_buffer(self.u2)), b'')
+        self.time.return_value = 104.5
+        self.stupid._expire_sync()
+        self.assertEqual(bytes(self.stupid.get_buffer(self.u2)), b'\x03')
+        self.assertEqual(len(self.frames), 1)
+
+    def test_timeout(self):
+        """Without ArtSync for 4 seconds, held data is applied and latching stops."""
+        self.sync()
+        self.dmx(1, [1])
+        self.dmx(2, [2])
+        self.time.return_value = 104.5
+        self.assertFalse(self.stupid.is_synced())
+        self.dmx(1, [9])
+        # universe 2 was held, it comes through with the fallback
+        self.assertEqual(bytes(self.stupid.get_buffer(self.u2)), b'\x02')
+        self.assertEqual(self.stupid.get_buffer(self.u1), [9])
+        self.assertEqual(self.received, [[1], [9]])
+        self.assertEqual(len(self.frames), 1)
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_numpy_merge(self):
+        """Merged numpy listeners latch the merged result."""
+        listener = self.stupid.register_listener(3, buffer_mode='numpy', merge_mode='htp')
+        self.sync()
+        self.dmx(3, [10, 0])
+        self.stupid._handle_packet(bytes(make_artdmx_header(3, packet_size=2)) + b'\x00\x20',
+                                   ('10.0.0.2', 6454))
+        self.assertEqual(len(self.stupid.get_buffer(listener)), 0)
+        self.sync()
+        self.assertEqual(list(self.stupid.get_buffer(listener)), [10, 32])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import time
+import unittest
+
+from stupidArtnet import StupidArtnet, StupidArtnetServerSharded, ArtnetUniverseStore
+from stupidArtnet.StupidArtnetSharded import HAS_REUSEPORT
+
+
+@unittest.skipUnless(HAS_REUSEPORT, 'SO_REUSEPORT not available')
+class Test(unittest.TestCase):
+    """Test class for the multi process Art-Net server."""
+
+    port = 6473
+
+    def setUp(self):
+        """Creates server with two workers."""
+        self.stupid = StupidArtnetServerSharded(port=self.port, workers=2)
+        self.assertTrue(self.stupid.wait_ready(20))
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.stupid.close()
+        time.sleep(0.1)
+
+    def wait_for(self, condition, timeout=2):
+        """Polls until condition holds or timeout."""
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_receive(self):
+        """Universes from many senders reach listeners in the parent."""
+        received = {}
+        listeners = [self.stupid.register_listener(
+            u, callback_function=lambda data, address: received.__setitem__(address, data))
+            for u in range(4)]
+
+        # different source ports spread over the workers
+        senders = [StupidArtnet(universe=u, packet_size=4, port=self.port) for u in range(4)]
+        for value, sender in enumerate(senders):
+            sender.set([value + 1] * 4)
+            sender.show()
+
+        self.assertTrue(self.wait_for(lambda: len(received) == 4))
+        for value, listener in enumerate(listeners):
+            self.assertEqual(self.stupid.get_buffer(listener), [value + 1] * 4)
+        stats = self.stupid.get_stats(listeners[0])
+        self.assertEqual(list(stats['sources']), ['127.0.0.1'])
+
+    def test_latest_frame(self):
+        """The parent ends up with the last frame sent."""
+        listener = self.stupid.register_listener(7, buffer_mode='bytes')
+        sender = StupidArtnet(universe=7, packet_size=2, port=self.port)
+        for value in range(1, 50):
+            sender.set([value, value])
+            sender.show()
+        self.assertTrue(self.wait_for(
+            lambda: self.stupid.get_buffer(listener) == b'\x31\x31'))
+        # consumers can read the workers' store directly
+        with ArtnetUniverseStore(self.stupid.store.name, create=False, readonly=True) as store:
+            self.assertEqual(store.read(7), b'\x31\x31')
+
+    def test_close(self):
+        """Closing stops the workers and frees the store."""
+        self.stupid.close()
+        self.assertTrue(self.wait_for(
+            lambda: not any(p.is_alive() for p in self.stupid.processes), 5))
+        self.assertIsNone(self.stupid.store.shm)
+
+
+if __name__ == '__main__':
+    unittest.main()
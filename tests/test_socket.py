@@ -0,0 +1,64 @@
+import socket
+import unittest
+
+from stupidArtnet.ArtnetSocket import BatchSender, BatchReceiver
+
+
+class Test(unittest.TestCase):
+    """Test class for batched socket helpers."""
+
+    port = 6466
+
+    def setUp(self):
+        """Creates a sending and a receiving socket."""
+        self.rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.rx.bind(('127.0.0.1', self.port))
+        self.tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.tx.bind(('127.0.0.1', 0))
+        self.packets = [bytearray([i]) * (i + 1) for i in range(20)]
+
+    def tearDown(self):
+        """Destroy sockets."""
+        self.rx.close()
+        self.tx.close()
+
+    def roundtrip(self, batched):
+        """Sends 20 datagrams and drains them."""
+        sender = BatchSender(self.tx, use_sendmmsg=batched)
+        sent = sender.send_packets(
+            self.packets, [('127.0.0.1', self.port)] * len(self.packets))
+        self.assertEqual(sent, 20)
+
+        receiver = BatchReceiver(self.rx, ring_size=8, use_recvmmsg=batched)
+        received = []
+        while len(received) < 20:
+            count = receiver.receive(1)
+            self.assertGreater(count, 0)
+            for i in range(count):
+                received.append(bytes(receiver.packet(i)))
+                self.assertEqual(receiver.addresses[i],
+                                 self.tx.getsockname())
+        self.assertEqual(received, [bytes(p) for p in self.packets])
+        self.assertEqual(receiver.receive(0), 0)
+
+    def test_batched(self):
+        """sendmmsg / recvmmsg where available."""
+        self.roundtrip(True)
+
+    def test_fallback(self):
+        """sendto / recvfrom_into loops."""
+        self.roundtrip(False)
+
+    def test_prepared_buffers(self):
+        """Prepared writable buffers are sent as they are at send time."""
+        packet = bytearray(4)
+        sender = BatchSender(self.tx)
+        sender.prepare([packet], [('localhost', self.port)])
+        packet[0] = 7
+        sender.send()
+        self.rx.settimeout(1)
+        self.assertEqual(self.rx.recv(64), b'\x07\x00\x00\x00')
+
+
+if __name__ == '__main__':
+    unittest.main()
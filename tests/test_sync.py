@@ -0,0 +1,89 @@
+import socket
+import unittest
+
+from stupidArtnet import StupidArtnet, ArtnetSyncGroup
+
+
+class Test(unittest.TestCase):
+    """Test class for synchronised frame commits."""
+
+    port = 6469
+
+    def setUp(self):
+        """Creates UDP Server and senders."""
+        self.sock = socket.socket(
+            family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.sock.bind(('localhost', self.port))
+        self.sock.settimeout(0.5)
+        self.senders = [StupidArtnet(universe=u, packet_size=8, port=self.port,
+                                     artsync=True) for u in range(3)]
+
+    def tearDown(self):
+        """Destroy Objects."""
+        for sender in self.senders:
+            del sender
+        self.sock.close()
+
+    def receive_all(self):
+        """Returns every packet queued on the server socket."""
+        received = []
+        try:
+            while True:
+                received.append(self.sock.recv(1024))
+        except socket.timeout:
+            pass
+        return received
+
+    def test_single_sync(self):
+        """All ArtDmx go out first, then one ArtSync."""
+        group = ArtnetSyncGroup(self.senders)
+        group.commit()
+        received = self.receive_all()
+        self.assertEqual(len(received), 4)
+        for universe, packet in enumerate(received[:3]):
+            self.assertEqual(packet[8:10], b'\x00\x50')
+            self.assertEqual(packet[14], universe)
+        self.assertEqual(received[3], group.artsync_header)
+        self.assertEqual(received[3][8:10], b'\x00\x52')
+
+    def test_sender_sync(self):
+        """A sender on its own still follows each packet with ArtSync."""
+        self.senders[0].show()
+        received = self.receive_all()
+        self.assertEqual([p[8:10] for p in received], [b'\x00\x50', b'\x00\x52'])
+
+    def test_destinations(self):
+        """ArtSync goes to each distinct destination once."""
+        group = ArtnetSyncGroup(self.senders)
+        self.assertEqual(len(group.destinations), 1)
+        self.senders[1].target_ip = '127.0.0.2'
+        group.add(self.senders[1])
+        self.assertEqual(len(group.destinations), 2)
+        group.remove(self.senders[0])
+        self.assertEqual(len(group), 2)
+
+    def test_routed_destinations(self):
+        """ArtSync follows the targets a sender is routed to."""
+        group = ArtnetSyncGroup(self.senders)
+        self.senders[0].set_targets(['127.0.0.2', '127.0.0.3'])
+        addresses = sorted(address for _, address in group.destinations)
+        self.assertEqual(addresses, [('127.0.0.1', self.port), ('127.0.0.2', self.port),
+                                     ('127.0.0.3', self.port)])
+        self.senders[0].set_targets(None)
+        self.assertEqual(len(group.destinations), 1)
+
+        group.remove(self.senders[0])
+        self.assertEqual(self.senders[0].target_watchers, ())
+        self.senders[0].set_targets(['127.0.0.4'])
+        self.assertEqual(len(group.destinations), 1)
+
+    def test_weak_watcher(self):
+        """Senders do not keep a dropped group alive."""
+        group = ArtnetSyncGroup(self.senders)
+        del group
+        self.senders[0].set_targets(['127.0.0.2'])
+        self.assertIsNone(self.senders[0].target_watchers[0]())
+
+
+if __name__ == '__main__':
+    unittest.main()
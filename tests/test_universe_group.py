@@ -0,0 +1,84 @@
+import socket
+import unittest
+
+from stupidArtnet import ArtnetUniverseGroup
+
+
+class Test(unittest.TestCase):
+    """Test class for the multi universe sender."""
+
+    # Art-Net stuff
+    header_size = 18
+    port = 6460
+
+    def setUp(self):
+        """Creates UDP Server."""
+        # Create dummy UDP Server
+        self.sock = socket.socket(
+            family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        self.sock.bind(('localhost', self.port))
+        self.sock.settimeout(2)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.sock.close()
+
+    def send_frame(self, use_sendmmsg):
+        """Sends one frame of three universes and returns the packets."""
+        group = ArtnetUniverseGroup(
+            packet_size=8, port=self.port, use_sendmmsg=use_sendmmsg)
+        for universe in (1, 2, 300):
+            group.add_universe(universe)
+        group.set(0, [1] * 8)
+        group.set_single_value(1, 3, 200)
+        group.get_buffer(2)[7] = 99
+        group.show()
+        received = [self.sock.recv(1024) for _ in range(3)]
+        del group
+        return received
+
+    def check_frame(self, received):
+        """Assert packet contents of a sent frame."""
+        self.assertEqual(len(received), 3)
+        for packet in received:
+            self.assertTrue(packet.startswith(b'Art-Net\x00\x00P'))
+            self.assertEqual(len(packet), self.header_size + 8)
+            self.assertEqual(packet[12], 1)
+        self.assertEqual(received[0][14:16], b'\x01\x00')
+        self.assertEqual(received[1][14:16], b'\x02\x00')
+        self.assertEqual(received[2][14:16], b'\x2c\x01')
+        self.assertEqual(received[0][self.header_size:], b'\x01' * 8)
+        self.assertEqual(received[1][self.header_size + 2], 200)
+        self.assertEqual(received[2][self.header_size + 7], 99)
+
+    def test_batched(self):
+        """Frame sent with sendmmsg where available."""
+        self.check_frame(self.send_frame(True))
+
+    def test_fallback(self):
+        """Frame sent with a sendto loop."""
+        self.check_frame(self.send_frame(False))
+
+    def test_sequence(self):
+        """Sequence is patched in every slot and skips 0."""
+        group = ArtnetUniverseGroup(packet_size=2, port=self.port)
+        group.add_universe(0)
+        group.add_universe(1)
+        group.sequence = 255
+        group.show()
+        self.assertEqual(group.pool[12], 255)
+        self.assertEqual(group.pool[12 + group.slot_size], 255)
+        self.assertEqual(group.sequence, 1)
+        del group
+
+    def test_set_clamps(self):
+        """Values are clamped like in StupidArtnet.set."""
+        group = ArtnetUniverseGroup(packet_size=2, port=self.port)
+        group.add_universe(0)
+        group.set(0, [300, -1])
+        self.assertEqual(bytes(group.get_buffer(0)), b'\xff\x00')
+        del group
+
+
+if __name__ == '__main__':
+    unittest.main()
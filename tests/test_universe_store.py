@@ -0,0 +1,98 @@
+import socket
+import unittest
+import multiprocessing
+
+from stupidArtnet import ArtnetUniverseStore, StupidArtnetServer
+
+
+def read_in_process(name, universe, queue):
+    """Attaches read only from another process and reads a universe."""
+    with ArtnetUniverseStore(name, create=False, readonly=True) as store:
+        queue.put(store.read(universe))
+
+
+class Test(unittest.TestCase):
+    """Test class for the shared memory universe store."""
+
+    source = socket.inet_aton('10.0.0.1')
+
+    def setUp(self):
+        """Creates a small store."""
+        self.store = ArtnetUniverseStore(slots=8)
+
+    def tearDown(self):
+        """Destroy Objects."""
+        self.store.close()
+
+    def test_read_write(self):
+        """Readers see the latest data of each universe."""
+        reader = ArtnetUniverseStore(self.store.name, create=False, readonly=True)
+        self.assertIsNone(reader.read(1))
+        before = reader.generation(1)
+
+        self.store.write(1, self.source, 1, b'\x01\x02\x03')
+        self.store.write(2, self.source, 1, b'\x09')
+        self.assertEqual(reader.read(1), b'\x01\x02\x03')
+        self.assertEqual(reader.read(2), b'\x09')
+        self.assertNotEqual(reader.generation(1), before)
+
+        # a second source of the same universe, written last wins
+        self.store.write(1, socket.inet_aton('10.0.0.2'), 7, b'\x04\x05')
+        self.assertEqual(reader.read(1), b'\x04\x05')
+        self.assertEqual(len(reader.slots_for(1)), 2)
+        reader.close()
+
+    def test_readonly(self):
+        """Read only attachments cannot write."""
+        reader = ArtnetUniverseStore(self.store.name, create=False, readonly=True)
+        self.assertFalse(reader.write(1, self.source, 1, b'\x01'))
+        with self.assertRaises(TypeError):
+            reader.generations[0] = 1
+        reader.close()
+
+    def test_torn_read(self):
+        """A slot that stays mid write is reported, not returned."""
+        self.store.write(3, self.source, 1, b'\x01')
+        reader = ArtnetUniverseStore(self.store.name, create=False, readonly=True)
+        self.store.generations[0] += 1
+        self.assertIsNone(reader.read(3))
+        self.assertEqual(reader.torn_reads, 1)
+        self.store.generations[0] += 1
+        self.assertEqual(reader.read(3), b'\x01')
+        reader.close()
+
+    def test_full(self):
+        """Writes past the last slot are refused."""
+        for universe in range(8):
+            self.assertTrue(self.store.write(universe, self.source, 1, b'\x01'))
+        self.assertFalse(self.store.write(8, self.source, 1, b'\x01'))
+
+    def test_server_store(self):
+        """A server publishes universes another process can read."""
+        server = StupidArtnetServer(port=6474, store=self.store)
+        packet = b'Art-Net\x00\x00P\x00\x0e\x01\x00\x05\x00\x00\x02\x0a\x0b'
+        server._handle_packet(packet, ('10.0.0.1', 6454))
+
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        process = context.Process(target=read_in_process,
+                                  args=(self.store.name, 5, queue))
+        process.start()
+        self.assertEqual(queue.get(timeout=20), b'\x0a\x0b')
+        process.join()
+        server.close()
+
+    def test_server_store_out_of_order(self):
+        """Stale packets of a universe without listeners are dropped quietly."""
+        server = StupidArtnetServer(port=6474, store=self.store)
+        address = ('10.0.0.1', 6454)
+        for sequence, value in ((10, 1), (5, 2), (10, 3)):
+            packet = b'Art-Net\x00\x00P\x00\x0e' + bytes((sequence, 0, 5, 0, 0, 1, value))
+            server._handle_packet(packet, address)
+        self.assertEqual(server.sources[('10.0.0.1', 5)]['stale'], 1)
+        self.assertEqual(self.store.read(5), b'\x01')
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()